@@ -0,0 +1,214 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer benchmarks - synthetic logs
+# Crash logs (header, debug output, Python traceback, FATAL SIGNAL block,
+# registers, /proc/self/maps dump, settings, dmesg) and plain debug logs of
+# a given size. Output is reproducible for a given seed. The debug output is
+# written from a few pre-built blocks, so 200 MB takes seconds and not minutes.
+#
+#   python3 benchmarks/genlogs.py /tmp/logs --files 1000 --size 10K
+#   python3 benchmarks/genlogs.py /tmp/logs --files 1 --size 200M --kind debug
+
+from __future__ import print_function
+import argparse
+import os
+import random
+import time
+
+BLOCK_SIZE = 256 * 1024
+BLOCK_VARIANTS = 8
+# Sat Oct 18 10:00:00 2025 UTC; file names and crash dates count from here
+BASE_TIME = 1760781600
+
+DEBUG_LINES = (
+    "[eDVBFrontend%d] opening frontend",
+    "[eDVBFrontend%d] tune setting type to 1",
+    "[eDVBChannel] OURSTATE: tuning",
+    "[eDVBServicePMTHandler] ok ... now we start!!",
+    "[eDVBCAService] new channel %d",
+    "[EPGC] start caching events(%d)",
+    "[EPGC] abort non avail viasat reading",
+    "[ePicLoad] decode picture... %d",
+    "[Skin] processing screen InfoBar",
+    "[ActionMap] Keymap 'InfobarChannelSelection' -> Action = 'switchChannelDown'",
+    "[eInputDeviceInit] 1 %d 1 0",
+    "[AVSwitch] setting aspect: 16:9",
+    "[eDVBLocalTimerHandler] time update to %d",
+    "[Navigation] playing ref 1:0:19:283D:3FB:1:C00000:0:0:0:",
+    "[RecordTimer] activating state %d",
+    "[CrashlogViewer] scanning /media/hdd/logs",
+    "[eDVBFrontend%d] warning: tune failed",
+    "[eDVBFrontend%d] lost lock",
+    "[Console] finished: /usr/bin/opkg list-upgradable",
+    "[ServiceReference] service %d not found",
+)
+
+PLUGINS = ("EPGImport", "OpenWebif", "IPTVPlayer", "AutoTimer", "MovieBrowser", "SoftcamPanel")
+EXCEPTIONS = (
+    ("KeyError", "'epg'", 'self.events[ref]["epg"]'),
+    ("AttributeError", "'NoneType' object has no attribute 'getText'", "text = self.current.getText()"),
+    ("TypeError", "'NoneType' object is not subscriptable", "name = info[0]"),
+    ("IndexError", "list index out of range", "item = self.list[self.index]"),
+    ("ValueError", "invalid literal for int() with base 10: ''", "sid = int(parts[3], 16)"),
+    ("UnicodeDecodeError", "'utf-8' codec can't decode byte 0xe4 in position 12", "data = raw.decode()"),
+)
+SIGNALS = (11, 6, 7, 4)
+LIBS = ("/usr/bin/enigma2", "/lib/libc.so.6", "/usr/lib/libpython3.so", "/usr/lib/libdvbsi++.so.1",
+        "/usr/lib/libgstreamer-1.0.so.0", "/lib/libpthread.so.0", "/usr/lib/libcrypto.so.3")
+SYMBOLS = ("_ZN6eTimer4fireEv", "_ZN14eMainloop13processOneEventEjPP7_objectS1_",
+           "_ZN13eDVBFrontend4tuneERK24iDVBFrontendParameters", "PyObject_Call", "_PyEval_EvalFrameDefault",
+           "_ZN11eListbox5paintERK7gRegion", "malloc", "memcpy", "__libc_start_main")
+
+
+def parse_size(text):
+    # "10K", "1.5M", "200M", "4096" -> bytes
+    text = text.strip().upper().rstrip("B")
+    for suffix, factor in (("K", 1024), ("M", 1024 ** 2), ("G", 1024 ** 3)):
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+
+def stamp(t):
+    return time.strftime("%H:%M:%S", time.gmtime(t)) + ".%04d" % int((t % 1) * 10000)
+
+
+def debug_block(rng, size, start):
+    # timestamped debug output of about `size` bytes
+    lines = []
+    total = 0
+    t = start
+    while total < size:
+        t += rng.random() * 0.05
+        line = rng.choice(DEBUG_LINES)
+        if "%d" in line:
+            line = line % rng.randint(0, 9999)
+        line = "%s %s\n" % (stamp(t), line)
+        lines.append(line)
+        total += len(line)
+    return "".join(lines)
+
+
+def traceback_text(rng, t):
+    plugin = rng.choice(PLUGINS)
+    etype, message, code = rng.choice(EXCEPTIONS)
+    frames = [
+        ("/usr/lib/enigma2/python/StartEnigma.py", 230, "processDelay", "callback(*retval)"),
+        ("/usr/lib/enigma2/python/Components/ActionMap.py", 67, "action", "res = self.actions[action]()"),
+        ("/usr/lib/enigma2/python/Plugins/Extensions/%s/plugin.py" % plugin, rng.randint(40, 2000),
+         rng.choice(("keyOk", "buildList", "updateEvents", "onTimer")), code),
+    ]
+    lines = ["Traceback (most recent call last):"]
+    for path, line, func, source in frames:
+        lines.append('  File "%s", line %d, in %s' % (path, line, func))
+        lines.append("    " + source)
+    lines.append("%s: %s" % (etype, message))
+    return "".join("%s %s\n" % (stamp(t), line) for line in lines)
+
+
+def fatal_block(rng, t):
+    sig = rng.choice(SIGNALS)
+    lines = [
+        "[ePyObject] (CallObject(<bound method InfoBar.keyOk>,()) failed)",
+        "FATAL SIGNAL %d" % sig,
+        "PC: 0x%08X" % rng.randint(0x400000, 0x7FFFFFFF),
+        "Backtrace:",
+        "/usr/bin/enigma2(_Z17handleFatalSignaliP7siginfoPv+0x1d8) [0x4BC5C8]",
+        "/lib/libc.so.6(__default_rt_sa_restorer+0) [0x770C5B18]",
+    ]
+    for i in range(rng.randint(6, 16)):
+        lines.append("%s(%s+0x%x) [0x%08X]" % (rng.choice(LIBS), rng.choice(SYMBOLS), rng.randint(4, 0x400),
+                                              rng.randint(0x400000, 0x7FFFFFFF)))
+    lines.append("-------FATAL SIGNAL")
+    text = "".join("%s %s\n" % (stamp(t), line) for line in lines)
+
+    regs = ["Registers:"]
+    names = ["r%d" % i for i in range(13)] + ["sp", "lr", "pc", "cpsr"]
+    for i in range(0, len(names), 4):
+        regs.append(" ".join("%s: 0x%08x" % (n, rng.randint(0, 0xFFFFFFFF)) for n in names[i:i + 4]))
+    regs.append("/proc/self/maps:")
+    addr = 0x00400000
+    for n in range(rng.randint(20, 60)):
+        size = rng.choice((0x1000, 0x2000, 0x21000, 0x100000, 0x63c000))
+        regs.append("%08x-%08x %s %08x b3:02 %d %s" % (addr, addr + size, rng.choice(("r-xp", "r--p", "rw-p")),
+                                                      rng.randint(0, 0xFFFFF) & ~0xFFF, rng.randint(100, 99999),
+                                                      rng.choice(LIBS)))
+        addr += size
+    return text + "\n".join(regs) + "\n"
+
+
+def tail_text(rng):
+    lines = ["", "config.misc.firstrun=false", "config.usage.setup_level=expert",
+             "config.av.videomode.HDMI=1080i", "config.plugins.EPGImport.enabled=true", "dmesg"]
+    t = 0.0
+    for n in range(rng.randint(20, 60)):
+        t += rng.random() * 3
+        lines.append("[%12.6f] %s" % (t, rng.choice(("usb 1-1: new high-speed USB device", "EXT4-fs (sda1): mounted filesystem",
+                                                   "dvb_frontend: DVB: registering adapter 0 frontend 0",
+                                                   "brcmstb_nand: timeout waiting for command"))))
+    return "\n".join(lines) + "\n"
+
+
+def write_log(path, size, kind="crash", seed=0, crash_time=BASE_TIME):
+    # writes a log of about `size` bytes (at least the crash part itself)
+    rng = random.Random(seed)
+    t = crash_time % 86400
+    if kind == "crash":
+        head = ("OpenPLi Enigma2 Crashlog\n\ncrashdate=%s\ncompiledate=Oct  1 2025\n"
+                % time.strftime("%a %b %d %H:%M:%S %Y", time.gmtime(crash_time)))
+        tail = traceback_text(rng, t) + fatal_block(rng, t) + tail_text(rng)
+    else:
+        head = "%s enigma2 is starting\n%s PYTHONPATH: /usr/lib/enigma2/python\n" % (stamp(t), stamp(t))
+        tail = ""
+    remain = max(0, size - len(head) - len(tail))
+    with open(path, "w") as f:
+        f.write(head)
+        if remain <= BLOCK_SIZE:
+            f.write(debug_block(rng, remain, t))
+        else:
+            blocks = [debug_block(rng, BLOCK_SIZE, t) for n in range(BLOCK_VARIANTS)]
+            while remain > 0:
+                block = rng.choice(blocks)
+                if kind == "debug" and rng.random() < 0.05:
+                    # debug logs carry the odd traceback the GUI survived
+                    block += traceback_text(rng, t)
+                f.write(block[:remain])
+                remain -= len(block)
+        f.write(tail)
+    os.utime(path, (crash_time, crash_time))
+    return path
+
+
+def log_name(kind, n, crash_time):
+    if kind == "crash":
+        return "enigma2_crash_%d.log" % (crash_time + n)
+    return "enigma2_debug_%s_%04d.log" % (time.strftime("%Y-%m-%d_%H-%M-%S", time.gmtime(crash_time)), n)
+
+
+def generate_logs(directory, count, size, kind="crash", seed=0):
+    # `count` logs of about `size` bytes, one hour apart -> [path]
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    paths = []
+    for n in range(count):
+        crash_time = BASE_TIME + n * 3600
+        path = os.path.join(directory, log_name(kind, n, crash_time))
+        paths.append(write_log(path, size, kind, seed * 100003 + n, crash_time))
+    return paths
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Write synthetic enigma2 crash/debug logs.")
+    p.add_argument("directory")
+    p.add_argument("--files", type=int, default=10, help="number of logs (default: 10)")
+    p.add_argument("--size", default="10K", help="size of each log, e.g. 10K, 1M, 200M (default: 10K)")
+    p.add_argument("--kind", choices=("crash", "debug"), default="crash")
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args(argv)
+    start = time.time()
+    paths = generate_logs(args.directory, args.files, parse_size(args.size), args.kind, args.seed)
+    print("%d logs written to %s (%.1f s)" % (len(paths), args.directory, time.time() - start))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,420 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer benchmarks
+# Times the hot paths of the plugin against synthetic logs (see genlogs.py),
+# outside enigma2: the modules in stubs/ stand in for enigma, Components,
+# Screens, Tools, Plugins and twisted. The twisted stub runs background work
+# at once, so the screen timings include what the box does in worker threads.
+#
+#   python3 benchmarks/run.py -o bench_output.txt
+#   python3 benchmarks/run.py --profile full --baseline old.json
+#
+# Each benchmark runs --repeat times (median/min/max seconds) plus once more
+# under tracemalloc for its peak Python memory. The result is JSON; with
+# --baseline, slower or hungrier results are listed under "regressions" and
+# the exit status is 1.
+
+from __future__ import print_function
+import argparse
+import contextlib
+import functools
+import gc
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+import zipfile
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+PLUGIN_PARENT = os.path.join(ROOT, "usr", "lib", "enigma2", "python", "Plugins", "Extensions")
+PLUGIN_DIR = os.path.join(PLUGIN_PARENT, "CrashlogViewer")
+sys.path[:0] = [HERE, os.path.join(HERE, "stubs"), PLUGIN_PARENT]
+
+from genlogs import generate_logs, parse_size
+
+PROFILES = {
+    "quick": {"counts": (10, 100, 1000), "sizes": ("10K", "1M", "20M"), "repeat": 3},
+    "full": {"counts": (10, 100, 1000, 10000), "sizes": ("10K", "1M", "20M", "200M"), "repeat": 5},
+}
+# size of each log in the file-count sets
+COUNT_LOG_SIZE = "10K"
+# changes below these are noise, not regressions
+MIN_DELTA_SECONDS = 0.002
+MIN_DELTA_BYTES = 64 * 1024
+# where the update zip keeps the plugin, like the GitHub archive
+ZIP_PREFIX = "CrashlogViewer-main/usr/lib/enigma2/python/Plugins/Extensions/CrashlogViewer/"
+
+
+class Session(object):
+    # screens opened by the code under test are recorded, not shown
+
+    def __init__(self):
+        self.opened = []
+
+    def open(self, screen, *args, **kwargs):
+        self.opened.append((screen, args, kwargs))
+
+    def openWithCallback(self, callback, screen, *args, **kwargs):
+        self.opened.append((screen, args, kwargs))
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+def measure(prepare, repeat):
+    # prepare() -> the callable to time; returns ([seconds], peak bytes)
+    times = []
+    for n in range(repeat):
+        fnc = prepare()
+        gc.collect()
+        start = time.perf_counter()
+        fnc()
+        times.append(time.perf_counter() - start)
+    fnc = prepare()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fnc()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def result(name, params, times, peak):
+    times = sorted(times)
+    return {
+        "name": name,
+        "params": params,
+        "runs": len(times),
+        "median": times[len(times) // 2],
+        "min": times[0],
+        "max": times[-1],
+        "peak_bytes": peak,
+    }
+
+
+def result_key(r):
+    return r["name"] + json.dumps(r["params"], sort_keys=True)
+
+
+def compare(results, baseline, tolerance):
+    # [{name, params, metric, baseline, value}] for results worse than baseline
+    old = dict((result_key(r), r) for r in baseline.get("results", ()))
+    regressions = []
+    for r in results:
+        base = old.get(result_key(r))
+        if base is None:
+            continue
+        for metric, floor in (("median", MIN_DELTA_SECONDS), ("peak_bytes", MIN_DELTA_BYTES)):
+            value, before = r[metric], base.get(metric)
+            if before is not None and value > before * (1 + tolerance) and value - before > floor:
+                regressions.append({"name": r["name"], "params": r["params"], "metric": metric,
+                                    "baseline": before, "value": value})
+    return regressions
+
+
+class Bench(object):
+
+    def __init__(self, work, profile, repeat, only=None):
+        self.work = work
+        self.profile = profile
+        self.repeat = repeat
+        self.only = only
+        self.results = []
+        self.session = Session()
+        self.ui = None
+
+    def note(self, msg):
+        print("[bench] " + msg, file=sys.stderr)
+
+    def run(self, name, params, prepare, repeat=None):
+        if self.only and not any(o in name for o in self.only):
+            return
+        times, peak = measure(prepare, repeat or self.repeat)
+        r = result(name, params, times, peak)
+        self.results.append(r)
+        self.note("%-32s %-24s median %8.1f ms  peak %8.1f KB" % (
+            name, json.dumps(params), r["median"] * 1000, peak / 1024.0))
+
+    def wanted(self, *names):
+        return not self.only or any(o in name for name in names for o in self.only)
+
+    # --- Setup ---
+    def load_plugin(self):
+        # import the plugin against the stubs, with every path it writes to
+        # (log file, metadata cache, mount table) moved into the work dir
+        from CrashlogViewer import diag, discovery, logcache, mounts
+        diag.get_diagnostics().path = os.path.join(self.work, "CrashlogViewer.log")
+        start = time.perf_counter()
+        from CrashlogViewer import ui
+        self.import_time = time.perf_counter() - start
+        mounts_file = os.path.join(self.work, "mounts")
+        with open(mounts_file, "w") as f:
+            f.write("/dev/root / ext4 rw,relatime 0 0\n")
+        mounts._table = mounts.MountTable(mounts_file)
+        discovery.STATIC_ROOTS = ()
+        self.cache_file = os.path.join(self.work, "CrashlogViewer_index.json")
+        ui.LogMetaCache = functools.partial(logcache.LogMetaCache, self.cache_file)
+        self.ui = ui
+        return ui
+
+    def log_set(self, name, count, size, kind="crash"):
+        # generated once per work dir, so --workdir can reuse them
+        directory = os.path.join(self.work, "logs", name)
+        if not os.path.isdir(directory):
+            start = time.time()
+            generate_logs(directory, count, parse_size(size), kind)
+            self.note("generated %s: %d x %s (%.1f s)" % (name, count, size, time.time() - start))
+        return directory
+
+    def use_base(self, directory):
+        # the screens scan the default base path
+        self.ui.find_log_entries.__defaults__ = (directory,)
+        self.ui.scan_log_entries.__defaults__ = (directory,)
+
+    # --- Benchmarks ---
+    def bench_list(self):
+        ui = self.ui
+        for count in self.profile["counts"]:
+            if not self.wanted("find_log_files", "CrashLogScreen.CfgMenu"):
+                return
+            directory = self.log_set("count_%d" % count, count, COUNT_LOG_SIZE)
+            self.use_base(directory)
+            params = {"files": count}
+            self.run("find_log_files", params, lambda: functools.partial(ui.find_log_files, directory))
+
+            def cold():
+                # nothing cached: every log is parsed for the list
+                if os.path.exists(self.cache_file):
+                    os.remove(self.cache_file)
+                screen = ui.CrashLogScreen(self.session)
+                os.remove(self.cache_file)
+                screen.cache = ui.LogMetaCache()
+                return screen.CfgMenu
+
+            def warm():
+                # the usual case: all logs known from the last time
+                return ui.CrashLogScreen(self.session).CfgMenu
+
+            self.run("CrashLogScreen.CfgMenu", dict(params, cache="cold"), cold)
+            self.run("CrashLogScreen.CfgMenu", dict(params, cache="warm"), warm)
+
+    def bench_view(self):
+        ui = self.ui
+        docs = ui.get_document_cache()
+        for size in self.profile["sizes"]:
+            if not self.wanted("LogScreen.open", "LogScreen.reopen", "LogScreen.loadLogFile"):
+                return
+            for kind in ("crash", "debug"):
+                directory = self.log_set("%s_%s" % (kind, size), 1, size, kind)
+                path = os.path.join(directory, os.listdir(directory)[0])
+                params = {"size": size, "kind": kind}
+
+                def cold():
+                    # the whole screen, including the parse for the error pane
+                    docs.clear()
+                    return functools.partial(ui.LogScreen, self.session, path)
+
+                self.run("LogScreen.open", params, cold)
+                # opened again, or after the prefetch: from the document cache
+                self.run("LogScreen.reopen", params, lambda: functools.partial(ui.LogScreen, self.session, path))
+                screen = ui.LogScreen(self.session, path)
+
+                def load():
+                    screen.closeIndex()
+                    docs.clear()
+                    return screen.loadLogFile
+
+                self.run("LogScreen.loadLogFile", params, load)
+                screen.close()
+
+    def bench_delete(self):
+        ui = self.ui
+        for count in self.profile["counts"]:
+            if not self.wanted("bulk_delete"):
+                return
+            source = self.log_set("count_%d" % count, count, COUNT_LOG_SIZE)
+            target = os.path.join(self.work, "delete")
+
+            def prepare():
+                # hard links: deleting them leaves the generated set alone
+                if os.path.isdir(target):
+                    shutil.rmtree(target)
+                os.makedirs(target)
+                paths = []
+                for name in sorted(os.listdir(source)):
+                    path = os.path.join(target, name)
+                    os.link(os.path.join(source, name), path)
+                    paths.append(path)
+                return lambda: ui.run_deletion(ui.plan_deletion(paths))
+
+            self.run("bulk_delete", {"files": count}, prepare)
+
+    def bench_update(self):
+        if not self.wanted("update.fetch_remote_version", "update.install_update"):
+            return
+        from CrashlogViewer import updater
+        www = os.path.join(self.work, "www")
+        if os.path.isdir(www):
+            shutil.rmtree(www)
+        os.makedirs(www)
+        zip_path = os.path.join(www, "main.zip")
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for root, dirs, files in os.walk(PLUGIN_DIR):
+                dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    zf.write(path, ZIP_PREFIX + os.path.relpath(path, PLUGIN_DIR).replace(os.sep, "/"))
+        with open(os.path.join(www, "version.txt"), "w") as f:
+            f.write("99.0\n")
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=www))
+        thread = threading.Thread(target=server.serve_forever, name="bench http")
+        thread.daemon = True
+        thread.start()
+        try:
+            base = "http://127.0.0.1:%d/" % server.server_address[1]
+            version_url = base + "version.txt"
+            cache_file = os.path.join(self.work, "CrashlogViewer_update.json")
+            params = {"zip_bytes": os.path.getsize(zip_path)}
+
+            def first():
+                if os.path.exists(cache_file):
+                    os.remove(cache_file)
+                return functools.partial(updater.fetch_remote_version, version_url, cache_file)
+
+            # ttl=0: the cached version is revalidated, the server answers 304
+            self.run("update.fetch_remote_version", {"cache": "none"}, first)
+            self.run("update.fetch_remote_version", {"cache": "expired"},
+                     lambda: functools.partial(updater.fetch_remote_version, version_url, cache_file, ttl=0))
+
+            target = os.path.join(self.work, "install", "Plugins", "Extensions", "CrashlogViewer")
+            staging = os.path.join(self.work, "install", ".CrashlogViewer-update")
+            if not os.path.isdir(target):
+                os.makedirs(target)
+            self.run("update.install_update", params,
+                     lambda: functools.partial(updater.install_update, base + "main.zip", target, staging))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def bench_web(self):
+        # the web access against localhost, on the largest debug log
+        if not self.wanted("web.lines", "web.range"):
+            return
+        from CrashlogViewer import webserver
+        size = self.profile["sizes"][-1]
+        directory = self.log_set("debug_%s" % size, 1, size, "debug")
+        # unmasked, so Range requests are served
+        server = webserver.LogWebServer(directory, port=0, host="127.0.0.1", raw=True)
+        server.start()
+        try:
+            base = "http://127.0.0.1:%d" % server.port
+            log_id = webserver.log_id(os.path.join(directory, os.listdir(directory)[0]))
+
+            def fetch(path, headers=None):
+                req = urllib.request.Request(base + path, headers=headers or {})
+                with urllib.request.urlopen(req) as r:
+                    return r.read()
+
+            info = json.loads(fetch("/api/logs/%s" % log_id).decode("utf-8"))
+            params = {"size": size, "lines": info["lines"]}
+            page = "/api/logs/%s/lines?start=%d&count=200" % (log_id, info["lines"] // 2)
+            self.run("web.lines", params, lambda: functools.partial(fetch, page, {"Accept-Encoding": "gzip"}))
+            middle = info["size"] // 2
+            self.run("web.range", params, lambda: functools.partial(
+                fetch, "/logs/%s" % log_id, {"Range": "bytes=%d-%d" % (middle, middle + 65535)}))
+        finally:
+            server.stop()
+
+    def run_all(self):
+        self.bench_list()
+        self.bench_view()
+        self.bench_delete()
+        self.bench_update()
+        self.bench_web()
+        return self.results
+
+
+def parse_args(argv):
+    p = argparse.ArgumentParser(description="Benchmark the CrashlogViewer hot paths on synthetic logs.")
+    p.add_argument("--profile", choices=sorted(PROFILES), default="quick",
+                   help="quick: up to 1000 logs / 20 MB, full: up to 10000 logs / 200 MB (default: quick)")
+    p.add_argument("--repeat", type=int, help="timed runs per benchmark (default: from the profile)")
+    p.add_argument("--only", action="append", metavar="NAME",
+                   help="run benchmarks whose name contains NAME (repeatable)")
+    p.add_argument("-o", "--output", help="JSON result file (default: stdout)")
+    p.add_argument("--workdir", help="keep generated logs here and reuse them (default: a temporary dir)")
+    p.add_argument("--baseline", help="earlier JSON result to compare against")
+    p.add_argument("--tolerance", type=float, default=0.2,
+                   help="allowed slowdown / memory growth against the baseline (default: 0.2 = 20%%)")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    profile = PROFILES[args.profile]
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+    work = args.workdir or tempfile.mkdtemp(prefix="crashlog-bench-")
+    if not os.path.isdir(work):
+        os.makedirs(work)
+    stdout = sys.stdout
+    started = time.time()
+    try:
+        # the plugin prints to stdout, which may carry the JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            bench = Bench(work, profile, args.repeat or profile["repeat"], args.only)
+            bench.load_plugin()
+            results = bench.run_all()
+    finally:
+        if not args.workdir:
+            shutil.rmtree(work, ignore_errors=True)
+
+    with open(os.path.join(PLUGIN_DIR, "version.txt")) as f:
+        version = f.read().strip()
+    data = {
+        "version": version,
+        "profile": args.profile,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "started": int(started),
+        "duration": time.time() - started,
+        "ui_import_seconds": bench.import_time,
+        # whole process, generation included
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "results": results,
+    }
+    if baseline is not None:
+        data["regressions"] = compare(results, baseline, args.tolerance)
+        for r in data["regressions"]:
+            print("[bench] regression: %s %s %s %s -> %s" % (r["name"], json.dumps(r["params"]), r["metric"],
+                                                              r["baseline"], r["value"]), file=sys.stderr)
+
+    out = open(args.output, "w") if args.output else stdout
+    try:
+        json.dump(data, out, indent=1)
+        out.write("\n")
+    finally:
+        if out is not stdout:
+            out.close()
+    return 1 if data.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
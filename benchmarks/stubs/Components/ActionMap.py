@@ -0,0 +1,9 @@
+class ActionMap(object):
+
+    def __init__(self, contexts, actions, prio=0):
+        self.contexts = contexts
+        self.actions = actions
+
+
+class HelpableActionMap(ActionMap):
+    pass
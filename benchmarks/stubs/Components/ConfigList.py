@@ -0,0 +1,12 @@
+class ConfigListScreen(object):
+
+    def __init__(self, list, session=None, on_change=None):
+        self.list = list
+
+    def keySave(self):
+        for entry in self.list:
+            entry[1].save()
+        self.close()
+
+    def keyCancel(self):
+        self.close()
@@ -0,0 +1,10 @@
+class Language(object):
+
+    def getLanguage(self):
+        return "en_EN"
+
+    def addCallback(self, callback):
+        pass
+
+
+language = Language()
@@ -0,0 +1,10 @@
+class ProgressBar(object):
+
+    def __init__(self):
+        self.value = 0
+
+    def setValue(self, value):
+        self.value = value
+
+    def getValue(self):
+        return self.value
@@ -0,0 +1,22 @@
+class ScrollLabel(object):
+
+    def __init__(self, text=""):
+        self.text = text
+
+    def setText(self, text):
+        self.text = text
+
+    def getText(self):
+        return self.text
+
+    def moveUp(self):
+        pass
+
+    def moveDown(self):
+        pass
+
+    def pageUp(self):
+        pass
+
+    def pageDown(self):
+        pass
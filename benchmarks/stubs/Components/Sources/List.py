@@ -0,0 +1,25 @@
+class List(object):
+
+    def __init__(self, list=None):
+        self.list = list or []
+        self.index = 0
+        self.onSelectionChanged = []
+
+    def setList(self, list):
+        self.list = list
+
+    def updateList(self, list):
+        self.list = list
+
+    def getCurrent(self):
+        if 0 <= self.index < len(self.list):
+            return self.list[self.index]
+        return None
+
+    def getIndex(self):
+        return self.index
+
+    def setIndex(self, index):
+        self.index = index
+        for f in self.onSelectionChanged:
+            f()
@@ -0,0 +1,10 @@
+class StaticText(object):
+
+    def __init__(self, text=""):
+        self.text = text
+
+    def setText(self, text):
+        self.text = text
+
+    def getText(self):
+        return self.text
@@ -0,0 +1,45 @@
+# settings keep their default value; save() does nothing
+class ConfigElement(object):
+
+    def __init__(self, default=None, **kwargs):
+        self.value = default
+        self.default = default
+
+    def save(self):
+        pass
+
+
+class ConfigYesNo(ConfigElement):
+    pass
+
+
+class ConfigInteger(ConfigElement):
+    pass
+
+
+class ConfigSelection(ConfigElement):
+    pass
+
+
+class ConfigText(ConfigElement):
+    pass
+
+
+class ConfigPassword(ConfigText):
+    pass
+
+
+class ConfigDirectory(ConfigElement):
+    pass
+
+
+class ConfigSubsection(object):
+    pass
+
+
+config = ConfigSubsection()
+config.plugins = ConfigSubsection()
+
+
+def getConfigListEntry(*args):
+    return args
@@ -0,0 +1,9 @@
+class PluginDescriptor(object):
+    WHERE_PLUGINMENU = 1
+    WHERE_EXTENSIONSMENU = 2
+    WHERE_MENU = 3
+    WHERE_SESSIONSTART = 4
+    WHERE_AUTOSTART = 5
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
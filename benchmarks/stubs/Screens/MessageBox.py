@@ -0,0 +1,5 @@
+class MessageBox(object):
+    TYPE_YESNO = 0
+    TYPE_INFO = 1
+    TYPE_WARNING = 2
+    TYPE_ERROR = 3
@@ -0,0 +1,18 @@
+# widgets are kept in the screen dict, nothing is drawn
+class Screen(dict):
+
+    def __init__(self, session, parent=None):
+        dict.__init__(self)
+        self.session = session
+        self.onClose = []
+        self.onLayoutFinish = []
+        self.onShown = []
+        self.title = ""
+
+    def setTitle(self, title):
+        self.title = title
+
+    def close(self, *retval):
+        for fnc in self.onClose:
+            fnc()
+        self.retval = retval
@@ -0,0 +1,2 @@
+class TryQuitMainloop(object):
+    pass
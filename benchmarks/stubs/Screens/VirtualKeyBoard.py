@@ -0,0 +1,2 @@
+class VirtualKeyBoard(object):
+    pass
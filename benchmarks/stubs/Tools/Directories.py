@@ -0,0 +1,5 @@
+SCOPE_PLUGINS = 1
+
+
+def resolveFilename(scope, path=""):
+    return "/usr/lib/enigma2/python/Plugins/" + path
@@ -0,0 +1,2 @@
+def LoadPixmap(path=None, cached=False):
+    return path
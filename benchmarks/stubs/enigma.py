@@ -0,0 +1,50 @@
+# enigma2 stub for the benchmarks: a 1920x1080 desktop and a timer that
+# only fires when asked to
+class _Size(object):
+
+    def width(self):
+        return 1920
+
+    def height(self):
+        return 1080
+
+
+class _Desktop(object):
+
+    def size(self):
+        return _Size()
+
+
+def getDesktop(n):
+    return _Desktop()
+
+
+class _Signal(list):
+
+    def get(self):
+        return self
+
+    def connect(self, fnc):
+        self.append(fnc)
+        return fnc
+
+
+class eTimer(object):
+
+    def __init__(self):
+        self.callback = []
+        self.timeout = _Signal()
+        self.active = False
+
+    def start(self, msec, singleshot=False):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def isActive(self):
+        return self.active
+
+    def fire(self):
+        for fnc in list(self.callback) + list(self.timeout):
+            fnc()
@@ -0,0 +1,7 @@
+# no main loop: calls run at once
+def callFromThread(fnc, *args, **kwargs):
+    fnc(*args, **kwargs)
+
+
+def callLater(delay, fnc, *args, **kwargs):
+    fnc(*args, **kwargs)
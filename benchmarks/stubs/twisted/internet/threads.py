@@ -0,0 +1,37 @@
+# deferToThread runs the function at once, so a benchmark measures the
+# background work as part of the call that started it
+class Failure(object):
+
+    def __init__(self, value):
+        self.value = value
+
+    def getErrorMessage(self):
+        return str(self.value)
+
+
+class Deferred(object):
+
+    def __init__(self, result=None, failure=None):
+        self.result = result
+        self.failure = failure
+
+    def addCallback(self, callback, *args, **kwargs):
+        if self.failure is None:
+            try:
+                self.result = callback(self.result, *args, **kwargs)
+            except Exception as e:
+                self.failure = Failure(e)
+        return self
+
+    def addErrback(self, errback, *args, **kwargs):
+        if self.failure is not None:
+            failure, self.failure = self.failure, None
+            self.result = errback(failure, *args, **kwargs)
+        return self
+
+
+def deferToThread(fnc, *args, **kwargs):
+    try:
+        return Deferred(fnc(*args, **kwargs))
+    except Exception as e:
+        return Deferred(failure=Failure(e))
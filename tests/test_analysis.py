@@ -0,0 +1,94 @@
+# -*- coding: UTF-8 -*-
+# headless analysis: summaries, groups and search, with and without a pool
+
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer.analysis import (analyse_log, analyse_logs, find_logs, format_size,  # noqa: E402
+                                     group_dict, group_summaries, search_logs)
+
+CRASH = (b"12:00:00.0000 enigma2 is starting\n"
+         b"warning: low memory\n"
+         b"Traceback (most recent call last):\n"
+         b"  File \"/usr/lib/enigma2/python/mytest.py\", line %d, in run\n"
+         b"KeyError: 'service'\n")
+
+
+class AnalysisTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.logs = []
+        for n in range(4):
+            self.logs.append(self.write("logs/enigma2_crash_%d.log" % n, CRASH % (n + 1), 1700000000 + n))
+        self.debug = self.write("logs/sub/enigma2_debug.log", b"plain debug log\n", 1700000100)
+        self.write("logs/readme.txt", b"not a log\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, data, mtime=None):
+        path = os.path.join(self.dir, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(data)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_format_size(self):
+        self.assertEqual([format_size(n) for n in (0, 1023, 1024, 1536 * 1024, 5 << 30)],
+                         ["0 B", "1023 B", "1.0 KB", "1.5 MB", "5.0 GB"])
+
+    def test_find_logs(self):
+        packed = self.write("logs/sub/enigma2_crash_9.log.gz", gzip.compress(CRASH % 9))
+        other = self.write("other.txt", b"named on the command line\n")
+        found = [path for path, st in find_logs([os.path.join(self.dir, "logs"), other])]
+        self.assertEqual(found, self.logs + [packed, self.debug, other])
+
+    def test_summary(self):
+        s = analyse_log(self.logs[0])
+        self.assertEqual(s["exception"], "KeyError: 'service'")
+        self.assertEqual(s["frame"], "/usr/lib/enigma2/python/mytest.py:1 run")
+        self.assertEqual((s["lines"], s["size"], s["mtime"]), (5, len(CRASH % 1), 1700000000))
+        self.assertEqual((s["critical"], s["error"], s["warning"], s["info"]), (0, 2, 1, 1))
+        self.assertIsNone(s["read_error"])
+        self.assertEqual(len(s["fingerprint"]), 12)
+        missing = analyse_log(os.path.join(self.dir, "missing.log"))
+        self.assertEqual(sorted(missing), ["path", "read_error"])
+
+    def test_pool_agrees(self):
+        paths = self.logs + [self.debug, os.path.join(self.dir, "missing.log")]
+        single = sorted(analyse_logs(paths, jobs=1), key=lambda s: s["path"])
+        pooled = sorted(analyse_logs(paths, jobs=2, chunksize=1), key=lambda s: s["path"])
+        self.assertEqual(pooled, single)
+
+    def test_groups(self):
+        summaries = list(analyse_logs(self.logs + [self.debug, os.path.join(self.dir, "missing.log")], jobs=1))
+        groups = [group_dict(g) for g in group_summaries(summaries)]
+        self.assertEqual([(g["count"], g["files"]) for g in groups], [(4, self.logs), (1, [self.debug])])
+        self.assertEqual((groups[0]["first_seen"], groups[0]["last_seen"]), (1700000000, 1700000003))
+        # the title of the first log of the group
+        self.assertEqual(groups[0]["title"], "KeyError: 'service' | mytest.py:1 run")
+        self.assertIsNone(groups[1]["title"])
+
+    def test_search(self):
+        paths = self.logs + [self.debug, os.path.join(self.dir, "missing.log")]
+        hits = search_logs(paths, "keyerror", jobs=1)
+        self.assertEqual(hits, [(path, 4, "KeyError: 'service'") for path in self.logs])
+        self.assertEqual(search_logs(paths, "keyerror", jobs=2), hits)
+        self.assertEqual(search_logs(paths, r"^\s+File", regex=True, limit=2, jobs=2),
+                         [(path, 3, "  File \"/usr/lib/enigma2/python/mytest.py\", line %d, in run" % (n + 1))
+                          for n, path in enumerate(self.logs[:2])])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+# -*- coding: UTF-8 -*-
+# block archives: compressed logs read back through their .idx
+
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer import archive  # noqa: E402
+from CrashlogViewer.archive import (INDEX_SUFFIX, ArchivedLineIndex, archive_old_logs, compress_log,  # noqa: E402
+                                    open_line_index, open_log)
+from CrashlogViewer.logindex import LineIndex  # noqa: E402
+
+DAY = 86400
+
+
+def make_log(n=400):
+    lines = [b"12:00:00.0000 line %d" % i + (b" ValueError: x" if i % 37 == 0 else b"") for i in range(n)]
+    lines[n // 4] = b"x" * 300
+    lines[n // 2] = b""
+    return b"\n".join(lines) + b"\nno newline at the end"
+
+
+class ArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.indexes = []
+
+    def tearDown(self):
+        for index in self.indexes:
+            index.close()
+        shutil.rmtree(self.dir)
+
+    def write(self, data, name="enigma2_crash_1.log", mtime=None):
+        path = os.path.join(self.dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def open(self, path, state=None):
+        index = open_line_index(path, state)
+        self.indexes.append(index)
+        return index
+
+    def assertSameLines(self, index, plain):
+        self.assertEqual(index.lines, plain.lines)
+        for start in range(-3, plain.lines + 2, 23):
+            for count in (1, 5, 40):
+                self.assertEqual(index.window(start, count), plain.window(start, count), (start, count))
+        self.assertEqual(index.window(0, plain.lines + 5), plain.window(0, plain.lines))
+        self.assertEqual(index.error_lines(), plain.error_lines())
+
+    def test_round_trip(self):
+        data = make_log()
+        plain = LineIndex(self.write(data, "plain.log"))
+        self.indexes.append(plain)
+        for fmt in archive.archive_formats():
+            path = self.write(data, mtime=1700000000)
+            target = compress_log(path, fmt, block_size=512)
+            self.assertEqual(target, path + "." + fmt)
+            self.assertFalse(os.path.exists(path))
+            self.assertFalse(os.path.exists(target + ".tmp"))
+            self.assertEqual(os.path.getmtime(target), 1700000000)
+            with open_log(target) as f:
+                self.assertEqual(f.read(), data)
+            index = self.open(target)
+            self.assertIsInstance(index, ArchivedLineIndex)
+            self.assertTrue(index.indexed)
+            self.assertGreater(len(index.blocks), 10)
+            self.assertEqual(index.size, len(data))
+            # every block starts at a line start
+            for line, uoff, coff in index.blocks:
+                self.assertTrue(uoff == 0 or data[uoff - 1:uoff] == b"\n")
+                self.assertEqual(data[:uoff].count(b"\n"), line)
+            self.assertSameLines(index, plain)
+            # the state opens it again without reading the .idx
+            os.remove(target + INDEX_SUFFIX)
+            self.assertSameLines(self.open(target, index.state()), plain)
+
+    def test_long_line(self):
+        data = b"short\n" + b"y" * 5000 + b"\nend\n"
+        target = compress_log(self.write(data), block_size=256)
+        index = self.open(target)
+        self.assertEqual(index.lines, 3)
+        self.assertEqual(index.window(0, 3), ["short", "y" * 5000, "end"])
+
+    def test_without_index(self):
+        # .gz files made elsewhere are streamed from their start
+        data = make_log(100)
+        plain = LineIndex(self.write(data, "plain.log"))
+        self.indexes.append(plain)
+        path = os.path.join(self.dir, "enigma2_crash_2.log.gz")
+        with gzip.open(path, "wb") as f:
+            f.write(data)
+        index = self.open(path)
+        self.assertFalse(index.indexed)
+        self.assertSameLines(index, plain)
+
+    def test_empty(self):
+        index = self.open(compress_log(self.write(b"")))
+        self.assertEqual((index.lines, index.window(0, 5)), (0, []))
+
+    def test_failed_compress_leaves_log(self):
+        path = self.write(b"data\n")
+        # the sidecar index cannot be written
+        os.mkdir(path + ".gz.tmp" + INDEX_SUFFIX)
+        self.assertRaises(EnvironmentError, compress_log, path)
+        self.assertTrue(os.path.exists(path))
+        self.assertFalse(os.path.exists(path + ".gz"))
+        self.assertFalse(os.path.exists(path + ".gz.tmp"))
+
+    def test_archive_old_logs(self):
+        now = 1700000000
+        old = self.write(b"old\n", "enigma2_crash_1.log", now - 10 * DAY)
+        new = self.write(b"new\n", "enigma2_crash_2.log", now - DAY)
+        packed = self.write(b"", "enigma2_crash_3.log.gz", now - 10 * DAY)
+        entries = [(path, os.stat(path)) for path in (old, new, packed)]
+        self.assertEqual(archive_old_logs(entries, 5, now=now), [(old, old + ".gz")])
+        self.assertEqual(sorted(os.listdir(self.dir)), ["enigma2_crash_1.log.gz", "enigma2_crash_1.log.gz.idx",
+                                                        "enigma2_crash_2.log", "enigma2_crash_3.log.gz"])
+        # very recent logs are never archived
+        entries = [(new, os.stat(new))]
+        self.assertEqual(archive_old_logs(entries, 0, now=now - DAY + 60), [])
+
+    def test_remove_log(self):
+        target = compress_log(self.write(b"data\n"))
+        archive.remove_log(target)
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
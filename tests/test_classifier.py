@@ -0,0 +1,135 @@
+# -*- coding: UTF-8 -*-
+# severity rules: the literal prefilter never hides a line the rules match
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer import classifier, diag  # noqa: E402
+from CrashlogViewer.classifier import RULES_FILE, Classifier, load_rules, parse_rules, rule_literals  # noqa: E402
+
+LINES = [
+    "FATAL SIGNAL 11", "fatal signal 11", "Segmentation Fault at 0x0", "SEGFAULT", "kernel: oom-killer invoked",
+    "Cannot Allocate Memory", "write failed: No space left on device", "no space left on device",
+    "Traceback (most recent call last):", "traceback (most recent call last):", "ValueError: x", "error: lower",
+    "KeyError:", "Frontend0 tuning ... failed", "FRONTEND1 TIMEOUT", "frontend: ok", "Input/output error",
+    "read-only file system", "Read-only file system", "WARNING low", "warn", "swarning", "Tune Failed",
+    "lost lock on 11.0E", "NO SIGNAL", "enigma2 is starting", "ENIGMA2 IS STARTING", "PYTHONPATH=/usr/lib",
+    "plain line", "", "\r", "12:00:00.0000 nothing to see",
+]
+
+CUSTOM = """
+critical  a      ab?c
+error     b      (?i:x+yz)|Q{2}R
+error     c      [Ee]rr(?:or|no)\\b
+warning   d      (?:dead|beef)\\d+
+warning   e      ^start$
+info      f      (?<!no )luck
+info      g      foo\\s+bar
+"""
+
+
+def corpus(seed, lines, n=3000):
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        text = rnd.choice(lines)
+        if rnd.random() < 0.3:
+            text = "".join(c.upper() if rnd.random() < 0.5 else c.lower() for c in text)
+        if rnd.random() < 0.2:
+            text = "%02d:%02d prefix %s suffix" % (i % 24, i % 60, text)
+        out.append(text)
+    return ("\n".join(out) + "\n").encode("utf-8")
+
+
+class ClassifierTest(unittest.TestCase):
+
+    def assertPrefilterKeepsMatches(self, rules, data):
+        c = Classifier(rules)
+        self.assertIsNotNone(c.prefilter)
+        tags = c.scan(data, limit=len(data))
+        full = Classifier(rules)
+        full.prefilter = None
+        self.assertEqual(tags, full.scan(data, limit=len(data)))
+        # and the same as classifying every line
+        expected = []
+        for n, raw in enumerate(data.split(b"\n")):
+            rule = c.classify_line(raw)
+            if rule is not None:
+                expected.append((n, rule))
+        self.assertEqual([(line, rule) for line, rule, text in tags], expected)
+        return tags
+
+    def test_shipped_rules(self):
+        rules, errors = load_rules((RULES_FILE,))
+        self.assertEqual(errors, [])
+        for seed in range(5):
+            self.assertTrue(self.assertPrefilterKeepsMatches(rules, corpus(seed, LINES)))
+
+    def test_custom_rules(self):
+        rules, errors = parse_rules(CUSTOM)
+        self.assertEqual(errors, [])
+        lines = ["ac", "abc", "ABC", "xyz", "xxxYZ", "QQR", "qqr", "Error", "errno", "Errors", "dead1", "BEEF22",
+                 "start", "start ", "luck", "no luck", "good luck", "foo", "bar", "foo \tbar", "nothing"]
+        for seed in range(5):
+            self.assertTrue(self.assertPrefilterKeepsMatches(rules, corpus(seed, lines)))
+
+    def test_block_boundaries(self):
+        rules, errors = load_rules((RULES_FILE,))
+        data = corpus(1, LINES, 500)
+        expected = Classifier(rules).scan(data, limit=len(data))
+        old = classifier.SCAN_BLOCK
+        try:
+            for block in (50, 333, 4096):
+                classifier.SCAN_BLOCK = block
+                self.assertEqual(Classifier(rules).scan(data, limit=len(data)), expected, block)
+        finally:
+            classifier.SCAN_BLOCK = old
+
+    def test_most_severe_rule_wins(self):
+        c = Classifier(load_rules((RULES_FILE,))[0])
+        self.assertEqual(c.describe(c.classify_line(b"warning: FATAL SIGNAL")), ("critical", "signal"))
+        self.assertEqual(c.describe(c.classify_line(b"no signal, ValueError: x")), ("error", "python"))
+        self.assertIsNone(c.classify_line(b"plain line"))
+
+    def test_rule_without_literal_disables_prefilter(self):
+        rules, errors = parse_rules("error x [0-9]+[.,][0-9]+\nerror y panic")
+        c = Classifier(rules)
+        self.assertIsNone(c.prefilter)
+        self.assertEqual([(line, rule) for line, rule, text in c.scan(b"a\n1,5\npanic\n")], [(1, 0), (2, 1)])
+
+    def test_rule_literals(self):
+        self.assertEqual(rule_literals(b"FATAL SIGNAL"), [b"fatal signal"])
+        # a prefix the branches share is taken out of them
+        self.assertEqual(sorted(rule_literals(b"(?i:out of memory|oom-killer)")), [b"om-killer", b"ut of memory"])
+        self.assertEqual(rule_literals(b"\\w*Error:"), [b"error:"])
+        # the longest run, not one that may be left out
+        self.assertEqual(rule_literals(b"ab?cdef"), [b"cdef"])
+        self.assertIsNone(rule_literals(b"a|\\d"))
+        self.assertIsNone(rule_literals(b"[ab]+"))
+
+    def test_parse_errors(self):
+        rules, errors = parse_rules("# comment\n\nerror x\nfatal x y\nerror x (\nwarning w  two words \n")
+        self.assertEqual([n for n, error in errors], [3, 4, 5])
+        self.assertEqual([(r.severity, r.category, r.pattern) for r in rules], [("warning", "w", "two words")])
+
+    def test_errors_are_logged(self):
+        old = diag._diagnostics, classifier._classifier, classifier.load_rules
+        diag._diagnostics = diag.Diagnostics(path=None, echo_level=diag.ERROR + 1)
+        classifier._classifier = None
+        classifier.load_rules = lambda: parse_rules("error x (\nerror y panic")
+        try:
+            self.assertEqual(len(classifier.get_classifier().rules), 1)
+            messages = diag._diagnostics.snapshot()[3]
+            self.assertEqual([(level, msg.split(":")[0]) for t, level, msg in messages],
+                             [(diag.WARNING, "Severity rules line 1")])
+        finally:
+            diag._diagnostics, classifier._classifier, classifier.load_rules = old
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+# -*- coding: UTF-8 -*-
+# crash log parser: the three ways of feeding it agree
+
+import gzip
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer import crashparser  # noqa: E402
+from CrashlogViewer.classifier import RULES_FILE, Classifier, load_rules  # noqa: E402
+from CrashlogViewer.crashparser import CrashReport, parse_blocks, parse_buffer, parse_file, parse_stream  # noqa: E402
+
+LOG = b"""12:00:00.0000 [Avahi] enigma2 is starting
+12:00:01.0000 some ordinary line\r
+< 123.456> old style line
+12:00:02.0000 Traceback (most recent call last):
+12:00:02.0000   File "/usr/lib/enigma2/python/mytest.py", line 10, in <module>
+12:00:02.0000     main()
+12:00:02.0000   File "/usr/lib/enigma2/python/Screens/InfoBar.py", line 42, in keyOk
+12:00:02.0000 AttributeError: 'NoneType' object has no attribute 'x'
+ordinary\x0bline with \x85 separators
+FATAL SIGNAL 11
+-------------------------------------
+Backtrace:
+/usr/bin/enigma2(handleFatalSignal+0x1c) [0x4a1c2c]
+/lib/libc.so.6(__default_rt_sa_restorer+0x0) [0x76a1b2c0]
+/usr/lib/libpython3.so(PyObject_Call+0x44) [0x76e0a004]
+/usr/bin/enigma2(_ZN5eMain3runEv+0x10) [0x400100]
+-------------------------------------
+Registers:
+ r0 = 0x00000000
+ r1 = 0x7ef3a4b8
+/proc/self/maps:
+00400000-00800000 r-xp 00000000 1f:02 123 /usr/bin/enigma2
+76a00000-76b00000 r-xp 00000000 1f:02 456 /lib/libc.so.6
+
+----- enigma2 settings -----
+config.misc.firstrun=false
+config.usage.setup_level=expert
+----- dmesg -----
+[    1.234567] Linux version 4.4.35
+<6>[    2.000000] usb 1-1: new high-speed USB device
+last line without newline"""
+
+
+def variants(seed, count=20):
+    # logs made of the lines above in another order, cut and repeated
+    rnd = random.Random(seed)
+    lines = LOG.split(b"\n")
+    for n in range(count):
+        picked = [rnd.choice(lines) for i in range(rnd.randint(0, 80))]
+        data = b"\n".join(picked)
+        if rnd.random() < 0.5:
+            data += b"\n"
+        yield data
+
+
+class ParserTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.read_block = crashparser.READ_BLOCK
+
+    def tearDown(self):
+        crashparser.READ_BLOCK = self.read_block
+        shutil.rmtree(self.dir)
+
+    def assertAgree(self, data):
+        expected = parse_stream(io.BytesIO(data)).to_dict()
+        self.assertEqual(parse_buffer(data).to_dict(), expected)
+        for block in (1, 7, 64, 1 << 20):
+            crashparser.READ_BLOCK = block
+            self.assertEqual(parse_blocks(io.BytesIO(data)).to_dict(), expected, block)
+        return expected
+
+    def test_report(self):
+        r = CrashReport.from_dict(self.assertAgree(LOG))
+        self.assertEqual(r.lines, LOG.count(b"\n") + 1)
+        self.assertEqual(r.size, len(LOG))
+        self.assertEqual(r.signal, 11)
+        self.assertEqual(r.exception_type, "AttributeError")
+        self.assertEqual(r.exception_message, "'NoneType' object has no attribute 'x'")
+        self.assertEqual(r.frames, [("/usr/lib/enigma2/python/mytest.py", 10, "<module>"),
+                                    ("/usr/lib/enigma2/python/Screens/InfoBar.py", 42, "keyOk")])
+        # with a signal the crash is in the first native frame
+        self.assertEqual(r.module, "/usr/lib/libpython3.so")
+        self.assertEqual(r.tracebacks, 1)
+        # the signal handler frames are left out
+        self.assertEqual(r.native_frames, [("/usr/lib/libpython3.so", "PyObject_Call+0x44", "0x76e0a004"),
+                                           ("/usr/bin/enigma2", "_ZN5eMain3runEv+0x10", "0x400100")])
+        self.assertEqual([(s.kind, s.start_line) for s in r.sections],
+                         [("traceback", 3), ("backtrace", 9), ("registers", 17), ("maps", 20),
+                          ("settings", 24), ("dmesg", 27)])
+        self.assertEqual(r.summary(short=True), "SIGNAL 11 | AttributeError: 'NoneType' object has no attribute 'x' | "
+                                                "InfoBar.py:42 keyOk")
+
+    def test_section_offsets(self):
+        r = parse_buffer(LOG)
+        lines = LOG.split(b"\n")
+        for s in r.sections:
+            text = LOG[s.start_offset:s.end_offset].split(b"\n")
+            if not text[-1]:
+                text.pop()
+            self.assertEqual(text, lines[s.start_line:s.end_line], s)
+
+    def test_variants(self):
+        for data in variants(1):
+            self.assertAgree(data)
+
+    def test_empty(self):
+        self.assertEqual(self.assertAgree(b"")["lines"], 0)
+        self.assertEqual(self.assertAgree(b"\n\n")["lines"], 2)
+
+    def test_parse_file(self):
+        path = os.path.join(self.dir, "enigma2_crash_1.log")
+        with open(path, "wb") as f:
+            f.write(LOG)
+        with gzip.open(path + ".gz", "wb") as f:
+            f.write(LOG)
+        expected = parse_buffer(LOG).to_dict()
+        classifier = Classifier(load_rules((RULES_FILE,))[0])
+        plain = parse_file(path, classifier=classifier)
+        packed = parse_file(path + ".gz", classifier=classifier)
+        self.assertEqual(plain.to_dict(), expected)
+        self.assertEqual(packed.to_dict(), expected)
+        self.assertEqual(plain.tags, packed.tags)
+        self.assertEqual([line for line, rule, text in plain.tags], [0, 3, 7, 9])
+
+    def test_round_trip(self):
+        r = parse_buffer(LOG)
+        copy = CrashReport.from_dict(r.to_dict())
+        self.assertEqual(copy.to_dict(), r.to_dict())
+        self.assertEqual(copy.summary(), r.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
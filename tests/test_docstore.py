@@ -0,0 +1,168 @@
+# -*- coding: UTF-8 -*-
+# opened documents: least recently used out first, reloaded when the file changes
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer import docstore  # noqa: E402
+from CrashlogViewer.docstore import Document, DocumentCache, Prefetcher, load_document, neighbours  # noqa: E402
+from CrashlogViewer.logcache import stat_key  # noqa: E402
+
+LOG = b"".join(b"12:00:00.0000 line %d\n" % n for n in range(50)) + b"ValueError: x\n"
+
+
+class DocstoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.paged_size = docstore.PAGED_LOG_SIZE
+        self.load_document = docstore.load_document
+
+    def tearDown(self):
+        docstore.PAGED_LOG_SIZE = self.paged_size
+        docstore.load_document = self.load_document
+        shutil.rmtree(self.dir)
+
+    def write(self, name, data=LOG):
+        path = os.path.join(self.dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def docs(self, n):
+        return [load_document(self.write("enigma2_crash_%d.log" % i)) for i in range(n)]
+
+    def test_load_document(self):
+        doc = load_document(self.write("small.log"))
+        self.assertEqual(len(doc.lines), 51)
+        self.assertIsNone(doc.index_state)
+        self.assertEqual(doc.key, stat_key(os.stat(doc.path)))
+        self.assertEqual(doc.report.lines, 51)
+        # large logs keep the index state instead of the lines
+        docstore.PAGED_LOG_SIZE = 100
+        paged = load_document(doc.path)
+        self.assertIsNone(paged.lines)
+        self.assertIsNotNone(paged.index_state)
+        self.assertLess(paged.cost, doc.cost)
+        index = paged.open_index()
+        try:
+            self.assertEqual(index.window(0, 51), [line.rstrip("\n") for line in doc.lines])
+        finally:
+            index.close()
+
+    def test_lru_eviction(self):
+        a, b, c, d = self.docs(4)
+        cache = DocumentCache(budget=3 * a.cost)
+        for doc in (a, b, c):
+            cache.put(doc)
+        self.assertEqual(cache.used, 3 * a.cost)
+        # a is used again, so b is the oldest now
+        self.assertIs(cache.get(a.path), a)
+        cache.put(d)
+        self.assertEqual(list(cache.docs), [c.path, a.path, d.path])
+        self.assertIsNone(cache.get(b.path))
+        self.assertEqual(cache.used, 3 * a.cost)
+
+    def test_put_replaces(self):
+        a, b = self.docs(2)
+        cache = DocumentCache(budget=10 * a.cost)
+        cache.put(a)
+        cache.put(b)
+        cache.put(load_document(a.path))
+        self.assertEqual(list(cache.docs), [b.path, a.path])
+        self.assertEqual(cache.used, a.cost + b.cost)
+        # a document over the budget is not kept, nor the one it replaces
+        big = Document(a.path, a.key, a.report, lines=["x" * 100] * (10 * a.cost // 100))
+        cache.put(big)
+        self.assertEqual(list(cache.docs), [b.path])
+        self.assertEqual(cache.used, b.cost)
+        cache.discard(b.path)
+        cache.discard(b.path)
+        self.assertEqual((len(cache.docs), cache.used), (0, 0))
+
+    def test_changed_file(self):
+        a, = self.docs(1)
+        cache = DocumentCache()
+        cache.put(a)
+        st = os.stat(a.path)
+        self.assertTrue(cache.has(a.path, st))
+        with open(a.path, "ab") as f:
+            f.write(b"one more line\n")
+        self.assertFalse(cache.has(a.path, os.stat(a.path)))
+        self.assertIsNone(cache.get(a.path))
+        os.remove(a.path)
+        self.assertIsNone(cache.get(a.path))
+
+    def test_load(self):
+        path = self.write("enigma2_crash_1.log")
+        cache = DocumentCache()
+        doc = cache.load(path)
+        self.assertIs(cache.load(path), doc)
+        self.assertEqual(cache.loading, {})
+        self.write("enigma2_crash_1.log", LOG + b"more\n")
+        self.assertEqual(len(cache.load(path).lines), 52)
+
+    def test_load_once(self):
+        # a second thread waits for the first load instead of loading again
+        path = self.write("enigma2_crash_1.log")
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow_load(*args):
+            calls.append(args[0])
+            started.set()
+            release.wait(5)
+            return self.load_document(*args)
+        docstore.load_document = slow_load
+        cache = DocumentCache()
+        results = []
+        first = threading.Thread(target=lambda: results.append(cache.load(path)))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=lambda: results.append(cache.load(path)))
+        second.start()
+        time.sleep(0.05)
+        release.set()
+        first.join(5)
+        second.join(5)
+        self.assertEqual(calls, [path])
+        self.assertEqual(len(results), 2)
+        self.assertIs(results[0], results[1])
+
+    def test_failed_load(self):
+        cache = DocumentCache()
+        self.assertRaises(OSError, cache.load, os.path.join(self.dir, "missing.log"))
+        self.assertEqual(cache.loading, {})
+        path = self.write("enigma2_crash_1.log")
+        docstore.load_document = lambda *args: 1 / 0
+        self.assertRaises(ZeroDivisionError, cache.load, path)
+        self.assertEqual(cache.loading, {})
+
+    def test_prefetch(self):
+        paths = [self.write("enigma2_crash_%d.log" % i) for i in range(3)]
+        cache = DocumentCache()
+        Prefetcher(cache).want(neighbours(paths, 1))
+        deadline = time.time() + 5
+        while len(cache.docs) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(list(cache.docs), [paths[1], paths[2], paths[0]])
+
+    def test_neighbours(self):
+        paths = list("abcde")
+        self.assertEqual(neighbours(paths, 2), ["c", "d", "b"])
+        self.assertEqual(neighbours(paths, 0, 2), ["a", "b", "c"])
+        self.assertEqual(neighbours(paths, 4, 2), ["e", "d", "c"])
+        self.assertEqual(neighbours(paths, 5), ["e"])
+        self.assertEqual(neighbours([], 0), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
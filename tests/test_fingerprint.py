@@ -0,0 +1,82 @@
+# -*- coding: UTF-8 -*-
+# crash signatures: one bug, one signature
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer.crashparser import parse_buffer  # noqa: E402
+from CrashlogViewer.fingerprint import NO_SIGNATURE, fingerprint, group_logs, normalize, signature_parts  # noqa: E402
+
+TRACEBACK = """12:%02d:00.0000 Traceback (most recent call last):
+  File "/usr/lib/enigma2/python/mytest.py", line %d, in <module>
+  File "/usr/lib/enigma2/python/Plugins/Extensions/Foo/plugin.py", line %d, in main
+  File "/usr/lib/enigma2/python/Components/Sources/List.py", line %d, in setList
+%s: list index out of range (pid %d)
+"""
+
+BACKTRACE = """FATAL SIGNAL %d
+Backtrace:
+/usr/bin/enigma2(handleFatalSignal+0x1c) [0x4a1c2c]
+/usr/lib/libpython3.so(PyObject_Call+0x%x) [0x%08x]
+/usr/bin/enigma2(_ZN5eMain3runEv+%d) [0x400100]
+"""
+
+
+def crash(minute=0, lines=(1, 2, 3), exc="IndexError", pid=100):
+    return parse_buffer((TRACEBACK % ((minute,) + lines + (exc, pid))).encode("utf-8"))
+
+
+def segfault(signal=11, offset=0x44, address=0x76e0a004, n=16):
+    return parse_buffer((BACKTRACE % (signal, offset, address, n)).encode("utf-8"))
+
+
+class FingerprintTest(unittest.TestCase):
+
+    def test_stable_across_runs(self):
+        first = fingerprint(crash())
+        self.assertEqual(len(first), 12)
+        # time, line numbers and the message do not matter
+        self.assertEqual(fingerprint(crash(30, (10, 20, 30), pid=4242)), first)
+        self.assertNotEqual(fingerprint(crash(exc="KeyError")), first)
+        # the stored signatures stay valid across releases
+        self.assertEqual(first, "9f1799d88cfc")
+
+    def test_native(self):
+        first = fingerprint(segfault())
+        self.assertEqual(fingerprint(segfault(offset=0x80, address=0x77000000, n=99)), first)
+        self.assertNotEqual(fingerprint(segfault(signal=6)), first)
+        self.assertEqual(signature_parts(segfault()),
+                         ["SIGNAL 11", "libpython3.so(PyObject_Call)", "enigma2(_ZN#eMain#runEv)"])
+
+    def test_innermost_frames(self):
+        self.assertEqual(signature_parts(crash()),
+                         ["IndexError", "mytest.py:<module>", "plugin.py:main", "List.py:setList"])
+        self.assertEqual(signature_parts(crash(), frames=1), ["IndexError", "List.py:setList"])
+
+    def test_no_crash(self):
+        self.assertEqual(fingerprint(parse_buffer(b"just a debug log\n")), NO_SIGNATURE)
+
+    def test_normalize(self):
+        self.assertEqual(normalize("f+0x1c at 0xdeadbeef, 76e0a004 pid 12"), "f at #, # pid #")
+        self.assertEqual(normalize(None), "")
+
+    def test_group_logs(self):
+        groups = group_logs([
+            ("/a.log", 100, "aaa", "IndexError"),
+            ("/b.log", 300, "", "no crash"),
+            ("/c.log", 200, "bbb", "KeyError"),
+            ("/d.log", 50, "aaa", "IndexError"),
+            ("/e.log", 400, "aaa", "IndexError"),
+        ])
+        self.assertEqual([(g.signature, g.files, g.count) for g in groups],
+                         [("aaa", ["/a.log", "/d.log", "/e.log"], 3), ("bbb", ["/c.log"], 1), ("", ["/b.log"], 1)])
+        self.assertEqual((groups[0].first_seen, groups[0].last_seen, groups[0].title), (50, 400, "IndexError"))
+        self.assertEqual(group_logs([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
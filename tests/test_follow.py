@@ -0,0 +1,137 @@
+# -*- coding: UTF-8 -*-
+# follow mode: appended lines, truncation and rotation of a real file
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer import follow  # noqa: E402
+from CrashlogViewer.follow import EVENT_MISSING, EVENT_ROTATED, EVENT_TRUNCATED, LogFollower  # noqa: E402
+
+
+class FollowTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "enigma2_debug.log")
+        self.followers = []
+        self.seed = follow.FOLLOW_SEED
+        self.max_read = follow.FOLLOW_MAX_READ
+
+    def tearDown(self):
+        follow.FOLLOW_SEED = self.seed
+        follow.FOLLOW_MAX_READ = self.max_read
+        for f in self.followers:
+            f.close()
+        shutil.rmtree(self.dir)
+
+    def write(self, data, mode="ab", path=None):
+        with open(path or self.path, mode) as f:
+            f.write(data)
+
+    def follower(self, **kwargs):
+        f = LogFollower(self.path, **kwargs)
+        self.followers.append(f)
+        return f
+
+    def test_seed_and_append(self):
+        self.write(b"one\ntwo\r\nthree")
+        f = self.follower()
+        self.assertEqual(list(f.lines), ["one", "two"])
+        self.assertEqual(f.check(force=True), (0, None))
+        self.write(b" and more\nfour\nfi")
+        self.assertEqual(f.check(force=True), (2, None))
+        self.assertEqual(list(f.lines), ["one", "two", "three and more", "four"])
+        self.write(b"ve\n")
+        self.assertEqual(f.check(force=True), (1, None))
+        self.assertEqual(f.lines[-1], "five")
+
+    def test_seed_cuts_first_line(self):
+        follow.FOLLOW_SEED = 10
+        self.write(b"first line\nsecond\nthird\n")
+        self.assertEqual(list(self.follower().lines), ["third"])
+
+    def test_truncated(self):
+        self.write(b"old line 1\nold line 2\n")
+        f = self.follower()
+        self.write(b"new\n", "wb")
+        self.assertEqual(f.check(force=True), (1, EVENT_TRUNCATED))
+        self.assertEqual(list(f.lines), ["old line 1", "old line 2", "----- truncated -----", "new"])
+        # nothing happens after the event
+        self.assertEqual(f.check(force=True), (0, None))
+
+    def test_rotated(self):
+        self.write(b"before\n")
+        f = self.follower()
+        self.write(b"late write to the old file\n")
+        os.rename(self.path, self.path + ".1")
+        self.write(b"after 1\nafter 2\n")
+        self.assertEqual(f.check(force=True), (2, EVENT_ROTATED))
+        self.assertEqual(list(f.lines)[-3:], ["----- rotated -----", "after 1", "after 2"])
+        self.write(b"after 3\n")
+        self.assertEqual(f.check(force=True), (1, None))
+
+    def test_missing(self):
+        self.write(b"line\n")
+        f = self.follower()
+        os.remove(self.path)
+        self.assertEqual(f.check(force=True), (0, EVENT_MISSING))
+        # the new file may get the old inode number, and here also its size
+        self.write(b"back\n")
+        count, event = f.check(force=True)
+        self.assertEqual(count, 1)
+        self.assertEqual(f.lines[-1], "back")
+
+    def test_bounded_reads(self):
+        follow.FOLLOW_MAX_READ = 10
+        self.write(b"")
+        f = self.follower()
+        self.write(b"".join(b"line %02d\n" % n for n in range(5)))
+        counts = []
+        while True:
+            count, event = f.check()
+            if not count and not f.more:
+                break
+            counts.append(count)
+        self.assertEqual(sum(counts), 5)
+        self.assertGreater(len(counts), 3)
+        self.assertEqual(list(f.lines), ["line %02d" % n for n in range(5)])
+
+    def test_rings(self):
+        self.write(b"")
+        f = self.follower(max_lines=3)
+        self.write(b"a\nValueError: x\nb\nc\nFATAL SIGNAL 11\n")
+        self.assertEqual(f.check(force=True), (5, None))
+        self.assertEqual(list(f.lines), ["b", "c", "FATAL SIGNAL 11"])
+        self.assertEqual(list(f.errors), ["ValueError: x", "FATAL SIGNAL 11"])
+
+    def test_long_partial_line(self):
+        self.write(b"")
+        f = self.follower()
+        self.write(b"z" * (follow.MAX_PARTIAL + 1))
+        self.assertEqual(f.check(force=True), (1, None))
+        self.assertEqual(f.partial, b"")
+
+    def test_inotify(self):
+        self.write(b"line\n")
+        f = self.follower()
+        if not f.watch.available:
+            self.skipTest("no inotify")
+        self.assertEqual(f.check(), (0, None))
+        self.write(b"new\n")
+        self.assertEqual(f.check(), (1, None))
+        # no event, no stat
+        os.remove(self.path)
+        self.write(b"unseen\n", path=self.path + ".other")
+        f.watch.changed()
+        self.assertEqual(f.check(), (0, None))
+        self.assertEqual(f.check(force=True), (0, EVENT_MISSING))
+
+
+if __name__ == "__main__":
+    unittest.main()
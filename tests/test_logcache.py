@@ -0,0 +1,137 @@
+# -*- coding: UTF-8 -*-
+# per-log metadata cache: keyed by stat, kept across a restart
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer import logcache  # noqa: E402
+from CrashlogViewer.crashparser import parse_buffer  # noqa: E402
+from CrashlogViewer.fingerprint import fingerprint  # noqa: E402
+from CrashlogViewer.logcache import LogMetaCache, parse_missing, stat_key  # noqa: E402
+from CrashlogViewer.mounts import Mount  # noqa: E402
+
+CRASH = (b"Traceback (most recent call last):\n"
+         b"  File \"/usr/lib/enigma2/python/mytest.py\", line 7, in run\n"
+         b"KeyError: 'x'\n")
+
+
+class Table(object):
+    # the root file system and a network share
+
+    def resolve(self, path):
+        if path.startswith("/media/net/"):
+            return Mount("//nas/logs", "/media/net", "cifs", "rw")
+        return Mount("/dev/root", "/", "ext4", "rw")
+
+
+class Stat(object):
+
+    def __init__(self, size, mtime, ino=1):
+        self.st_dev = 1
+        self.st_ino = ino
+        self.st_size = size
+        self.st_mtime = mtime
+
+
+class LogCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.dir, "index.json")
+        self.report = parse_buffer(CRASH)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_get_put(self):
+        cache = LogMetaCache(self.cache_file)
+        st = Stat(100, 1000.5)
+        self.assertIsNone(cache.get("/a.log", st))
+        cache.put("/a.log", st, self.report)
+        self.assertTrue(cache.dirty)
+        report = cache.get("/a.log", st)
+        self.assertEqual(report.summary(), self.report.summary())
+        # the section index is not kept
+        self.assertEqual(report.sections, [])
+        self.assertEqual(cache.signature("/a.log", st), fingerprint(self.report))
+        # any change of the stat key makes the entry stale
+        for other in (Stat(101, 1000.5), Stat(100, 1001), Stat(100, 1000.5, ino=2)):
+            self.assertIsNone(cache.get("/a.log", other))
+            self.assertIsNone(cache.signature("/a.log", other))
+        # only whole seconds count
+        self.assertIsNotNone(cache.get("/a.log", Stat(100, 1000.9)))
+
+    def test_missing(self):
+        cache = LogMetaCache(self.cache_file)
+        cache.put("/a.log", Stat(100, 1000), self.report)
+        files = [("/a.log", Stat(100, 1000)), ("/b.log", Stat(5, 1000)), ("/a.log", Stat(200, 1000))]
+        self.assertEqual(cache.missing(files), files[1:])
+
+    def test_save_load(self):
+        cache = LogMetaCache(self.cache_file)
+        st = Stat(100, 1000)
+        cache.put("/a.log", st, self.report)
+        cache.save()
+        self.assertFalse(cache.dirty)
+        self.assertFalse(os.path.exists(self.cache_file + ".tmp"))
+        again = LogMetaCache(self.cache_file)
+        self.assertEqual(again.get("/a.log", st).to_dict(), cache.get("/a.log", st).to_dict())
+        self.assertEqual(again.signature("/a.log", st), fingerprint(self.report))
+
+    def test_load_bad_file(self):
+        for text in ("{", '{"version": 1, "entries": {"/a.log": {}}}'):
+            with open(self.cache_file, "w") as f:
+                f.write(text)
+            self.assertEqual(LogMetaCache(self.cache_file).entries, {})
+
+    def test_save_failure(self):
+        cache = LogMetaCache(os.path.join(self.dir, "missing", "index.json"))
+        cache.put("/a.log", Stat(1, 1), self.report)
+        cache.save()
+        self.assertTrue(cache.dirty)
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_files(self):
+        cache = LogMetaCache(self.cache_file)
+        cache.put("/b.log", Stat(20, 2000, 2), self.report)
+        cache.put("/a.log", Stat(10, 1000.7, 1), self.report)
+        files = cache.files()
+        self.assertEqual([path for path, st in files], ["/a.log", "/b.log"])
+        # the stored fields are enough to find the entries again
+        self.assertEqual([stat_key(st) for path, st in files], [[1, 1, 10, 1000], [1, 2, 20, 2000]])
+        self.assertEqual(cache.missing(files), [])
+
+    def test_prune_keeps_skipped_mounts(self):
+        cache = LogMetaCache(self.cache_file)
+        for path in ("/hdd/a.log", "/hdd/b.log", "/media/net/c.log", "/media/net/d.log"):
+            cache.put(path, Stat(1, 1), self.report)
+        cache.dirty = False
+        old = logcache.get_mount_table
+        logcache.get_mount_table = Table
+        try:
+            cache.prune(["/hdd/a.log"], ["/media/net"])
+        finally:
+            logcache.get_mount_table = old
+        self.assertEqual(sorted(cache.entries), ["/hdd/a.log", "/media/net/c.log", "/media/net/d.log"])
+        self.assertTrue(cache.dirty)
+        cache.prune(["/media/net/c.log"])
+        self.assertEqual(sorted(cache.entries), ["/media/net/c.log"])
+
+    def test_parse_missing(self):
+        path = os.path.join(self.dir, "enigma2_crash_1.log")
+        with open(path, "wb") as f:
+            f.write(CRASH)
+        st = os.stat(path)
+        results = parse_missing([(path, st), (os.path.join(self.dir, "gone.log"), st)])
+        self.assertEqual([(p, s) for p, s, report in results], [(path, st)])
+        self.assertEqual(results[0][2].exception_type, "KeyError")
+
+
+if __name__ == "__main__":
+    unittest.main()
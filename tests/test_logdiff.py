@@ -0,0 +1,79 @@
+# -*- coding: UTF-8 -*-
+# line diff: one hash per line as the LineIndex counts them
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer import logdiff  # noqa: E402
+from CrashlogViewer.logindex import LineIndex  # noqa: E402
+
+
+class LineHashesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, data, name="a.log"):
+        path = os.path.join(self.dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def assertOneHashPerLine(self, data, block_size=logdiff.DIFF_BLOCK):
+        path = self.write(data)
+        index = LineIndex(path)
+        try:
+            self.assertEqual(len(logdiff.line_hashes(path, block_size)), index.lines, data)
+        finally:
+            index.close()
+
+    def test_volatile_parts_do_not_join_lines(self):
+        for data in (b"a\nkilled pid\n1234 started\nb\n",
+                     b"a\nPID:\n\n42\n",
+                     b"x [\n  12.345] y\n",
+                     b"12:00:00.0000\nnext\n",
+                     b"<\n 1.5> z\n",
+                     b"no newline at the end",
+                     b"\n\n\n",
+                     b"cr\r\nlf\n"):
+            self.assertOneHashPerLine(data)
+
+    def test_block_boundaries(self):
+        data = b"".join(b"12:00:%02d.0000 pid %d line %d\n" % (n % 60, n, n) for n in range(500))
+        for block_size in (7, 64, 1000):
+            self.assertOneHashPerLine(data + b"tail", block_size)
+
+    def test_normalize(self):
+        self.assertEqual(logdiff.normalize(b"12:00:01.1234 pid=17 at 0xdeadbeef"),
+                         logdiff.normalize(b"13:59:59.9999 pid=4242 at 0x12345678"))
+        self.assertNotEqual(logdiff.normalize(b"killed pid"), logdiff.normalize(b"killed pid 1"))
+
+    def test_diff(self):
+        left = self.write(b"".join(b"%02d:00:00.0000 line %d\n" % (n % 24, n) for n in range(100)), "left.log")
+        lines = [b"%02d:30:00.0000 line %d\n" % (n % 24, n) for n in range(100)]
+        lines[50] = b"changed\n"
+        del lines[10]
+        lines.insert(80, b"added\n")
+        right = self.write(b"".join(lines), "right.log")
+        diff = logdiff.diff_logs(left, right)
+        self.assertEqual(diff.counts(), (1, 1, 1))
+        self.assertEqual(diff.rows, 101)
+        rows = diff.window(0, diff.rows)
+        self.assertEqual(len(rows), diff.rows)
+        self.assertEqual(rows[10], (logdiff.DELETE, 10, None))
+        self.assertEqual(rows[50], (logdiff.REPLACE, 50, 49))
+        self.assertEqual(diff.next_change(0), 10)
+        self.assertEqual(diff.prev_change(50), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+# -*- coding: UTF-8 -*-
+# line offset index: windows agree with the lines of the file
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer.logindex import LineIndex, split_lines  # noqa: E402
+
+
+class SplitLinesTest(unittest.TestCase):
+
+    def test_only_newline_ends_a_line(self):
+        self.assertEqual(split_lines(b"a\x0bb\x0cc\x1cd\n\xc2\x85e\xe2\x80\xa8f\n"),
+                         ["a\x0bb\x0cc\x1cd", "\x85e f"])
+
+    def test_ends(self):
+        self.assertEqual(split_lines(b""), [])
+        self.assertEqual(split_lines(b"\n"), [""])
+        self.assertEqual(split_lines(b"a\r\nb"), ["a", "b"])
+        self.assertEqual(split_lines(b"a\n\nb\n"), ["a", "", "b"])
+        self.assertEqual(split_lines(b"bad \xff byte\n"), ["bad � byte"])
+
+
+class LineIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.indexes = []
+
+    def tearDown(self):
+        for index in self.indexes:
+            index.close()
+        shutil.rmtree(self.dir)
+
+    def index(self, data, stride=4, state=None):
+        path = os.path.join(self.dir, "enigma2_crash.log")
+        with open(path, "wb") as f:
+            f.write(data)
+        index = LineIndex(path, stride, state)
+        self.indexes.append(index)
+        return index
+
+    def test_windows(self):
+        lines = ["line %d" % n + ("\x0b\x85" if n % 7 == 0 else "") for n in range(50)]
+        data = "\n".join(lines).encode("utf-8")
+        for tail in (b"", b"\n", b"\r\n"):
+            index = self.index(data + tail)
+            self.assertEqual(index.lines, 50)
+            self.assertEqual(index.window(0, 100), lines)
+            for start in range(0, 50, 3):
+                for count in (1, 4, 5, 9):
+                    self.assertEqual(index.window(start, count), lines[start:start + count], (start, count))
+            self.assertEqual(index.window(50, 5), [])
+            self.assertEqual(index.window(3, 0), [])
+
+    def test_read_bytes(self):
+        index = self.index(b"a\nbb\nccc\n")
+        self.assertEqual(index.read_bytes(1, 1), b"bb\n")
+        self.assertEqual(index.read_bytes(1, 10), b"bb\nccc\n")
+        self.assertEqual(index.read_bytes(-2, 1), b"a\n")
+        self.assertEqual(index.read_bytes(3, 1), b"")
+
+    def test_offsets(self):
+        index = self.index(b"".join(b"%03d\n" % n for n in range(20)))
+        for n in range(20):
+            self.assertEqual(index.offset(n), 4 * n)
+            self.assertEqual(index.line_at(4 * n + 2), n)
+        self.assertEqual(index.offset(20), index.size)
+        self.assertEqual(index.line_at(index.size + 10), 19)
+
+    def test_empty(self):
+        index = self.index(b"")
+        self.assertEqual((index.lines, index.window(0, 10), index.error_lines()), (0, [], []))
+
+    def test_state(self):
+        data = b"".join(b"line %d\n" % n for n in range(30))
+        state = self.index(data).state()
+        index = self.index(data, state=state)
+        self.assertEqual(index.lines, 30)
+        self.assertEqual(index.window(25, 10), ["line %d" % n for n in range(25, 30)])
+        # a state of another size or stride is not used
+        self.assertEqual(self.index(data + b"more\n", state=state).lines, 31)
+        starts = [0] + [i + 1 for i, c in enumerate(data) if c == 10]
+        self.assertEqual(self.index(data, stride=8, state=state).checkpoints.tolist(), starts[0:30:8])
+
+    def test_error_lines(self):
+        index = self.index(b"ok\nValueError: x\nok\nFATAL SIGNAL 11 Error: y\nlast Error:")
+        self.assertEqual(index.error_lines(),
+                         [(1, "ValueError: x"), (3, "FATAL SIGNAL 11 Error: y"), (4, "last Error:")])
+        self.assertEqual(index.error_lines(1), [(4, "last Error:")])
+
+
+if __name__ == "__main__":
+    unittest.main()
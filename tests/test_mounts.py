@@ -0,0 +1,145 @@
+# -*- coding: UTF-8 -*-
+# mount table from a made-up mounts file, and deletion batched by mount
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer.cleanup import plan_deletion, run_deletion  # noqa: E402
+from CrashlogViewer.mounts import MountTable, parse_mounts  # noqa: E402
+
+MOUNTS = """/dev/root / ext4 rw,relatime 0 0
+proc /proc proc rw 0 0
+/dev/sda1 /media/hdd ext4 rw,noatime 0 0
+/dev/sda2 /media/hdd/movie ext4 ro,noatime 0 0
+//nas/share /media/net/My\\040Share cifs rw 0 0
+/dev/sdb1 /media/usb vfat ro 0 0
+broken line
+"""
+
+
+class MountsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.mounts_file = os.path.join(self.dir, "mounts")
+        self.tables = []
+
+    def tearDown(self):
+        for table in self.tables:
+            if table._file is not None:
+                table._file.close()
+        shutil.rmtree(self.dir)
+
+    def table(self, text):
+        with open(self.mounts_file, "w") as f:
+            f.write(text)
+        table = MountTable(self.mounts_file)
+        self.tables.append(table)
+        return table
+
+    def test_parse_mounts(self):
+        mounts = parse_mounts(MOUNTS)
+        self.assertEqual([m.mountpoint for m in mounts],
+                         ["/", "/proc", "/media/hdd", "/media/hdd/movie", "/media/net/My Share", "/media/usb"])
+        self.assertEqual(tuple(mounts[2]), ("/dev/sda1", "/media/hdd", "ext4", "rw,noatime"))
+        self.assertEqual([m.readonly for m in mounts], [False, False, False, True, False, True])
+
+    def test_longest_prefix(self):
+        table = self.table(MOUNTS)
+        for path, mp in (("/media/hdd/logs/enigma2_crash.log", "/media/hdd"),
+                         ("/media/hdd", "/media/hdd"),
+                         ("/media/hdd/movie/x.log", "/media/hdd/movie"),
+                         ("/media/hdd/movies/x.log", "/media/hdd"),
+                         ("/media/hddx/x.log", "/"),
+                         ("/media/net/My Share/logs/a.log", "/media/net/My Share"),
+                         ("/media/hdd/logs/../movie/y.log", "/media/hdd/movie"),
+                         ("/tmp/a.log", "/")):
+            self.assertEqual(table.resolve(path).mountpoint, mp, path)
+        self.assertTrue(table.is_readonly("/media/usb/enigma2_crash.log"))
+        self.assertTrue(table.is_readonly("/media/hdd/movie/a.log"))
+        self.assertFalse(table.is_readonly("/media/hdd/a.log"))
+
+    def test_media_mounts(self):
+        table = self.table(MOUNTS + "proc /media/proc proc rw 0 0\n")
+        self.assertEqual([m.mountpoint for m in table.media_mounts(("/media/",))],
+                         ["/media/hdd", "/media/hdd/movie", "/media/net/My Share", "/media/usb"])
+
+    def test_refresh_on_change(self):
+        table = self.table(MOUNTS)
+        self.assertFalse(table.changed())
+        self.assertIs(table.refresh(), table)
+        with open(self.mounts_file, "a") as f:
+            f.write("/dev/sdc1 /media/hdd/logs ext4 rw 0 0\n")
+        st = os.stat(self.mounts_file)
+        os.utime(self.mounts_file, (st.st_atime, time.time() + 10))
+        self.assertTrue(table.changed())
+        self.assertEqual(table.refresh().resolve("/media/hdd/logs/a.log").mountpoint, "/media/hdd/logs")
+        self.assertFalse(table.changed())
+
+    def test_missing_file(self):
+        table = MountTable(os.path.join(self.dir, "missing"))
+        self.assertEqual(table.mounts, [])
+        self.assertIsNone(table.resolve("/media/hdd/a.log"))
+        self.assertTrue(table.changed())
+
+
+class CleanupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        for name in ("hdd", "usb"):
+            os.makedirs(os.path.join(self.dir, name))
+        mounts_file = os.path.join(self.dir, "mounts")
+        with open(mounts_file, "w") as f:
+            f.write("/dev/root / ext4 rw 0 0\n"
+                    "/dev/sda1 %(d)s/hdd ext4 rw 0 0\n"
+                    "/dev/sdb1 %(d)s/usb vfat ro 0 0\n"
+                    "/dev/sdc1 %(d)s/gone ext4 rw 0 0\n" % {"d": self.dir})
+        self.table = MountTable(mounts_file)
+
+    def tearDown(self):
+        self.table._file.close()
+        shutil.rmtree(self.dir)
+
+    def log(self, where, name):
+        path = os.path.join(self.dir, where, name)
+        if os.path.isdir(os.path.dirname(path)):
+            with open(path, "w") as f:
+                f.write("log\n")
+        return path
+
+    def test_plan_and_run(self):
+        hdd = [self.log("hdd", "enigma2_crash_%d.log" % n) for n in range(3)]
+        usb = [self.log("usb", "enigma2_crash_9.log")]
+        gone = [self.log("gone", "enigma2_crash_8.log")]
+        plan = plan_deletion(usb + hdd[:2] + gone + hdd[2:], self.table)
+        self.assertEqual(plan.batches, [(os.path.join(self.dir, "hdd"), hdd)])
+        self.assertEqual(plan.skipped, [(os.path.join(self.dir, "usb"), "read-only", 1),
+                                        (os.path.join(self.dir, "gone"), "unavailable", 1)])
+        self.assertEqual(plan.total, 3)
+
+        os.remove(hdd[1])
+        steps = []
+        deleted, failed = run_deletion(plan, lambda stage, n, total: steps.append((stage, n, total)))
+        self.assertEqual(deleted, 2)
+        self.assertEqual([path for path, error in failed], [hdd[1]])
+        self.assertEqual(steps, [("delete", 1, 3), ("delete", 2, 3), ("delete", 3, 3)])
+        self.assertEqual(os.listdir(os.path.join(self.dir, "hdd")), [])
+        self.assertEqual(os.listdir(os.path.join(self.dir, "usb")), ["enigma2_crash_9.log"])
+
+    def test_archive_index_is_removed(self):
+        path = self.log("hdd", "enigma2_crash_1.log.gz")
+        index = self.log("hdd", "enigma2_crash_1.log.gz.idx")
+        self.assertEqual(run_deletion(plan_deletion([path], self.table)), (1, []))
+        self.assertFalse(os.path.exists(index))
+
+
+if __name__ == "__main__":
+    unittest.main()
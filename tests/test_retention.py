@@ -0,0 +1,104 @@
+# -*- coding: UTF-8 -*-
+# retention selection on made-up stats, nothing is deleted
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer import retention  # noqa: E402
+from CrashlogViewer.mounts import Mount  # noqa: E402
+from CrashlogViewer.retention import RetentionPolicy, over_limit, select_for_removal  # noqa: E402
+
+NOW = 1760000000
+DAY = 86400
+
+
+class Stat(object):
+
+    def __init__(self, size, age):
+        self.st_size = size
+        self.st_mtime = NOW - age
+
+
+class Table(object):
+    # the root file system and a disk
+
+    def resolve(self, path):
+        if path.startswith("/media/hdd/"):
+            return Mount("/dev/sda1", "/media/hdd", "ext4", "rw")
+        return Mount("/dev/root", "/", "ext4", "rw")
+
+
+def crash(n, age, size=1000, where="/media/hdd/logs"):
+    return ("%s/enigma2_crash_%d.log" % (where, n), Stat(size, age))
+
+
+class RetentionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = Table()
+
+    def select(self, entries, policy, signatures=None):
+        signature_of = (lambda path, st: signatures.get(path)) if signatures is not None else None
+        return select_for_removal(entries, policy, signature_of, self.table, NOW)
+
+    def test_age(self):
+        entries = [crash(1, 10 * DAY), crash(2, 2 * DAY), crash(3, 60)]
+        removal = self.select(entries, RetentionPolicy(max_age_days=5))
+        self.assertEqual(removal, [(entries[0][0], 1000, retention.REASON_AGE)])
+
+    def test_keep_per_signature(self):
+        entries = [crash(n, (n + 1) * DAY) for n in range(5)]
+        signatures = dict((path, "aaa" if n < 3 else "bbb") for n, (path, st) in enumerate(entries))
+        removal = self.select(entries, RetentionPolicy(keep_per_group=1), signatures)
+        # the newest of each signature stays, oldest first
+        self.assertEqual([path for path, size, reason in removal], [entries[4][0], entries[2][0], entries[1][0]])
+        self.assertEqual(set(reason for path, size, reason in removal), {retention.REASON_COUNT})
+
+    def test_unparsed_logs_are_kept(self):
+        # at boot the metadata cache may not know these logs yet: they may all
+        # be different crashes, so none of them is removed for the count rule
+        entries = [crash(n, (n + 1) * DAY) for n in range(6)]
+        signatures = {entries[0][0]: "aaa", entries[1][0]: "aaa"}
+        removal = self.select(entries, RetentionPolicy(keep_per_group=1), signatures)
+        self.assertEqual(removal, [(entries[1][0], 1000, retention.REASON_COUNT)])
+        self.assertEqual(self.select(entries, RetentionPolicy(keep_per_group=1), {}), [])
+        self.assertEqual(self.select(entries, RetentionPolicy(keep_per_group=1)), [])
+
+    def test_parsed_without_signature_by_type(self):
+        entries = [("/media/hdd/logs/enigma2_debug_%d.log" % n, Stat(1000, (n + 1) * DAY)) for n in range(3)]
+        signatures = dict((path, "") for path, st in entries)
+        removal = self.select(entries, RetentionPolicy(keep_per_group=2), signatures)
+        self.assertEqual([path for path, size, reason in removal], [entries[2][0]])
+
+    def test_keep_per_type(self):
+        entries = [crash(1, DAY), crash(2, 2 * DAY), ("/media/hdd/logs/enigma2_debug_1.log", Stat(10, 3 * DAY))]
+        removal = self.select(entries, RetentionPolicy(keep_per_group=1, group_by="type"))
+        self.assertEqual([path for path, size, reason in removal], [entries[1][0]])
+
+    def test_recent_logs_are_protected(self):
+        entries = [crash(1, 60), crash(2, 120)]
+        policy = RetentionPolicy(keep_per_group=1, group_by="type", max_age_days=1)
+        self.assertEqual(self.select(entries, policy), [])
+
+    def test_size_counts_protected_logs(self):
+        # 600 bytes of fresh logs leave room for one old one per mount
+        entries = [crash(1, 60, 600), crash(2, DAY, 300), crash(3, 2 * DAY, 300), crash(4, DAY, 300, "/home/root/logs")]
+        policy = RetentionPolicy(max_bytes_per_mount=1000)
+        removal = self.select(entries, policy)
+        self.assertEqual(removal, [(entries[2][0], 300, retention.REASON_SIZE)])
+        self.assertEqual(over_limit(entries, removal, policy, self.table), [])
+
+    def test_size_limit_not_met(self):
+        entries = [crash(1, 60, 800), crash(2, 120, 800), crash(3, DAY, 100)]
+        policy = RetentionPolicy(max_bytes_per_mount=1000)
+        removal = self.select(entries, policy)
+        self.assertEqual(removal, [(entries[2][0], 100, retention.REASON_SIZE)])
+        self.assertEqual(over_limit(entries, removal, policy, self.table), [("/media/hdd", 1600)])
+
+
+if __name__ == "__main__":
+    unittest.main()
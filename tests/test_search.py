@@ -0,0 +1,92 @@
+# -*- coding: UTF-8 -*-
+# search over log files in small blocks
+
+import gzip
+import os
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer.search import SearchJob, compile_query, search_file  # noqa: E402
+
+LOG = (b"12:00:00.0000 start\n"
+       b"Traceback (most recent call last):\n"
+       b"  File \"/usr/lib/enigma2/python/mytest.py\", line 1, in <module>\n"
+       b"ValueError: bad value in Traceback\n"
+       b"12:00:01.0000 Traceback (most recent call last):\n"
+       b"TRACEBACK again\r\n"
+       b"last line without end")
+
+
+class SearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = self.write("enigma2_crash_1.log", LOG)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, data):
+        path = os.path.join(self.dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def search(self, query, regex=False, path=None, block_size=1024):
+        hits = []
+        pattern, fold = compile_query(query, regex)
+        n = search_file(path or self.path, pattern, fold, lambda *hit: hits.append(hit[1:]), block_size=block_size)
+        self.assertEqual(n, len(hits))
+        return hits
+
+    def test_literal_ignores_case(self):
+        self.assertEqual([line for line, text in self.search("traceback")], [1, 3, 4, 5])
+        self.assertEqual(self.search("TRACEBACK AGAIN"), [(5, "TRACEBACK again")])
+        self.assertEqual(self.search("without end"), [(6, "last line without end")])
+        # regex characters are literal
+        self.assertEqual(self.search("(most recent"), [(1, "Traceback (most recent call last):"),
+                                                       (4, "12:00:01.0000 Traceback (most recent call last):")])
+
+    def test_regex_anchors_per_line(self):
+        self.assertEqual([line for line, text in self.search("^Traceback", True)], [1, 5])
+        self.assertEqual([line for line, text in self.search(r"last\):$", True)], [1, 4])
+        self.assertEqual([line for line, text in self.search(r"^\d\d:\d\d", True)], [0, 4])
+
+    def test_block_boundaries(self):
+        # the same hits whatever the block size, also with \n right at a block
+        # end (lines longer than 16 blocks are cut, so not below 7 bytes here)
+        expected = self.search("^Traceback", True)
+        for block_size in (7, 20, 21, 64):
+            self.assertEqual(self.search("^Traceback", True, block_size=block_size), expected, block_size)
+            self.assertEqual(len(self.search("traceback", block_size=block_size)), 4, block_size)
+
+    def test_archive(self):
+        path = os.path.join(self.dir, "enigma2_crash_2.log.gz")
+        with gzip.open(path, "wb") as f:
+            f.write(LOG)
+        self.assertEqual(self.search("^Traceback", True, path), self.search("^Traceback", True))
+
+    def test_job(self):
+        other = self.write("enigma2_crash_3.log", b"nothing\n" * 1000 + b"Traceback\n")
+        hits = SearchJob([self.path, other, os.path.join(self.dir, "missing.log")], "^traceback", True).run()
+        self.assertEqual(sorted((os.path.basename(path), line) for path, line, text in hits),
+                         [("enigma2_crash_1.log", 1), ("enigma2_crash_1.log", 5), ("enigma2_crash_3.log", 1000)])
+
+    def test_job_limit(self):
+        files = [self.write("enigma2_crash_%d.log" % n, b"hit\n" * 100) for n in range(10, 15)]
+        job = SearchJob(files, "hit", limit=50)
+        self.assertEqual(len(job.run()), 50)
+        self.assertEqual(job.hits, 50)
+
+    def test_invalid_regex(self):
+        self.assertRaises(re.error, SearchJob, [self.path], "(", True)
+
+
+if __name__ == "__main__":
+    unittest.main()
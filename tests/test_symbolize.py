@@ -0,0 +1,204 @@
+# -*- coding: UTF-8 -*-
+# backtrace symbolizer against small ELF files written by the test
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer.crashparser import parse_file  # noqa: E402
+from CrashlogViewer.symbolize import (ET_EXEC, SymbolTable, Symbolizer, demangle, parse_backtrace,  # noqa: E402
+                                      parse_maps, read_elf_symbols, symbolize_log)
+
+ET_DYN = 3
+EM_ARM = 40
+EM_X86_64 = 62
+STT_OBJECT = 1
+STT_FUNC = 2
+# (value, size, name, type, section); section 0 is an undefined symbol
+SYMBOLS = [
+    (0x1000, 0x40, b"main", STT_FUNC, 1),
+    (0x1100, 0x10, b"_IO_printf", STT_FUNC, 1),
+    (0x1100, 0x10, b"printf", STT_FUNC, 1),
+    (0x1200, 0x20, b"_ZN6eTimer4fireEv", STT_FUNC, 1),
+    (0x1300, 0x10, b"table", STT_OBJECT, 1),
+    (0x1400, 0x10, b"undefined", STT_FUNC, 0),
+    (0x12010, 0x10, b"far_away", STT_FUNC, 1),
+]
+# (file offset, link-time address, size) of the loadable segments
+SEGMENTS = [(0, 0, 0x2000), (0x2000, 0x12000, 0x1000)]
+
+
+def build_elf(is64, e_type=ET_DYN, machine=EM_X86_64, symtab=True, thumb=False):
+    end = "<"
+    strtab = b"\0"
+    syms = []
+    for value, size, name, kind, shndx in SYMBOLS:
+        if thumb and kind == STT_FUNC:
+            value |= 1
+        syms.append((len(strtab), value, size, (1 << 4) | kind, shndx))
+        strtab += name + b"\0"
+    if is64:
+        sym = b"\0" * 24 + b"".join(struct.pack(end + "IBBHQQ", n, info, 0, shndx, value, size)
+                                    for n, value, size, info, shndx in syms)
+        ehsize, phentsize, shentsize, entsize = 64, 56, 64, 24
+    else:
+        sym = b"\0" * 16 + b"".join(struct.pack(end + "IIIBBH", n, value, size, info, 0, shndx)
+                                    for n, value, size, info, shndx in syms)
+        ehsize, phentsize, shentsize, entsize = 52, 32, 40, 16
+    phoff = ehsize
+    sym_off = phoff + phentsize * len(SEGMENTS)
+    str_off = sym_off + len(sym)
+    shoff = str_off + len(strtab)
+    sh_type = 2 if symtab else 11
+
+    if is64:
+        ident = b"\x7fELF\x02\x01\x01" + b"\0" * 9
+        head = struct.pack(end + "HHIQQQIHHHHHH", e_type, machine, 1, 0, phoff, shoff, 0,
+                           ehsize, phentsize, len(SEGMENTS), shentsize, 3, 0)
+        phdrs = b"".join(struct.pack(end + "IIQQQQQQ", 1, 5, off, vaddr, vaddr, size, size, 0x1000)
+                         for off, vaddr, size in SEGMENTS)
+        shdrs = (b"\0" * shentsize +
+                 struct.pack(end + "IIQQQQIIQQ", 0, sh_type, 0, 0, sym_off, len(sym), 2, 1, 8, entsize) +
+                 struct.pack(end + "IIQQQQIIQQ", 0, 3, 0, 0, str_off, len(strtab), 0, 0, 1, 0))
+    else:
+        ident = b"\x7fELF\x01\x01\x01" + b"\0" * 9
+        head = struct.pack(end + "HHIIIIIHHHHHH", e_type, machine, 1, 0, phoff, shoff, 0,
+                           ehsize, phentsize, len(SEGMENTS), shentsize, 3, 0)
+        phdrs = b"".join(struct.pack(end + "IIIIIIII", 1, off, vaddr, vaddr, size, size, 5, 0x1000)
+                         for off, vaddr, size in SEGMENTS)
+        shdrs = (b"\0" * shentsize +
+                 struct.pack(end + "IIIIIIIIII", 0, sh_type, 0, 0, sym_off, len(sym), 2, 1, 4, entsize) +
+                 struct.pack(end + "IIIIIIIIII", 0, 3, 0, 0, str_off, len(strtab), 0, 0, 1, 0))
+    return ident + head + phdrs + sym + strtab + shdrs
+
+
+MAPS = (b"12:00:00.0000 /proc/self/maps:\n"
+        b"12:00:00.0000 76a00000-76a02000 r-xp 00000000 1f:02 123 /lib/libtest.so\n"
+        b"12:00:00.0000 76a02000-76a03000 r-xp 00002000 1f:02 123 /lib/libtest.so\n"
+        b"00400000-00500000 r-xp 00000000 1f:02 456 /usr/bin/enigma2\n")
+
+LOG = (b"12:00:00.0000 FATAL SIGNAL 11\n"
+       b"12:00:00.0000 Backtrace:\n"
+       b"12:00:00.0000 /lib/libtest.so(+0x1010) [0x76a01010]\n"
+       b"12:00:00.0000 /lib/libtest.so(_ZN6eTimer4fireEv+0x4) [0x76a01204]\n"
+       b"12:00:00.0000 /lib/libtest.so [0x76a02018]\n"
+       b"12:00:00.0000 /lib/libtest.so(hidden+0x8) [0x76a01508]\n"
+       b"12:00:00.0000 /usr/bin/gone(gone_func+0x2) [0x12345]\n"
+       b"12:00:00.0000 -------------------------------------\n" + MAPS)
+
+
+class SymbolizeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.dir, "cache")
+        os.makedirs(os.path.join(self.dir, "lib"))
+        self.lib = self.write("lib/libtest.so", build_elf(False, machine=EM_ARM, thumb=True))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, data):
+        path = os.path.join(self.dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_read_elf(self):
+        for is64, machine, thumb in ((False, EM_ARM, True), (True, EM_X86_64, False)):
+            e_type, segments, symbols = read_elf_symbols(self.write("elf", build_elf(is64, machine=machine, thumb=thumb)))
+            self.assertEqual(e_type, ET_DYN)
+            self.assertEqual(segments, SEGMENTS)
+            # functions only, the Thumb bit cleared
+            self.assertEqual(sorted(symbols), sorted((v, s, n) for v, s, n, kind, shndx in SYMBOLS
+                                                     if kind == STT_FUNC and shndx))
+        self.assertRaises(ValueError, read_elf_symbols, self.write("text", b"not an ELF file"))
+
+    def test_dynsym(self):
+        e_type, segments, symbols = read_elf_symbols(self.write("elf", build_elf(True, symtab=False)))
+        self.assertEqual(len(symbols), 5)
+
+    def test_lookup(self):
+        table = SymbolTable.from_elf(self.lib)
+        self.assertEqual(table.lookup(0x1000), ("main", 0))
+        self.assertEqual(table.lookup(0x103f), ("main", 0x3f))
+        # of two aliases the public name is kept
+        self.assertEqual(table.lookup(0x1104), ("printf", 4))
+        self.assertIsNone(table.lookup(0x1050))
+        self.assertIsNone(table.lookup(0x10))
+        self.assertEqual(table.vaddr(0x2018), 0x12018)
+        self.assertIsNone(table.vaddr(0x5000))
+
+    def test_cache_bytes(self):
+        st = os.stat(self.lib)
+        table = SymbolTable.from_elf(self.lib)
+        copy = SymbolTable.from_bytes(table.to_bytes(st), st)
+        self.assertEqual((copy.e_type, copy.segments, list(copy.addrs), copy.names),
+                         (table.e_type, table.segments, list(table.addrs), table.names))
+        self.assertEqual(copy.lookup(0x1204), ("_ZN6eTimer4fireEv", 4))
+        # another file state or a cut file is not used
+        changed = os.stat_result(st[:6] + (st.st_size + 1,) + st[7:])
+        self.assertIsNone(SymbolTable.from_bytes(table.to_bytes(st), changed))
+        self.assertIsNone(SymbolTable.from_bytes(table.to_bytes(st)[:-3], st))
+
+    def test_symbolize(self):
+        frames = parse_backtrace(LOG.splitlines())
+        maps = parse_maps(LOG.splitlines())
+        self.assertEqual(len(frames), 5)
+        self.assertEqual([(m.start, m.offset, m.path) for m in maps],
+                         [(0x400000, 0, "/usr/bin/enigma2"), (0x76a00000, 0, "/lib/libtest.so"),
+                          (0x76a02000, 0x2000, "/lib/libtest.so")])
+        out = Symbolizer(self.cache_dir, root=self.dir).symbolize(frames, maps)
+        self.assertEqual([location for address, module, offset, location in out],
+                         ["main+0x10", "eTimer::fire+0x4", "far_away+0x8", "hidden+0x8", "gone_func+0x2"])
+        self.assertEqual([offset for address, module, offset, location in out], [0x1010, 0x1204, 0x2018, 0x1508, None])
+        # the table was cached, a new symbolizer reads it from there
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        os.remove(self.lib)
+        os.symlink(os.path.join(self.dir, "missing"), self.lib)
+        self.assertEqual(Symbolizer(self.cache_dir, root=self.dir).symbolize(frames[:1], maps)[0][3], "+0x1010")
+
+    def test_cached_table(self):
+        frames = parse_backtrace(LOG.splitlines())[:1]
+        maps = parse_maps(LOG.splitlines())
+        Symbolizer(self.cache_dir, root=self.dir).symbolize(frames, maps)
+        cache = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        # the cache is used as long as size and mtime match the file
+        st = os.stat(self.lib)
+        with open(cache, "rb") as f:
+            data = f.read()
+        self.assertIsNotNone(SymbolTable.from_bytes(data, st))
+        self.assertEqual(Symbolizer(self.cache_dir, root=self.dir).symbolize(frames, maps)[0][3], "main+0x10")
+
+    def test_exec(self):
+        # addresses of a non-relocated executable are its link-time addresses
+        os.makedirs(os.path.join(self.dir, "usr", "bin"))
+        self.write("usr/bin/enigma2", build_elf(True, e_type=ET_EXEC))
+        out = Symbolizer(None, root=self.dir).symbolize([("/usr/bin/enigma2", "", 0x1108)])
+        self.assertEqual(out, [(0x1108, "/usr/bin/enigma2", None, "printf+0x8")])
+
+    def test_symbolize_log(self):
+        path = self.write("enigma2_crash_1.log", LOG)
+        report = parse_file(path)
+        out = symbolize_log(path, report, Symbolizer(None, root=self.dir))
+        self.assertEqual(out[0], (0x76a01010, "/lib/libtest.so", 0x1010, "main+0x10"))
+        self.assertEqual(symbolize_log(path, parse_file(self.write("plain.log", b"no crash\n"))), [])
+
+    def test_demangle(self):
+        self.assertEqual(demangle("_ZN6eTimer4fireEv"), "eTimer::fire")
+        self.assertEqual(demangle("_Z17handleFatalSignaliP7siginfoPv"), "handleFatalSignal")
+        self.assertEqual(demangle("_ZNK3foo3barEv"), "foo::bar")
+        self.assertEqual(demangle("_ZNSt6vectorC1Ev"), "std::vector::vector")
+        self.assertEqual(demangle("_ZN3fooD1Ev"), "foo::~foo")
+        self.assertEqual(demangle("printf"), "printf")
+        self.assertEqual(demangle("_ZN3foo"), "_ZN3foo")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,246 @@
+# -*- coding: UTF-8 -*-
+# version check against a version.txt served from 127.0.0.1
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+import zipfile
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer import updater  # noqa: E402
+
+ETAG = '"v1"'
+# as in the branch zip GitHub builds
+ZIP_PREFIX = "CrashlogViewer-main/usr/lib/enigma2/python/Plugins/Extensions/CrashlogViewer/"
+
+
+class VersionHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        if self.server.status:
+            self.send_response(self.server.status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = self.server.body
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class UpdaterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.dir, "update.json")
+        self.httpd = HTTPServer(("127.0.0.1", 0), VersionHandler)
+        self.httpd.requests = []
+        self.httpd.status = None
+        self.httpd.body = b"2.5\n"
+        self.url = "http://127.0.0.1:%d/version.txt" % self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        shutil.rmtree(self.dir)
+
+    def fetch(self, now, url=None, ttl=3600):
+        return updater.fetch_remote_version(url or self.url, self.cache_file, ttl=ttl, now=now)
+
+    def test_first_check(self):
+        self.assertEqual(self.fetch(1000), "2.5")
+        self.assertEqual(len(self.httpd.requests), 1)
+        self.assertNotIn("If-None-Match", self.httpd.requests[0])
+        cache = updater.load_update_cache(self.cache_file)
+        self.assertEqual(cache["version"], "2.5")
+        self.assertEqual(cache["etag"], ETAG)
+        self.assertEqual(cache["checked"], 1000)
+
+    def test_fresh_cache_skips_request(self):
+        self.fetch(1000)
+        self.httpd.body = b"3.0\n"
+        self.assertEqual(self.fetch(1000 + 3599), "2.5")
+        self.assertEqual(len(self.httpd.requests), 1)
+
+    def test_stale_cache_not_modified(self):
+        self.fetch(1000)
+        self.assertEqual(self.fetch(1000 + 3600), "2.5")
+        self.assertEqual(len(self.httpd.requests), 2)
+        self.assertEqual(self.httpd.requests[1]["If-None-Match"], ETAG)
+        # the 304 counts as a check
+        cache = updater.load_update_cache(self.cache_file)
+        self.assertEqual(cache["version"], "2.5")
+        self.assertEqual(cache["checked"], 1000 + 3600)
+
+    def test_network_error_keeps_cached_version(self):
+        self.fetch(1000)
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.assertEqual(self.fetch(1000 + 7200), "2.5")
+        # not marked as checked, the next call tries again
+        self.assertEqual(updater.load_update_cache(self.cache_file)["checked"], 1000)
+
+    def test_network_error_without_cache(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.assertRaises(IOError, self.fetch, 1000)
+
+    def test_http_error_keeps_cached_version(self):
+        self.fetch(1000)
+        for status in (429, 500, 503):
+            self.httpd.status = status
+            self.assertEqual(self.fetch(1000 + 7200), "2.5")
+        self.assertEqual(len(self.httpd.requests), 4)
+        self.assertEqual(updater.load_update_cache(self.cache_file)["checked"], 1000)
+
+    def test_http_error_without_cache(self):
+        self.httpd.status = 503
+        with self.assertRaises(updater.HTTPError) as cm:
+            self.fetch(1000)
+        self.assertEqual(cm.exception.code, 503)
+
+    def test_other_url_ignores_cache(self):
+        with open(self.cache_file, "w") as f:
+            json.dump({"url": "http://example.invalid/version.txt", "version": "1.0", "checked": 1000}, f)
+        self.assertEqual(self.fetch(1000), "2.5")
+        self.assertEqual(len(self.httpd.requests), 1)
+
+    def test_load_update_cache(self):
+        self.assertEqual(updater.load_update_cache(os.path.join(self.dir, "missing.json")), {})
+        with open(self.cache_file, "w") as f:
+            f.write("[1, 2")
+        self.assertEqual(updater.load_update_cache(self.cache_file), {})
+        with open(self.cache_file, "w") as f:
+            f.write("[1, 2]")
+        self.assertEqual(updater.load_update_cache(self.cache_file), {})
+
+
+class InstallTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.plugin_dir = os.path.join(self.dir, "python", "Plugins", "Extensions", "CrashlogViewer")
+        os.makedirs(self.plugin_dir)
+        self.write(os.path.join(self.plugin_dir, "plugin.py"), "old\n")
+        self.staging = updater.staging_dir_for(self.plugin_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path, "r") as f:
+            return f.read()
+
+    def make_zip(self, members, name="main.zip"):
+        path = os.path.join(self.dir, name)
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
+            for member, data in members:
+                zf.writestr(member, data)
+        return path
+
+    def url(self, path):
+        return "file://" + path
+
+    def test_staging_dir(self):
+        self.assertEqual(self.staging, os.path.join(self.dir, "python", ".CrashlogViewer-update"))
+
+    def test_extract_only_plugin_members(self):
+        path = self.make_zip([
+            ("CrashlogViewer-main/README.md", "readme"),
+            ("CrashlogViewer-main/usr/lib/enigma2/python/Plugins/Extensions/Other/plugin.py", "other"),
+            (ZIP_PREFIX, ""),
+            (ZIP_PREFIX + "plugin.py", "new"),
+            (ZIP_PREFIX + "skins/", ""),
+            (ZIP_PREFIX + "skins/skin.xml", "<skin/>"),
+            ("CrashlogViewer-main/etc/enigma2/settings", "config.x=1"),
+        ])
+        dest = os.path.join(self.dir, "dest")
+        os.makedirs(dest)
+        self.assertEqual(updater.extract_plugin(path, dest), 3)
+        found = sorted(os.path.relpath(os.path.join(root, name), dest)
+                       for root, dirs, files in os.walk(dest) for name in files)
+        self.assertEqual(found, ["plugin.py", os.path.join("skins", "skin.xml")])
+        self.assertEqual(self.read(os.path.join(dest, "plugin.py")), "new")
+
+    def test_extract_rejects_unsafe_paths(self):
+        path = self.make_zip([(ZIP_PREFIX + "plugin.py", "new"), (ZIP_PREFIX + "../../../../evil.py", "evil")])
+        dest = os.path.join(self.dir, "dest")
+        os.makedirs(dest)
+        self.assertRaises(Exception, updater.extract_plugin, path, dest)
+        self.assertFalse(os.path.exists(os.path.join(self.dir, "evil.py")))
+
+    def test_install_and_rollback(self):
+        path = self.make_zip([(ZIP_PREFIX + "plugin.py", "new\n")])
+        digest = updater.install_update(self.url(path), self.plugin_dir)
+        self.assertEqual(len(digest), 64)
+        self.assertEqual(self.read(os.path.join(self.plugin_dir, "plugin.py")), "new\n")
+        self.assertEqual(self.read(os.path.join(self.staging, "old", "plugin.py")), "old\n")
+        self.assertFalse(os.path.exists(os.path.join(self.staging, "new")))
+        self.assertFalse(os.path.exists(os.path.join(self.staging, "plugin_update.zip")))
+
+        self.assertTrue(updater.rollback_update(self.plugin_dir))
+        self.assertEqual(self.read(os.path.join(self.plugin_dir, "plugin.py")), "old\n")
+        self.assertEqual(self.read(os.path.join(self.staging, "rejected", "plugin.py")), "new\n")
+        self.assertFalse(os.path.exists(os.path.join(self.staging, "old")))
+        # nothing left to roll back to
+        self.assertFalse(updater.rollback_update(self.plugin_dir))
+
+    def assertUntouched(self):
+        self.assertEqual(os.listdir(self.plugin_dir), ["plugin.py"])
+        self.assertEqual(self.read(os.path.join(self.plugin_dir, "plugin.py")), "old\n")
+        self.assertFalse(os.path.exists(os.path.join(self.staging, "new")))
+        self.assertFalse(os.path.exists(os.path.join(self.staging, "old")))
+
+    def test_failed_extract_keeps_installed_tree(self):
+        # the second member fails its CRC check after the first was written
+        path = self.make_zip([(ZIP_PREFIX + "a.py", "first\n"), (ZIP_PREFIX + "plugin.py", "new content\n")])
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data.replace(b"new content", b"bad content"))
+        self.assertRaises(zipfile.BadZipFile, updater.install_update, self.url(path), self.plugin_dir)
+        self.assertUntouched()
+
+    def test_zip_without_plugin_keeps_installed_tree(self):
+        path = self.make_zip([("CrashlogViewer-main/README.md", "readme")])
+        self.assertRaises(Exception, updater.install_update, self.url(path), self.plugin_dir)
+        self.assertUntouched()
+
+    def test_failed_download_keeps_installed_tree(self):
+        self.assertRaises(IOError, updater.install_update, self.url(os.path.join(self.dir, "missing.zip")),
+                          self.plugin_dir)
+        self.assertUntouched()
+
+    def test_swap_in_restores_on_failure(self):
+        backup = os.path.join(self.dir, "backup")
+        self.assertRaises(OSError, updater.swap_in, os.path.join(self.dir, "missing"), self.plugin_dir, backup)
+        self.assertEqual(self.read(os.path.join(self.plugin_dir, "plugin.py")), "old\n")
+        self.assertFalse(os.path.exists(backup))
+
+
+if __name__ == "__main__":
+    unittest.main()
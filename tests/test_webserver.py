@@ -0,0 +1,194 @@
+# -*- coding: UTF-8 -*-
+# web access against a server on 127.0.0.1 with a temporary log directory
+
+import gzip
+import http.client
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                "usr", "lib", "enigma2", "python", "Plugins", "Extensions"))
+
+from CrashlogViewer import webserver  # noqa: E402
+
+LINES = 1000
+LINE = "12:00:00.0000 line %04d password=hunter2 from 192.168.1.20\n"
+
+
+class WebServerTest(unittest.TestCase):
+    raw = True
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "enigma2_crash_1760000000.log")
+        with open(self.path, "w") as f:
+            f.write("".join(LINE % n for n in range(LINES)))
+        self.size = os.path.getsize(self.path)
+        self.id = webserver.log_id(self.path)
+        self.server = webserver.LogWebServer(self.dir, port=0, host="127.0.0.1", raw=self.raw)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.dir)
+
+    def request(self, path, headers=None):
+        conn = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=10)
+        try:
+            conn.request("GET", path, headers=headers or {})
+            r = conn.getresponse()
+            return r.status, r.headers, r.read()
+        finally:
+            conn.close()
+
+    def get_json(self, path):
+        status, headers, body = self.request(path)
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Type"], "application/json")
+        return json.loads(body.decode("utf-8"))
+
+
+class RawWebServerTest(WebServerTest):
+
+    def test_logs(self):
+        data = self.get_json("/api/logs")
+        self.assertIn("timed_out", data)
+        # the static log roots of a box may add more
+        found = [entry for entry in data["logs"] if entry["path"].startswith(self.dir + "/")]
+        self.assertEqual(len(found), 1)
+        entry = found[0]
+        self.assertEqual(entry["id"], self.id)
+        self.assertEqual(entry["name"], os.path.basename(self.path))
+        self.assertEqual(entry["path"], self.path)
+        self.assertEqual(entry["size"], self.size)
+        self.assertEqual(entry["mtime"], int(os.path.getmtime(self.path)))
+        self.assertFalse(entry["archive"])
+
+    def test_lines_pages(self):
+        data = self.get_json("/api/logs/%s/lines?start=10&count=5" % self.id)
+        self.assertEqual(data["start"], 10)
+        self.assertEqual(data["count"], 5)
+        self.assertEqual(data["total"], LINES)
+        self.assertEqual(data["lines"], [(LINE % n).rstrip("\n") for n in range(10, 15)])
+        # the last page is short, past the end is empty
+        data = self.get_json("/api/logs/%s/lines?start=%d&count=5" % (self.id, LINES - 2))
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["lines"][-1], (LINE % (LINES - 1)).rstrip("\n"))
+        data = self.get_json("/api/logs/%s/lines?start=%d" % (self.id, LINES + 10))
+        self.assertEqual(data["lines"], [])
+        data = self.get_json("/api/logs/%s/lines" % self.id)
+        self.assertEqual(data["count"], webserver.PAGE_LINES)
+
+    def test_range(self):
+        status, headers, body = self.request("/logs/%s" % self.id, {"Range": "bytes=100-199"})
+        self.assertEqual(status, 206)
+        self.assertEqual(headers["Content-Range"], "bytes 100-199/%d" % self.size)
+        self.assertEqual(headers["Content-Length"], "100")
+        with open(self.path, "rb") as f:
+            f.seek(100)
+            self.assertEqual(body, f.read(100))
+        status, headers, body = self.request("/logs/%s" % self.id, {"Range": "bytes=-10"})
+        self.assertEqual(status, 206)
+        self.assertEqual(headers["Content-Range"], "bytes %d-%d/%d" % (self.size - 10, self.size - 1, self.size))
+
+    def test_range_not_satisfiable(self):
+        status, headers, body = self.request("/logs/%s" % self.id, {"Range": "bytes=%d-" % self.size})
+        self.assertEqual(status, 416)
+        self.assertEqual(headers["Content-Range"], "bytes */%d" % self.size)
+        self.assertEqual(body, b"")
+
+    def test_gzip(self):
+        status, headers, body = self.request("/logs/%s" % self.id, {"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        with open(self.path, "rb") as f:
+            self.assertEqual(gzip.decompress(body), f.read())
+        status, headers, body = self.request("/api/logs/%s/lines" % self.id, {"Accept-Encoding": "gzip"})
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(body).decode("utf-8"))["count"], webserver.PAGE_LINES)
+        # not asked for: plain
+        status, headers, body = self.request("/logs/%s" % self.id)
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertEqual(len(body), self.size)
+
+    def test_unknown_id(self):
+        for path in ("/api/logs/0123456789ab", "/api/logs/0123456789ab/lines", "/logs/0123456789ab"):
+            status, headers, body = self.request(path)
+            self.assertEqual(status, 404, path)
+            self.assertEqual(json.loads(body.decode("utf-8"))["error"], "no such log")
+
+    def test_path_traversal(self):
+        # a log outside the scanned roots is not served, not even by its id
+        other = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, other)
+        outside = os.path.join(other, "secret_crash.log")
+        with open(outside, "w") as f:
+            f.write("root:x:0:0\n")
+        relative = os.path.relpath(outside, self.dir).replace("/", "%2F")
+        for path in ("/logs/..%2F..%2F..%2Fetc%2Fpasswd",
+                     "/logs/../../../etc/passwd",
+                     "/logs/%2Fetc%2Fpasswd",
+                     "/logs/" + self.path.replace("/", "%2F"),
+                     "/api/logs/..%2Fsecret_crash.log/lines",
+                     "/api/logs/%s/../../etc/passwd" % self.id,
+                     "/logs/" + relative,
+                     "/api/logs/%s/lines" % relative,
+                     "/logs/" + webserver.log_id(outside)):
+            status, headers, body = self.request(path)
+            self.assertEqual(status, 404, path)
+            self.assertNotIn(b"root:", body)
+
+
+class MaskedWebServerTest(WebServerTest):
+    raw = False
+
+    def test_lines_masked(self):
+        data = self.get_json("/api/logs/%s/lines?start=0&count=1" % self.id)
+        self.assertEqual(data["lines"], ["12:00:00.0000 line 0000 password=<redacted> from <ip>"])
+
+    def test_file_masked(self):
+        status, headers, body = self.request("/logs/%s" % self.id, {"Range": "bytes=0-99", "Accept-Encoding": "gzip"})
+        # no ranges over the masked text, the whole of it is sent
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Accept-Ranges"], "none")
+        text = gzip.decompress(body)
+        self.assertEqual(text.count(b"\n"), LINES)
+        self.assertNotIn(b"hunter2", text)
+        self.assertNotIn(b"192.168.1.20", text)
+
+    def test_search_masked(self):
+        data = self.get_json("/api/search?q=line%200001")
+        self.assertEqual([hit["text"] for hit in data["hits"]],
+                         ["12:00:00.0000 line 0001 password=<redacted> from <ip>"])
+
+
+class PasswordWebServerTest(WebServerTest):
+
+    def setUp(self):
+        WebServerTest.setUp(self)
+        self.server.stop()
+        self.server = webserver.LogWebServer(self.dir, port=0, host="127.0.0.1", token="s3cret")
+        self.server.start()
+
+    def test_password(self):
+        status, headers, body = self.request("/api/logs")
+        self.assertEqual(status, 401)
+        self.assertIn("Basic", headers["WWW-Authenticate"])
+        self.assertEqual(self.request("/api/logs", {"Authorization": "Basic eDp3cm9uZw=="})[0], 401)
+        # x:s3cret
+        self.assertEqual(self.request("/api/logs", {"Authorization": "Basic eDpzM2NyZXQ="})[0], 200)
+        self.assertEqual(self.request("/api/logs", {"Authorization": "Bearer s3cret"})[0], 200)
+        self.assertEqual(self.request("/api/logs?token=s3cret")[0], 200)
+
+    def test_network_needs_password(self):
+        server = webserver.LogWebServer(self.dir, port=0, host="0.0.0.0")
+        self.assertRaises(ValueError, server.start)
+        self.assertFalse(server.running)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,11 +7,16 @@ __copyright__ = 'Copyright (c) 2024 Lululla'
 __license__ = "GPL-v2"
 __version__ = "1.0.0"
 
-from Components.Language import language
-from Tools.Directories import resolveFilename, SCOPE_PLUGINS
 import gettext
 import os
 
+try:
+	from Components.Language import language
+	from Tools.Directories import resolveFilename, SCOPE_PLUGINS
+except ImportError:
+	# without enigma2 (command line on a PC, see __main__.py)
+	language = None
+
 
 PluginLanguageDomain = 'CrashlogViewer'
 PluginLanguagePath = 'Extensions/CrashlogViewer/locale'
@@ -41,5 +46,6 @@ else:
 			print(("[%s] fallback to default translation for %s" % (PluginLanguageDomain, txt)))
 			return gettext.gettext(txt)
 
-localeInit()
-language.addCallback(localeInit)
+if language is not None:
+	localeInit()
+	language.addCallback(localeInit)
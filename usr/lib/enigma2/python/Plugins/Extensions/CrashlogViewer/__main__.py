@@ -0,0 +1,92 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - command line
+# Summarizes (or searches) crash logs collected from many boxes, without
+# enigma2. Run from the directory that contains the CrashlogViewer folder:
+#
+#   python3 -m CrashlogViewer /data/boxlogs -o summary.json
+#   python3 -m CrashlogViewer /data/boxlogs --groups -o groups.csv
+#   python3 -m CrashlogViewer /data/boxlogs --search "KeyError: 'epg'"
+
+from __future__ import print_function
+import argparse
+import csv
+import json
+import re
+import sys
+import time
+
+from .analysis import (SUMMARY_FIELDS, analyse_logs, find_logs, group_dict, group_summaries,
+                       search_logs)
+from .search import MAX_HITS, compile_query
+
+
+def parse_args(argv):
+    p = argparse.ArgumentParser(prog="python3 -m CrashlogViewer",
+                                description="Summarize enigma2 crash/debug logs or search them.")
+    p.add_argument("paths", nargs="+", metavar="PATH", help="log files or directories (searched recursively)")
+    p.add_argument("-o", "--output", help="output file (default: stdout)")
+    p.add_argument("-f", "--format", choices=("json", "csv"),
+                   help="output format (default: from the output file name, else json)")
+    p.add_argument("-j", "--jobs", type=int, default=0, help="worker processes (default: one per CPU)")
+    p.add_argument("--groups", action="store_true", help="one row per crash signature instead of per log")
+    p.add_argument("--search", metavar="QUERY", help="list matching lines instead of summaries")
+    p.add_argument("--regex", action="store_true", help="QUERY is a regular expression")
+    p.add_argument("--max-hits", type=int, default=MAX_HITS, help="stop searching after this many hits")
+    args = p.parse_args(argv)
+    if args.search:
+        try:
+            compile_query(args.search, args.regex)
+        except re.error as e:
+            p.error("invalid regular expression: %s" % e)
+    return args
+
+
+def write_csv(out, fields, rows):
+    w = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore")
+    w.writeheader()
+    for row in rows:
+        w.writerow(row)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    fmt = args.format or ("csv" if args.output and args.output.endswith(".csv") else "json")
+    start = time.time()
+    paths = [path for path, st in find_logs(args.paths)]
+    jobs = args.jobs or None
+
+    if args.search:
+        hits = search_logs(paths, args.search, args.regex, args.max_hits, jobs)
+        rows = [{"path": path, "line": line + 1, "text": text} for path, line, text in hits]
+        fields = ("path", "line", "text")
+        data = {"query": args.search, "hits": rows}
+        done = "%d hits in %d logs" % (len(rows), len(paths))
+    else:
+        summaries = sorted(analyse_logs(paths, jobs), key=lambda s: s["path"])
+        groups = [group_dict(g) for g in group_summaries(summaries)]
+        if args.groups:
+            rows = [dict(g, files=" ".join(g["files"])) for g in groups]
+            fields = ("signature", "title", "count", "first_seen", "last_seen", "files")
+        else:
+            rows = summaries
+            fields = SUMMARY_FIELDS
+        data = {"logs": summaries, "groups": groups}
+        failed = sum(1 for s in summaries if s.get("read_error"))
+        done = "%d logs, %d crash groups, %d unreadable" % (len(summaries), len(groups), failed)
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        if fmt == "csv":
+            write_csv(out, fields, rows)
+        else:
+            json.dump(data, out, indent=1)
+            out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print("%s (%.1f s)" % (done, time.time() - start), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - headless analysis
+# Finding, parsing, fingerprinting and searching logs without enigma2, for
+# the plugin screens as well as for collections of logs on a PC (see
+# __main__.py). Large collections are spread over a process pool; on the
+# box the plugin keeps using its worker threads.
+
+from __future__ import print_function
+import multiprocessing
+import os
+
+from .classifier import SEVERITIES, get_classifier
+from .crashparser import parse_file
+from .discovery import LOG_NAME_RE
+from .fingerprint import NO_SIGNATURE, fingerprint, group_logs
+from .search import MAX_HITS, compile_query, search_file
+
+# logs handed to a pool worker at a time
+POOL_CHUNK = 8
+
+SUMMARY_FIELDS = ("path", "size", "mtime", "lines", "signal", "exception", "module", "frame",
+                  "fingerprint", "title") + SEVERITIES + ("read_error",)
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return "%d %s" % (size, unit) if unit == "B" else "%.1f %s" % (size, unit)
+        size /= 1024.0
+    return "%.1f GB" % size
+
+
+def find_logs(paths, match=LOG_NAME_RE.match):
+    # files and directory trees -> [(path, stat)] of the matching logs;
+    # files named explicitly are taken whatever their name
+    found = []
+    for top in paths:
+        if os.path.isfile(top):
+            found.append((top, os.stat(top)))
+            continue
+        for root, dirs, files in os.walk(top):
+            dirs.sort()
+            for name in sorted(files):
+                if match(name):
+                    path = os.path.join(root, name)
+                    try:
+                        found.append((path, os.stat(path)))
+                    except OSError:
+                        pass
+    return found
+
+
+def summarize(path, st, report):
+    # flat dict for JSON/CSV, see SUMMARY_FIELDS
+    frame = None
+    if report.frames:
+        frame = "%s:%s %s" % report.frames[-1]
+    elif report.native_frames:
+        frame = "%s %s" % report.native_frames[0][:2]
+    exception = report.exception_type
+    if exception and report.exception_message:
+        exception += ": " + report.exception_message
+    d = {
+        "path": path,
+        "size": st.st_size,
+        "mtime": int(st.st_mtime),
+        "lines": report.lines,
+        "signal": report.signal,
+        "exception": exception,
+        "module": report.module,
+        "frame": frame,
+        "fingerprint": fingerprint(report),
+        "title": report.summary(short=True),
+        "read_error": None,
+    }
+    counts = dict.fromkeys(SEVERITIES, 0)
+    if report.tags:
+        rules = get_classifier().rules
+        for line, rule, text in report.tags:
+            counts[rules[rule].severity] += 1
+    d.update(counts)
+    return d
+
+
+def analyse_log(path):
+    # pool worker: path -> summary dict; errors are reported, not raised
+    try:
+        st = os.stat(path)
+        return summarize(path, st, parse_file(path, classifier=get_classifier()))
+    except Exception as e:
+        return {"path": path, "read_error": str(e)}
+
+
+def _pool(jobs):
+    return multiprocessing.Pool(jobs or None)
+
+
+def analyse_logs(paths, jobs=None, chunksize=POOL_CHUNK):
+    # yields summaries as they are done (not in order); jobs=1: no pool
+    if jobs == 1 or len(paths) < 2:
+        for path in paths:
+            yield analyse_log(path)
+        return
+    pool = _pool(jobs)
+    try:
+        for summary in pool.imap_unordered(analyse_log, paths, chunksize):
+            yield summary
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def group_summaries(summaries):
+    # -> [CrashGroup], like the group view of the plugin
+    return group_logs((s["path"], s["mtime"], s["fingerprint"], s["title"])
+                      for s in summaries if not s.get("read_error"))
+
+
+def group_dict(group):
+    return {
+        "signature": group.signature,
+        "title": group.title if group.signature != NO_SIGNATURE else None,
+        "count": group.count,
+        "first_seen": int(group.first_seen),
+        "last_seen": int(group.last_seen),
+        "files": group.files,
+    }
+
+
+def _search_one(args):
+    path, query, regex, limit = args
+    pattern, fold = compile_query(query, regex)
+    hits = []
+
+    def hit(path, line, text):
+        hits.append((path, line, text))
+        return len(hits) < limit
+
+    try:
+        search_file(path, pattern, fold, hit)
+    except (IOError, OSError, EOFError):
+        pass
+    return hits
+
+
+def search_logs(paths, query, regex=False, limit=MAX_HITS, jobs=None):
+    # [(path, line, text)], at most limit; the pool is stopped once it is full
+    compile_query(query, regex)
+    args = [(path, query, regex, limit) for path in paths]
+    found = []
+    if jobs == 1 or len(paths) < 2:
+        results = map(_search_one, args)
+        pool = None
+    else:
+        pool = _pool(jobs)
+        results = pool.imap(_search_one, args)
+    try:
+        for hits in results:
+            found.extend(hits[:limit - len(found)])
+            if len(found) >= limit:
+                break
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return found
+
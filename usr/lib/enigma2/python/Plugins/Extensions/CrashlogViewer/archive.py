@@ -0,0 +1,315 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - compressed log archive
+# Old logs are compressed as a chain of independent gzip members (or xz
+# streams) of about ARCHIVE_BLOCK bytes each, cut at line ends. The result
+# is still a normal .gz/.xz file, and a small sidecar index records where
+# every block starts, so a page deep inside an archive only needs the one
+# block around it to be decompressed.
+
+from __future__ import print_function
+import gzip
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from itertools import islice
+
+try:
+    import lzma
+except ImportError:
+    # not every image ships python3-lzma
+    lzma = None
+
+from .crashparser import ARCHIVE_SUFFIXES
+from .logindex import ERROR_MARKERS, MAX_ERROR_LINES, LineIndex, split_lines
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+ARCHIVE_BLOCK = 1024 * 1024
+READ_CHUNK = 64 * 1024
+# logs written to this recently are never archived
+PROTECT_RECENT = 600
+
+
+def is_archive(path):
+    return path.endswith(ARCHIVE_SUFFIXES)
+
+
+def archive_formats():
+    return ("gz", "xz") if lzma is not None else ("gz",)
+
+
+def open_log(path):
+    # binary, streaming file object for plain and compressed logs
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".xz"):
+        if lzma is None:
+            raise IOError("xz support (python lzma) is not installed")
+        return lzma.open(path, "rb")
+    return open(path, "rb")
+
+
+def remove_log(path):
+    os.remove(path)
+    if is_archive(path):
+        try:
+            os.remove(path + INDEX_SUFFIX)
+        except OSError:
+            pass
+
+
+def _compress(data, fmt):
+    # one complete gzip member / xz stream per block
+    if fmt == "xz":
+        return lzma.compress(data, format=lzma.FORMAT_XZ)
+    return gzip.compress(data)
+
+
+def _decompress(data, fmt):
+    if fmt == "xz":
+        return lzma.decompress(data)
+    return gzip.decompress(data)
+
+
+# --- Writing ---
+def compress_log(path, fmt="gz", block_size=ARCHIVE_BLOCK):
+    # path -> path.gz/.xz plus sidecar index; keeps the mtime, removes path
+    if fmt not in archive_formats():
+        fmt = "gz"
+    target = path + "." + fmt
+    tmp = target + ".tmp"
+    # [first line, uncompressed offset, compressed offset] per block
+    blocks = []
+    line = 0
+    uoff = 0
+    last = b"\n"
+    st = os.stat(path)
+    try:
+        with open(path, "rb") as src, open(tmp, "wb") as dst:
+            pending = b""
+            while True:
+                chunk = src.read(block_size)
+                pending += chunk
+                while pending:
+                    if len(pending) < block_size and chunk:
+                        break
+                    # blocks start at line starts so a line is never split
+                    cut = pending.rfind(b"\n", 0, block_size) + 1 or pending.find(b"\n", block_size) + 1
+                    if not cut:
+                        if chunk:
+                            # one very long line, read on
+                            break
+                        cut = len(pending)
+                    data, pending = pending[:cut], pending[cut:]
+                    blocks.append([line, uoff, dst.tell()])
+                    dst.write(_compress(data, fmt))
+                    line += data.count(b"\n")
+                    uoff += len(data)
+                    last = data[-1:]
+                if not chunk:
+                    break
+        if last != b"\n":
+            line += 1
+        with open(tmp + INDEX_SUFFIX, "w") as f:
+            json.dump({"version": INDEX_VERSION, "format": fmt, "lines": line,
+                       "size": uoff, "blocks": blocks}, f)
+        os.utime(tmp, (st.st_atime, st.st_mtime))
+        os.rename(tmp + INDEX_SUFFIX, target + INDEX_SUFFIX)
+        os.rename(tmp, target)
+    except Exception:
+        for name in (tmp, tmp + INDEX_SUFFIX):
+            try:
+                os.remove(name)
+            except OSError:
+                pass
+        raise
+    os.remove(path)
+    return target
+
+
+def lower_thread_priority(niceness=19):
+    # Linux: setpriority on the thread id only affects this worker thread.
+    # Returns the previous value for restore_thread_priority().
+    try:
+        tid = threading.get_native_id()
+        old = os.getpriority(os.PRIO_PROCESS, tid)
+        os.setpriority(os.PRIO_PROCESS, tid, niceness)
+        return old
+    except Exception:
+        return None
+
+
+def restore_thread_priority(old):
+    if old is None:
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), old)
+    except Exception:
+        pass
+
+
+def archive_old_logs(entries, older_than_days, fmt="gz", now=None):
+    # worker-thread job at idle priority; returns [(old path, new path)]
+    if now is None:
+        now = time.time()
+    limit = now - older_than_days * 86400
+    done = []
+    old = lower_thread_priority()
+    try:
+        for path, st in entries:
+            if is_archive(path) or st.st_mtime >= limit or now - st.st_mtime < PROTECT_RECENT:
+                continue
+            try:
+                done.append((path, compress_log(path, fmt)))
+            except Exception:
+                pass
+    finally:
+        restore_thread_priority(old)
+    return done
+
+
+# --- Reading ---
+class ArchivedLineIndex(object):
+    # LineIndex interface over a compressed log. With a sidecar index only the
+    # block around the requested lines is decompressed; archives made
+    # elsewhere have none and are streamed from their start instead.
+
+    def __init__(self, path, state=None):
+        self.path = path
+        self.fmt = "xz" if path.endswith(".xz") else "gz"
+        self._file = open(path, "rb")
+        self._cached = (None, b"")
+        if state is not None:
+            self.indexed, self.lines, self.size, self.blocks, self.fmt = state
+        else:
+            self.indexed = self._load_index()
+            if not self.indexed:
+                self._scan()
+        self.block_lines = [b[0] for b in self.blocks]
+
+    def state(self):
+        # see LineIndex.state()
+        return (self.indexed, self.lines, self.size, self.blocks, self.fmt)
+
+    def _load_index(self):
+        try:
+            with open(self.path + INDEX_SUFFIX, "r") as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION:
+                return False
+            self.lines = data["lines"]
+            self.size = data["size"]
+            self.blocks = data["blocks"]
+            self.fmt = data.get("format", self.fmt)
+            return True
+        except Exception:
+            return False
+
+    def _scan(self):
+        # one streaming pass to count lines
+        self.lines = 0
+        self.size = 0
+        last = b""
+        with open_log(self.path) as f:
+            while True:
+                chunk = f.read(READ_CHUNK)
+                if not chunk:
+                    break
+                self.lines += chunk.count(b"\n")
+                self.size += len(chunk)
+                last = chunk[-1:]
+        if self.size and last != b"\n":
+            self.lines += 1
+        self.blocks = [[0, 0, 0]]
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._cached = (None, b"")
+
+    def _block(self, i):
+        # decompressed block i; the last one is kept
+        if self._cached[0] == i:
+            return self._cached[1]
+        start = self.blocks[i][2]
+        end = self.blocks[i + 1][2] if i + 1 < len(self.blocks) else None
+        self._file.seek(start)
+        raw = self._file.read(end - start) if end is not None else self._file.read()
+        data = _decompress(raw, self.fmt)
+        self._cached = (i, data)
+        return data
+
+    def read_bytes(self, start, count):
+        if count <= 0 or start >= self.lines:
+            return b""
+        start = max(0, start)
+        if not self.indexed:
+            with open_log(self.path) as f:
+                return b"".join(islice(f, start, start + count))
+        out = []
+        need = min(count, self.lines - start)
+        i = bisect_right(self.block_lines, start) - 1
+        line = start
+        while need > 0 and i < len(self.blocks):
+            data = self._block(i)
+            pos = 0
+            for _ in range(line - self.blocks[i][0]):
+                pos = data.find(b"\n", pos) + 1
+            end = pos
+            while need > 0:
+                nl = data.find(b"\n", end)
+                if nl < 0:
+                    if end < len(data):
+                        end = len(data)
+                        need -= 1
+                        line += 1
+                    break
+                end = nl + 1
+                need -= 1
+                line += 1
+            out.append(data[pos:end])
+            i += 1
+        return b"".join(out)
+
+    def window(self, start, count):
+        return split_lines(self.read_bytes(start, count))
+
+    def error_lines(self, limit=MAX_ERROR_LINES):
+        # block by block; blocks end at line ends so no line is split
+        hits = deque(maxlen=limit)
+        if not self.indexed:
+            line = 0
+            with open_log(self.path) as f:
+                for raw in f:
+                    if ERROR_MARKERS.search(raw):
+                        hits.append((line, raw.rstrip(b"\r\n").decode("utf-8", "replace")))
+                    line += 1
+            return list(hits)
+        for i, block in enumerate(self.blocks):
+            data = self._block(i)
+            line = block[0]
+            pos = 0
+            last_end = -1
+            for m in ERROR_MARKERS.finditer(data):
+                if m.start() < last_end:
+                    continue
+                s = data.rfind(b"\n", 0, m.start()) + 1
+                line += data.count(b"\n", pos, s)
+                pos = s
+                e = data.find(b"\n", m.end())
+                if e < 0:
+                    e = len(data)
+                hits.append((line, data[s:e].decode("utf-8", "replace")))
+                last_end = e
+        return list(hits)
+
+
+def open_line_index(path, state=None):
+    # state: from state() of an earlier index of the unchanged file
+    if is_archive(path):
+        return ArchivedLineIndex(path, state=state)
+    return LineIndex(path, state=state)
@@ -0,0 +1,220 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - severity classifier
+# Rules (pattern -> severity/category) come from a small text file and are
+# compiled into one alternation with a named group per rule; the group that
+# matched tells the rule. Named groups and case-insensitive branches keep
+# the regex engine from skipping ahead, so the log itself is scanned for the
+# literal text each rule requires (one plain alternation over the lowered
+# block) and only candidate lines go through the full matcher.
+
+from __future__ import print_function
+import os
+import re
+from collections import deque
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+from .crashparser import MAX_TAGS
+from .diag import WARNING, log
+
+SEVERITIES = ("critical", "error", "warning", "info")
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "severity_rules.conf")
+# a user copy takes precedence over the shipped rules
+USER_RULES_FILE = "/etc/enigma2/CrashlogViewer_rules.conf"
+SNIPPET_LEN = 200
+SCAN_BLOCK = 4 * 1024 * 1024
+
+
+class Rule(object):
+    __slots__ = ("severity", "rank", "category", "pattern")
+
+    def __init__(self, severity, category, pattern):
+        self.severity = severity
+        self.rank = SEVERITIES.index(severity)
+        self.category = category
+        self.pattern = pattern
+
+    def __repr__(self):
+        return "<Rule %s/%s %r>" % (self.severity, self.category, self.pattern)
+
+
+def parse_rules(text):
+    # "severity category pattern" per line, # starts a comment.
+    # Returns ([Rule], [(line number, error)]); broken rules are left out.
+    rules = []
+    errors = []
+    for n, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split(None, 2)
+        if len(parts) < 3:
+            errors.append((n, "expected: severity category pattern"))
+            continue
+        severity, category, pattern = parts
+        if severity not in SEVERITIES:
+            errors.append((n, "unknown severity %r" % severity))
+            continue
+        try:
+            re.compile(pattern.encode("utf-8"))
+        except re.error as e:
+            errors.append((n, str(e)))
+            continue
+        rules.append(Rule(severity, category, pattern))
+    return rules, errors
+
+
+def _literals(items):
+    # lower-cased strings of which at least one occurs in every match, or None
+    best = None
+    run = []
+
+    def take(cand):
+        if cand and (best is None or min(len(c) for c in cand) > min(len(c) for c in best)):
+            return cand
+        return best
+
+    for op, av in list(items) + [(None, None)]:
+        name = str(op).upper()
+        if name == "LITERAL":
+            run.append(av)
+            continue
+        if run:
+            best = take([bytes(run).lower()])
+            run = []
+        if name == "SUBPATTERN":
+            best = take(_literals(av[-1]))
+        elif name == "BRANCH":
+            branches = [_literals(b) for b in av[1]]
+            if all(branches):
+                best = take([c for b in branches for c in b])
+    return best
+
+
+def rule_literals(pattern):
+    try:
+        return _literals(sre_parse.parse(pattern))
+    except Exception:
+        return None
+
+
+def load_rules(paths=(USER_RULES_FILE, RULES_FILE)):
+    for path in paths:
+        try:
+            with open(path, "r") as f:
+                return parse_rules(f.read())
+        except IOError:
+            continue
+    return [], []
+
+
+class Classifier(object):
+
+    def __init__(self, rules):
+        self.rules = rules
+        if rules:
+            # ^ and $ hold at every line, also when a whole block is searched
+            self.regex = re.compile(b"|".join(b"(?P<r%d>%s)" % (i, r.pattern.encode("utf-8"))
+                                              for i, r in enumerate(rules)), re.MULTILINE)
+        else:
+            # matches nothing
+            self.regex = re.compile(b"(?!)")
+        self.search = self.regex.search
+        # prefilter over lowered text; without a literal for every rule
+        # the full matcher has to look at the whole log
+        keys = set()
+        for r in rules:
+            lits = rule_literals(r.pattern.encode("utf-8"))
+            if lits is None:
+                keys = None
+                break
+            keys.update(lits)
+        if keys:
+            self.prefilter = re.compile(b"|".join(re.escape(k) for k in sorted(keys, key=len, reverse=True)))
+        else:
+            self.prefilter = None
+
+    def _rule_of(self, m):
+        return int(m.lastgroup[1:])
+
+    def _best(self, buf, m, end):
+        # several rules may hit one line: the most severe one wins
+        best = self._rule_of(m)
+        pos = m.end()
+        while self.rules[best].rank and pos < end:
+            m = self.search(buf, pos, end)
+            if m is None:
+                break
+            i = self._rule_of(m)
+            if self.rules[i].rank < self.rules[best].rank:
+                best = i
+            pos = max(m.end(), pos + 1)
+        return best
+
+    def classify_line(self, raw):
+        # rule index for one line (bytes) or None
+        m = self.search(raw)
+        if m is None:
+            return None
+        return self._best(raw, m, len(raw))
+
+    def scan(self, buf, first_line=0, limit=MAX_TAGS):
+        # buf: bytes or mmap -> [(line, rule index, text)], one per tagged line
+        tags = deque(maxlen=limit)
+        size = len(buf)
+        line = first_line
+        pos = 0
+        while pos < size:
+            # blocks end at a line end, so a line is never split
+            end = min(size, pos + SCAN_BLOCK)
+            if end < size:
+                nl = buf.rfind(b"\n", pos, end)
+                end = nl + 1 if nl >= 0 else (buf.find(b"\n", end) + 1 or size)
+            block = buf[pos:end]
+            if self.prefilter is not None:
+                hay, find = block.lower(), self.prefilter.search
+            else:
+                hay, find = block, self.search
+            counted = 0
+            p = 0
+            while True:
+                m = find(hay, p)
+                if m is None:
+                    break
+                # the line the hit starts on; a match running into the next
+                # line is left to classify_line to confirm or drop
+                s = hay.rfind(b"\n", 0, m.start()) + 1
+                e = hay.find(b"\n", m.start())
+                if e < 0:
+                    e = len(hay)
+                raw = block[s:e]
+                rule = self.classify_line(raw)
+                if rule is not None:
+                    line += block.count(b"\n", counted, s)
+                    counted = s
+                    tags.append((line, rule, raw.rstrip(b"\r")[:SNIPPET_LEN].decode("utf-8", "replace")))
+                p = e + 1
+            line += block.count(b"\n", counted)
+            pos = end
+        return list(tags)
+
+    def describe(self, index):
+        r = self.rules[index]
+        return r.severity, r.category
+
+
+_classifier = None
+
+
+def get_classifier():
+    # shared instance, rules are read once
+    global _classifier
+    if _classifier is None:
+        rules, errors = load_rules()
+        for n, error in errors:
+            log("Severity rules line %d: %s" % (n, error), WARNING)
+        _classifier = Classifier(rules)
+    return _classifier
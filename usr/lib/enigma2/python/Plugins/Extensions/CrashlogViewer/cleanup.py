@@ -0,0 +1,68 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - batched log deletion
+# Files are grouped by mount first; read-only and vanished mounts are
+# skipped as a whole before anything is touched.
+
+from __future__ import print_function
+import os
+
+from .archive import remove_log
+from .mounts import get_mount_table
+
+
+class DeletePlan(object):
+
+    def __init__(self):
+        # mount point -> [paths], in mount order
+        self.batches = []
+        # (mount point, reason, number of files)
+        self.skipped = []
+
+    @property
+    def total(self):
+        return sum(len(paths) for mp, paths in self.batches)
+
+
+def plan_deletion(files, table=None):
+    if table is None:
+        table = get_mount_table()
+    by_mount = {}
+    order = []
+    for path in files:
+        m = table.resolve(path)
+        mp = m.mountpoint if m is not None else "/"
+        if mp not in by_mount:
+            by_mount[mp] = (m, [])
+            order.append(mp)
+        by_mount[mp][1].append(path)
+
+    plan = DeletePlan()
+    for mp in order:
+        m, paths = by_mount[mp]
+        if m is not None and m.readonly:
+            plan.skipped.append((mp, "read-only", len(paths)))
+        elif not os.path.isdir(mp):
+            plan.skipped.append((mp, "unavailable", len(paths)))
+        else:
+            plan.batches.append((mp, paths))
+    return plan
+
+
+def run_deletion(plan, progress=None):
+    # worker-thread helper; returns (deleted, [(path, error)])
+    deleted = 0
+    failed = []
+    total = plan.total
+    done = 0
+    for mp, paths in plan.batches:
+        for path in paths:
+            try:
+                # archives take their seek index with them
+                remove_log(path)
+                deleted += 1
+            except OSError as e:
+                failed.append((path, e.strerror or str(e)))
+            done += 1
+            if progress:
+                progress("delete", done, total)
+    return deleted, failed
@@ -0,0 +1,411 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - single pass crash log parser
+# Splits an enigma2 crash/debug log into sections (Python traceback, FATAL
+# SIGNAL backtrace, registers, memory maps, settings dump, dmesg) with their
+# byte and line offsets, and pulls out the key facts on the way. Every line
+# is looked at once and only a bounded amount of state is kept per line.
+
+from __future__ import print_function
+import mmap
+import os
+import re
+from collections import deque
+
+from .diag import span
+
+TOP_FRAMES = 5
+READ_BLOCK = 1024 * 1024
+# tagged lines kept per log (the newest ones), see classifier.py
+MAX_TAGS = 5000
+ARCHIVE_SUFFIXES = (".gz", ".xz")
+
+SECTION_TRACEBACK = "traceback"
+SECTION_BACKTRACE = "backtrace"
+SECTION_REGISTERS = "registers"
+SECTION_MAPS = "maps"
+SECTION_SETTINGS = "settings"
+SECTION_DMESG = "dmesg"
+
+# "< 1234.567> " (old) and "12:34:56.7890 " (new) enigma2 debug prefixes
+TIMESTAMP_RE = re.compile(br"^(?:<\s*\d+\.\d+>\s?|\d\d:\d\d:\d\d\.\d+\s)")
+# section headers, one search per line
+HEADER_RE = re.compile(
+    br"(?P<traceback>Traceback \(most recent call last\):)"
+    br"|(?P<backtrace>FATAL SIGNAL|^\s*Backtrace:)"
+    br"|(?P<registers>^\s*(?:Registers|regs)\s*:?\s*$)"
+    br"|(?P<maps>/proc/self/maps|^\s*maps:\s*$)"
+    br"|(?P<settings>^-*\s*enigma2 settings|^\s*<settings>)"
+    br"|(?P<dmesg>^-*\s*dmesg\b)",
+    re.I)
+# sections that may also start without a header, by their line shape
+RUN_RE = re.compile(
+    br"(?P<maps>^[0-9a-f]+-[0-9a-f]+ [r-][w-][x-][ps-] )"
+    br"|(?P<settings>^config\.[\w.]+=)"
+    br"|(?P<dmesg>^(?:<\d>)?\[\s*\d+\.\d+\])")
+# Any line feed() could open a section on, as two C-speed searches so
+# parse_buffer() can skip the ordinary lines between sections: markers that
+# may appear anywhere in a line, and line shapes matched right after "\n".
+MARKER_RE = re.compile(br"Traceback \(most recent call last\):|FATAL SIGNAL|/proc/self/maps", re.I)
+LINE_START_RE = re.compile(
+    br"\n(?:<[ \t]*\d+\.\d+>[ \t]?|\d\d:\d\d:\d\d\.\d+[ \t])?"
+    br"(?:[ \t]*(?:Backtrace:|Registers|regs|maps:|<settings>)|-*[ \t]*(?:enigma2 settings|dmesg)"
+    br"|[0-9a-f]+-[0-9a-f]+ [r-][w-][x-][ps-] |config\.|(?:<\d>)?\[[ \t]*\d+\.\d+\])",
+    re.I)
+COUNT_CHUNK = 1 << 20
+FRAME_RE = re.compile(br'^\s+File "([^"]+)", line (\d+), in (\S+)')
+EXCEPTION_RE = re.compile(br"^([A-Za-z_][\w.]*)(?::\s?(.*))?$")
+SIGNAL_RE = re.compile(br"(?:FATAL SIGNAL|signal)\s*:?\s*(\d+)", re.I)
+BT_FRAME_RE = re.compile(br"^\s*(/\S+?)(?:\(([^)]*)\))?\s*\[(0x[0-9a-fA-F]+)\]")
+REGISTER_LINE_RE = re.compile(br"^\s*[\w$]+(?:\s*-\s*[\w$]+)?\s*[:=]\s*(?:0x)?[0-9a-fA-F]{4,}")
+# enigma2's own signal handler frames, not the place of the crash
+HANDLER_FRAMES = (b"handleFatalSignal", b"__default_rt_sa_restorer", b"__restore", b"sigaction", b"oops")
+# lines a backtrace section may carry before its first frame
+BACKTRACE_PREAMBLE = 20
+
+
+def _text(raw):
+    return raw.decode("utf-8", "replace") if raw is not None else None
+
+
+class Section(object):
+    __slots__ = ("kind", "start_line", "end_line", "start_offset", "end_offset")
+
+    def __init__(self, kind, start_line, start_offset):
+        self.kind = kind
+        self.start_line = start_line
+        self.start_offset = start_offset
+        self.end_line = start_line
+        self.end_offset = start_offset
+
+    def to_list(self):
+        return [self.kind, self.start_line, self.end_line, self.start_offset, self.end_offset]
+
+    @classmethod
+    def from_list(cls, data):
+        s = cls(data[0], data[1], data[3])
+        s.end_line = data[2]
+        s.end_offset = data[4]
+        return s
+
+    def __repr__(self):
+        return "<Section %s lines %d-%d>" % (self.kind, self.start_line, self.end_line)
+
+
+class CrashReport(object):
+    # result of one parse; plain values only so it can be stored as JSON
+    FIELDS = ("lines", "size", "signal", "exception_type", "exception_message",
+              "module", "frames", "native_frames", "tracebacks")
+
+    def __init__(self):
+        self.lines = 0
+        self.size = 0
+        self.signal = None
+        self.exception_type = None
+        self.exception_message = None
+        self.module = None
+        # innermost last: (file, line, function) / (module, symbol, address)
+        self.frames = []
+        self.native_frames = []
+        self.tracebacks = 0
+        self.sections = []
+        # (line, rule index, text) from a classifier, not stored in the cache
+        self.tags = []
+
+    def sections_of(self, kind):
+        return [s for s in self.sections if s.kind == kind]
+
+    def summary(self, short=False):
+        # short: file names without their directory, for list entries
+        parts = []
+        if self.signal is not None:
+            parts.append("SIGNAL %d" % self.signal)
+        if self.exception_type:
+            exc = self.exception_type
+            if self.exception_message:
+                exc += ": " + self.exception_message
+            parts.append(exc)
+        if self.frames:
+            f = self.frames[-1]
+            parts.append("%s:%s %s" % (os.path.basename(f[0]) if short else f[0], f[1], f[2]))
+        elif self.module:
+            parts.append(os.path.basename(self.module) if short else self.module)
+        return " | ".join(parts)
+
+    def to_dict(self):
+        d = dict((k, getattr(self, k)) for k in self.FIELDS)
+        d["sections"] = [s.to_list() for s in self.sections]
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        r = cls()
+        for k in cls.FIELDS:
+            if k in d:
+                setattr(r, k, d[k])
+        r.frames = [tuple(f) for f in r.frames or []]
+        r.native_frames = [tuple(f) for f in r.native_frames or []]
+        r.sections = [Section.from_list(s) for s in d.get("sections", [])]
+        return r
+
+
+class CrashLogParser(object):
+
+    def __init__(self, top_frames=TOP_FRAMES):
+        self.report = CrashReport()
+        self.top_frames = top_frames
+        self.line = 0
+        self.offset = 0
+        self.current = None
+        self.frames = deque(maxlen=top_frames)
+        self.seen_frame = False
+        self.preamble = 0
+
+    # --- sections ---
+    def _open(self, kind):
+        self._close()
+        self.current = Section(kind, self.line, self.offset)
+        self.seen_frame = False
+        self.preamble = 0
+        if kind == SECTION_TRACEBACK:
+            self.frames.clear()
+
+    def _close(self, include_line=False):
+        cur = self.current
+        if cur is None:
+            return
+        if include_line:
+            cur.end_line = self.line + 1
+            cur.end_offset = self.next_offset
+        self.report.sections.append(cur)
+        self.current = None
+
+    def _extend(self):
+        self.current.end_line = self.line + 1
+        self.current.end_offset = self.next_offset
+
+    def _continues(self, kind, body):
+        # True if `body` still belongs to the open section of `kind`
+        if kind == SECTION_TRACEBACK:
+            if not body.strip() or body[:1] in b" \t":
+                m = FRAME_RE.match(body)
+                if m:
+                    self.frames.append((_text(m.group(1)), int(m.group(2)), _text(m.group(3))))
+                return True
+            m = EXCEPTION_RE.match(body.rstrip())
+            if m is None:
+                return False
+            r = self.report
+            r.exception_type = _text(m.group(1))
+            r.exception_message = _text(m.group(2).strip()) if m.group(2) else None
+            r.frames = list(self.frames)
+            if r.frames:
+                r.module = r.frames[-1][0]
+            r.tracebacks += 1
+            self._close(include_line=True)
+            return None
+        if kind == SECTION_BACKTRACE:
+            m = BT_FRAME_RE.match(body)
+            if m:
+                self.seen_frame = True
+                self._native_frame(m)
+                return True
+            if b"FATAL SIGNAL" in body or body.lstrip().startswith(b"-") or not body.strip():
+                return True
+            if not self.seen_frame:
+                self.preamble += 1
+                return self.preamble <= BACKTRACE_PREAMBLE
+            return False
+        if not body.strip():
+            return True
+        if kind == SECTION_REGISTERS:
+            return REGISTER_LINE_RE.match(body) is not None
+        m = RUN_RE.match(body)
+        return m is not None and m.lastgroup == kind
+
+    def _native_frame(self, m):
+        r = self.report
+        raw_symbol = m.group(2) or b""
+        module = _text(m.group(1))
+        if not r.native_frames and any(h in raw_symbol for h in HANDLER_FRAMES):
+            return
+        if len(r.native_frames) < self.top_frames:
+            r.native_frames.append((module, _text(raw_symbol), _text(m.group(3))))
+            if len(r.native_frames) == 1 and r.signal is not None:
+                r.module = module
+
+    # --- input ---
+    def feed(self, raw):
+        # raw: one line as bytes, including its newline
+        self.next_offset = self.offset + len(raw)
+        m = TIMESTAMP_RE.match(raw)
+        body = raw[m.end():] if m else raw
+        body = body.rstrip(b"\r\n")
+
+        header = HEADER_RE.search(body)
+        kind = header.lastgroup if header else None
+        if kind == SECTION_BACKTRACE:
+            sig = SIGNAL_RE.search(body)
+            if sig and self.report.signal is None:
+                self.report.signal = int(sig.group(1))
+
+        cur = self.current
+        if cur is not None:
+            if kind is not None and not (kind == cur.kind and kind != SECTION_TRACEBACK):
+                self._close()
+            else:
+                cont = self._continues(cur.kind, body)
+                if cont:
+                    self._extend()
+                elif cont is False:
+                    self._close()
+                    kind = self._run_kind(body)
+                    if kind:
+                        self._open(kind)
+                        self._extend()
+                self._advance()
+                return
+
+        if kind is None:
+            kind = self._run_kind(body)
+        if kind is not None:
+            self._open(kind)
+            self._extend()
+        self._advance()
+
+    def _run_kind(self, body):
+        m = RUN_RE.match(body)
+        return m.lastgroup if m else None
+
+    def skip(self, lines, nbytes):
+        # ordinary lines outside any section
+        self.line += lines
+        self.offset += nbytes
+
+    def _advance(self):
+        self.line += 1
+        self.offset = self.next_offset
+
+    def close(self):
+        self._close()
+        r = self.report
+        r.lines = self.line
+        r.size = self.offset
+        if r.module is None and r.native_frames:
+            r.module = r.native_frames[0][0]
+        return r
+
+
+def parse_stream(f, top_frames=TOP_FRAMES):
+    # f: binary file object or any iterable of byte lines
+    parser = CrashLogParser(top_frames)
+    feed = parser.feed
+    for raw in f:
+        feed(raw)
+    return parser.close()
+
+
+def _count_lines(buf, start, end):
+    n = 0
+    for a in range(start, end, COUNT_CHUNK):
+        n += buf[a:min(a + COUNT_CHUNK, end)].count(b"\n")
+    if end > start and buf[end - 1:end] != b"\n":
+        n += 1
+    return n
+
+
+def parse_buffer(buf, top_frames=TOP_FRAMES):
+    # buf: bytes or mmap. Outside of sections the parser jumps from one
+    # possible section start to the next, so only section lines are fed
+    # one by one.
+    parser = CrashLogParser(top_frames)
+    size = len(buf)
+    find = buf.find
+    rfind = buf.rfind
+    marker = line_start = None
+    pos = 0
+    while pos < size:
+        if parser.current is None and pos > 0:
+            # both searches are reused until the scan has passed them
+            if marker and marker.start() < pos:
+                marker = None
+            if marker is None:
+                marker = MARKER_RE.search(buf, pos) or False
+            if line_start and line_start.start() < pos - 1:
+                line_start = None
+            if line_start is None:
+                line_start = LINE_START_RE.search(buf, pos - 1) or False
+            start = size
+            if marker:
+                start = rfind(b"\n", pos, marker.start()) + 1 or pos
+            if line_start:
+                start = min(start, line_start.start() + 1)
+            if start > pos:
+                parser.skip(_count_lines(buf, pos, start), start - pos)
+                pos = start
+                continue
+        nl = find(b"\n", pos)
+        end = size if nl < 0 else nl + 1
+        parser.feed(buf[pos:end])
+        pos = end
+    return parser.close()
+
+
+def parse_blocks(f, top_frames=TOP_FRAMES, classifier=None):
+    # f: binary file object read in blocks that end at line ends, so the
+    # classifier can look at the same block the parser is fed from
+    parser = CrashLogParser(top_frames)
+    feed = parser.feed
+    tags = deque(maxlen=MAX_TAGS)
+    line = 0
+    carry = b""
+    while True:
+        chunk = f.read(READ_BLOCK)
+        data = carry + chunk
+        if chunk:
+            cut = data.rfind(b"\n") + 1
+            data, carry = data[:cut], data[cut:]
+        if data:
+            # only "\n" ends a line, as in parse_buffer(); splitlines() would
+            # also cut at a bare "\r" and other separators
+            pos = 0
+            size = len(data)
+            find = data.find
+            while pos < size:
+                nl = find(b"\n", pos)
+                end = size if nl < 0 else nl + 1
+                feed(data[pos:end])
+                pos = end
+            if classifier is not None:
+                tags.extend(classifier.scan(data, line))
+                line += data.count(b"\n")
+        if not chunk:
+            break
+    report = parser.close()
+    report.tags = list(tags)
+    return report
+
+
+def parse_file(path, top_frames=TOP_FRAMES, classifier=None):
+    # classifier: tags lines in the same pass (see classifier.Classifier)
+    with span("parse", os.path.basename(path)):
+        return _parse_file(path, top_frames, classifier)
+
+
+def _parse_file(path, top_frames, classifier):
+    if path.endswith(ARCHIVE_SUFFIXES):
+        # compressed logs cannot be mapped; they are parsed while decompressing
+        from .archive import open_log
+        with open_log(path) as f:
+            return parse_blocks(f, top_frames, classifier)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return parse_stream([], top_frames)
+        mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        try:
+            report = parse_buffer(mm, top_frames)
+            if classifier is not None:
+                report.tags = classifier.scan(mm)
+            return report
+        finally:
+            mm.close()
@@ -0,0 +1,165 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - diagnostics
+# Log messages with levels, timing spans and counters. Messages go to a ring
+# buffer at once and to the log file in batches; the file is capped (one
+# previous file is kept) because /tmp lives in RAM on most boxes. The
+# diagnostics screen shows the spans, counters and newest messages.
+
+from __future__ import print_function
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARN", ERROR: "ERROR"}
+
+LOG_FILE = "/tmp/CrashlogViewer.log"
+# bytes; when full the file becomes LOG_FILE.1
+MAX_LOG_SIZE = 128 * 1024
+RING_SIZE = 300
+SPAN_HISTORY = 100
+# pending lines are written once there are this many, after this many
+# seconds, with the first error or at exit
+FLUSH_LINES = 50
+FLUSH_INTERVAL = 10.0
+
+
+class SpanStats(object):
+    __slots__ = ("count", "total", "max", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+class Diagnostics(object):
+
+    def __init__(self, path=LOG_FILE, level=INFO, echo_level=WARNING, max_size=MAX_LOG_SIZE):
+        self.path = path
+        # written to the file from this level on, printed (enigma2 debug log)
+        # from echo_level on; the ring buffer keeps everything
+        self.level = level
+        self.echo_level = echo_level
+        self.max_size = max_size
+        self.ring = deque(maxlen=RING_SIZE)
+        self.pending = []
+        self.last_flush = time.time()
+        self.spans = {}
+        self.recent = deque(maxlen=SPAN_HISTORY)
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def log(self, msg, level=INFO):
+        now = time.time()
+        self.ring.append((now, level, msg))
+        if level >= self.echo_level:
+            try:
+                print("[CrashlogViewer] " + msg)
+            except Exception:
+                pass
+        if level < self.level:
+            return
+        line = "%s %-5s %s\n" % (time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)), LEVEL_NAMES.get(level, level), msg)
+        with self.lock:
+            if level >= WARNING:
+                name = "log." + LEVEL_NAMES[level].lower()
+                self.counters[name] = self.counters.get(name, 0) + 1
+            self.pending.append(line)
+            due = len(self.pending) >= FLUSH_LINES or level >= ERROR or now - self.last_flush >= FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            lines, self.pending = self.pending, []
+            self.last_flush = time.time()
+            if not lines or not self.path:
+                return
+            data = "".join(lines)
+            try:
+                try:
+                    size = os.path.getsize(self.path)
+                except OSError:
+                    size = 0
+                if size and size + len(data) > self.max_size:
+                    os.rename(self.path, self.path + ".1")
+                with open(self.path, "a") as f:
+                    f.write(data)
+            except Exception:
+                pass
+
+    @contextmanager
+    def span(self, name, detail=None):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.time() - start, detail)
+
+    def add_span(self, name, seconds, detail=None):
+        with self.lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats()
+            stats.add(seconds)
+            self.recent.append((time.time(), name, seconds, detail))
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        # consistent copies for the screen:
+        # ([(name, count, total, max, last)], [(time, name, seconds, detail)],
+        #  [(name, value)], [(time, level, msg)])
+        with self.lock:
+            spans = [(name, s.count, s.total, s.max, s.last) for name, s in self.spans.items()]
+            recent = list(self.recent)
+            counters = sorted(self.counters.items())
+            messages = list(self.ring)
+        spans.sort(key=lambda s: s[2], reverse=True)
+        return spans, recent, counters, messages
+
+
+_diagnostics = None
+
+
+def get_diagnostics():
+    # shared instance, flushed at exit
+    global _diagnostics
+    if _diagnostics is None:
+        _diagnostics = Diagnostics()
+        atexit.register(_diagnostics.flush)
+    return _diagnostics
+
+
+def log(msg, level=INFO):
+    get_diagnostics().log(msg, level)
+
+
+def span(name, detail=None):
+    # with span("parse", path): ...
+    return get_diagnostics().span(name, detail)
+
+
+def count(name, n=1):
+    get_diagnostics().count(name, n)
+
+
+def flush():
+    get_diagnostics().flush()
@@ -0,0 +1,121 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - log discovery
+# Every candidate directory is listed once with scandir and matched against
+# all name patterns in one compiled regex. Roots are grouped by mount and
+# each mount is scanned in its own thread, so a spun-down disk or a dead
+# network mount only costs its own timeout.
+
+from __future__ import print_function
+import fnmatch
+import os
+import re
+import threading
+import time
+
+from .crashparser import ARCHIVE_SUFFIXES
+from .diag import span
+from .mounts import get_mount_table
+
+LOG_PATTERNS = ("*crash*.log", "*debug*.log", "*network*.log")
+# archived logs keep their name plus .gz/.xz
+LOG_NAME_RE = re.compile("|".join("(?:%s)" % fnmatch.translate(p + s)
+                                  for p in LOG_PATTERNS for s in ("",) + ARCHIVE_SUFFIXES))
+# always looked at, also when the mount table cannot be read
+STATIC_ROOTS = ("/home/root/logs", "/media/usb/logs", "/media/hdd/logs")
+# mount points below these are searched for a "logs" directory
+MEDIA_PREFIXES = ("/media/", "/mnt/", "/autofs/")
+SCAN_TIMEOUT = 3.0
+
+
+def log_roots(base_path, table=None):
+    # base path, <mountpoint>/logs of every media mount and the static roots
+    if table is None:
+        table = get_mount_table()
+    roots = [base_path.rstrip("/") or "/"]
+    for m in table.media_mounts(MEDIA_PREFIXES):
+        roots.append(os.path.join(m.mountpoint, "logs"))
+    roots.extend(STATIC_ROOTS)
+    seen = set()
+    unique = []
+    for root in roots:
+        if root not in seen:
+            seen.add(root)
+            unique.append(root)
+    return unique
+
+
+def mount_of(path, table):
+    m = table.resolve(path)
+    return m.mountpoint if m is not None else "/"
+
+
+def scan_dir(path, match=LOG_NAME_RE.match):
+    # [(path, stat)] for matching regular files; DirEntry keeps the stat.
+    # Names are matched first and only the matches are stat'ed, which also
+    # shows listing and stat as separate spans.
+    found = []
+    try:
+        it = os.scandir(path)
+    except OSError:
+        return found
+    try:
+        with span("list", path):
+            entries = [entry for entry in it if match(entry.name)]
+    finally:
+        close = getattr(it, "close", None)
+        if close:
+            close()
+    with span("stat", path):
+        for entry in entries:
+            try:
+                if entry.is_file():
+                    found.append((entry.path, entry.stat()))
+            except OSError:
+                pass
+    return found
+
+
+def discover_logs(base_path, table=None, timeout=SCAN_TIMEOUT):
+    # Returns ([(path, stat)] sorted by path, [mount points that timed out]).
+    if table is None:
+        table = get_mount_table()
+    by_mount = {}
+    for root in log_roots(base_path, table):
+        by_mount.setdefault(mount_of(root, table), []).append(root)
+
+    results = {}
+
+    def worker(mp, roots):
+        found = []
+        for root in roots:
+            found.extend(scan_dir(root))
+        results[mp] = found
+
+    threads = []
+    for mp, roots in by_mount.items():
+        t = threading.Thread(target=worker, args=(mp, roots), name="CrashlogScan %s" % mp)
+        # a thread stuck in the kernel on a dead mount must not keep enigma2 alive
+        t.daemon = True
+        t.start()
+        threads.append((mp, t))
+
+    deadline = time.time() + timeout
+    timed_out = []
+    for mp, t in threads:
+        t.join(max(0.0, deadline - time.time()))
+        if t.is_alive():
+            timed_out.append(mp)
+
+    entries = []
+    seen = set()
+    for mp, t in threads:
+        if mp in timed_out:
+            continue
+        for path, st in results.get(mp, ()):
+            # symlinked mount points (/media/usb -> /media/sda1) list files twice
+            key = (st.st_dev, st.st_ino)
+            if key not in seen:
+                seen.add(key)
+                entries.append((path, st))
+    entries.sort(key=lambda e: e[0])
+    return entries, timed_out
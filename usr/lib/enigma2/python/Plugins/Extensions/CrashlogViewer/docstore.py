@@ -0,0 +1,224 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - opened logs, kept for the next time
+# A document is what the viewer needs to show a log: the parse result with
+# its severity tags and sections, and either the lines of a small log or
+# the state of the line index of a large one (no mmap, just the offsets).
+# Documents are kept by path under a memory budget, least recently used
+# out first, and are only valid for the same inode, size and mtime. While
+# the cursor rests on a list entry, a background thread loads that log and
+# its neighbours, so opening one of them skips the file scan and the parse.
+
+from __future__ import print_function
+import os
+import threading
+from collections import OrderedDict
+
+from .archive import is_archive, lower_thread_priority, open_line_index
+from .crashparser import parse_file
+from .diag import DEBUG, count, log, span
+from .logcache import stat_key
+
+# logs from this size on are shown page by page through a LineIndex
+PAGED_LOG_SIZE = 512 * 1024
+# bytes (estimated) of documents kept
+DOC_CACHE_BUDGET = 8 * 1024 * 1024
+# larger logs are only loaded when they are opened
+PREFETCH_MAX_SIZE = 50 * 1024 * 1024
+# list entries above and below the current one that are loaded too
+PREFETCH_NEIGHBOURS = 1
+
+
+class Document(object):
+    __slots__ = ("path", "key", "report", "index_state", "lines", "cost")
+
+    def __init__(self, path, key, report, index_state=None, lines=None):
+        self.path = path
+        self.key = key
+        self.report = report
+        self.index_state = index_state
+        # small logs only: the decoded lines
+        self.lines = lines
+        self.cost = self.estimate()
+
+    def estimate(self):
+        # rough bytes held, for the budget; the index offsets are 8 bytes each
+        cost = 1024 + 120 * len(self.report.tags) + 100 * len(self.report.sections)
+        if self.index_state is not None:
+            # LineIndex: checkpoint offsets, archives: a short list per block
+            cost += 100 * len(self.index_state[3]) if is_archive(self.path) else 8 * len(self.index_state[3])
+        if self.lines is not None:
+            cost += sum(len(line) + 56 for line in self.lines)
+        return cost
+
+    def open_index(self):
+        return open_line_index(self.path, self.index_state)
+
+
+def load_document(path, classifier=None, index=None, lines=None):
+    # worker-thread helper; index/lines: what the viewer already has open
+    st = os.stat(path)
+    report = parse_file(path, classifier=classifier)
+    paged = is_archive(path) or st.st_size >= PAGED_LOG_SIZE
+    state = None
+    if paged:
+        # an archive index counts the decompressed size
+        if index is not None and (is_archive(path) or index.size == st.st_size):
+            state = index.state()
+        else:
+            with span("index", os.path.basename(path)):
+                index = open_line_index(path)
+                state = index.state()
+                index.close()
+        lines = None
+    elif lines is None:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.readlines()
+    return Document(path, stat_key(st), report, state, lines)
+
+
+class DocumentCache(object):
+
+    def __init__(self, budget=DOC_CACHE_BUDGET):
+        self.budget = budget
+        self.used = 0
+        self.docs = OrderedDict()
+        self.lock = threading.Lock()
+        # path -> Event while a thread loads it, so it is not loaded twice
+        self.loading = {}
+
+    def get(self, path, st=None):
+        # the document of the unchanged file, or None
+        try:
+            key = stat_key(st or os.stat(path))
+        except OSError:
+            return None
+        with self.lock:
+            doc = self.docs.get(path)
+            if doc is None or doc.key != key:
+                count("docs.misses")
+                return None
+            self.docs.move_to_end(path)
+        count("docs.hits")
+        return doc
+
+    def has(self, path, st):
+        # like get(), without counting hits and misses
+        with self.lock:
+            doc = self.docs.get(path)
+            return doc is not None and doc.key == stat_key(st)
+
+    def put(self, doc):
+        with self.lock:
+            old = self.docs.pop(doc.path, None)
+            if old is not None:
+                self.used -= old.cost
+            if doc.cost > self.budget:
+                return
+            self.docs[doc.path] = doc
+            self.used += doc.cost
+            while self.used > self.budget:
+                path, old = self.docs.popitem(last=False)
+                self.used -= old.cost
+                count("docs.evicted")
+
+    def discard(self, path):
+        with self.lock:
+            old = self.docs.pop(path, None)
+            if old is not None:
+                self.used -= old.cost
+
+    def load(self, path, classifier=None, index=None, lines=None):
+        # worker-thread helper: the cached document, else a new one
+        while True:
+            st = os.stat(path)
+            if self.has(path, st):
+                return self.get(path, st)
+            with self.lock:
+                busy = self.loading.get(path)
+                if busy is None:
+                    busy = self.loading[path] = threading.Event()
+                    break
+            # loaded by another thread right now, e.g. the prefetcher
+            busy.wait()
+        try:
+            doc = load_document(path, classifier, index, lines)
+            self.put(doc)
+            return doc
+        finally:
+            with self.lock:
+                del self.loading[path]
+            busy.set()
+
+    def clear(self):
+        with self.lock:
+            self.docs.clear()
+            self.used = 0
+
+
+class Prefetcher(object):
+    # one low-priority thread; want() replaces what is still waiting
+
+    def __init__(self, cache, classifier=None):
+        self.cache = cache
+        self.classifier = classifier
+        self.pending = []
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def want(self, paths):
+        with self.cond:
+            self.pending = list(paths)
+            if self.pending and self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="CrashlogPrefetch")
+                self.thread.daemon = True
+                self.thread.start()
+            self.cond.notify()
+
+    def _take(self):
+        with self.cond:
+            while not self.pending:
+                self.cond.wait()
+            return self.pending.pop(0)
+
+    def _run(self):
+        lower_thread_priority()
+        while True:
+            path = self._take()
+            try:
+                st = os.stat(path)
+                if st.st_size > PREFETCH_MAX_SIZE or self.cache.has(path, st):
+                    continue
+                with span("prefetch", os.path.basename(path)):
+                    self.cache.load(path, self.classifier)
+                count("prefetch.loads")
+            except Exception as e:
+                log("Prefetching %s failed: %s" % (path, e), DEBUG)
+
+
+def neighbours(paths, index, n=PREFETCH_NEIGHBOURS):
+    # the entry at index first, then the ones around it, nearest first
+    out = [paths[index]] if 0 <= index < len(paths) else []
+    for d in range(1, n + 1):
+        for i in (index + d, index - d):
+            if 0 <= i < len(paths):
+                out.append(paths[i])
+    return out
+
+
+_cache = None
+_prefetcher = None
+
+
+def get_document_cache():
+    global _cache
+    if _cache is None:
+        _cache = DocumentCache()
+    return _cache
+
+
+def get_prefetcher(classifier=None):
+    # shared, on the shared cache
+    global _prefetcher
+    if _prefetcher is None:
+        _prefetcher = Prefetcher(get_document_cache(), classifier)
+    return _prefetcher
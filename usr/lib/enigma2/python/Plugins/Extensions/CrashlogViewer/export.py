@@ -0,0 +1,260 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - bug report bundle
+# Logs are streamed into a zip or tar.gz chunk by chunk, cut at line ends,
+# and every chunk goes through one compiled regex that masks passwords,
+# credentials in URLs, IP and MAC addresses and mail addresses on the way.
+# Nothing is read as a whole, so the bundle size only costs disk space.
+# MAX_EXPORT_SIZE caps the log text that goes in; the log that reaches it is
+# cut, the ones after it are left out and listed in the manifest.
+
+from __future__ import print_function
+import os
+import platform
+import re
+import tarfile
+import tempfile
+import time
+import zipfile
+
+from .archive import is_archive, open_log
+from .diag import count, span
+
+EXPORT_FORMATS = ("zip", "tar.gz")
+EXPORT_CHUNK = 256 * 1024
+# bytes of log text per bundle (before compression)
+MAX_EXPORT_SIZE = 100 * 1024 * 1024
+# a line longer than this is cut, so a chunk never grows without end
+MAX_LINE = 64 * 1024
+TRUNCATED_NOTE = b"\n[... truncated by CrashlogViewer export, size limit reached ...]\n"
+# tar entries up to this size are spooled in memory, larger ones on disk
+# next to the bundle (/tmp is RAM on most boxes)
+SPOOL_MAX = 1024 * 1024
+
+BOX_INFO_FILES = (
+    ("model", "/proc/stb/info/model"),
+    ("boxtype", "/proc/stb/info/boxtype"),
+    ("vumodel", "/proc/stb/info/vumodel"),
+    ("hwmodel", "/proc/stb/info/hwmodel"),
+    ("chipset", "/proc/stb/info/chipset"),
+)
+IMAGE_VERSION_FILE = "/etc/image-version"
+ISSUE_FILE = "/etc/issue"
+MEMINFO_FILE = "/proc/meminfo"
+
+# one pass for everything; the lookahead skips most positions before the
+# alternatives are tried, octets of IP addresses are checked afterwards.
+# Chunks hold many lines, so nothing may match across a line end.
+REDACT_RE = re.compile(
+    br"(?=[:\w])(?:"
+    br"(?P<url>://[^/\s:@]+:[^/\s@]+@)"
+    br"|(?P<secret>(?i:pass(?:word|wd)|pwd|psk|secret|token|api_?key)[ \t]*[=:][ \t]*)\S+"
+    br"|\b(?:(?P<mac>[0-9A-Fa-f]{2}(?::[0-9A-Fa-f]{2}){5})"
+    br"|(?P<ip>\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})"
+    br"|(?P<email>[\w.+-]+@[\w-]+(?:\.[\w-]+)+))\b)"
+)
+KEEP_IPS = (b"127.0.0.1", b"0.0.0.0", b"255.255.255.255")
+REDACTED = b"<redacted>"
+
+
+class Redactor(object):
+    # masks what REDACT_RE finds and counts it per kind
+
+    def __init__(self):
+        self.counts = {}
+
+    def _replace(self, m):
+        kind = m.lastgroup
+        if kind == "ip" and (m.group() in KEEP_IPS or max(map(int, m.group().split(b"."))) > 255):
+            return m.group()
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if kind == "url":
+            return b"://" + REDACTED + b"@"
+        if kind == "secret":
+            return m.group("secret") + REDACTED
+        return b"<" + kind.encode() + b">"
+
+    def __call__(self, data):
+        return REDACT_RE.sub(self._replace, data)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+
+def _chunks(f, limit, chunk_size=EXPORT_CHUNK):
+    # (data, truncated): blocks of whole lines, at most limit bytes in all
+    rest = b""
+    left = limit
+    while left > 0:
+        data = f.read(min(chunk_size, left))
+        if not data:
+            break
+        left -= len(data)
+        data = rest + data
+        end = data.rfind(b"\n") + 1
+        if not end and len(data) >= MAX_LINE:
+            end = len(data)
+        rest = data[end:]
+        if end:
+            yield data[:end], False
+    truncated = left <= 0 and f.read(1) != b""
+    if truncated:
+        # the last, partial line is dropped
+        yield TRUNCATED_NOTE, True
+    elif rest:
+        yield rest, False
+
+
+def redacted_chunks(path, limit, redactor):
+    # yields the redacted text of one log; archives are decompressed
+    with open_log(path) as f:
+        for data, truncated in _chunks(f, limit):
+            yield data if truncated else redactor(data)
+
+
+def _read_text(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except Exception:
+        return ""
+
+
+def box_info(extra=()):
+    # [(key, value)] about the box and image, read from /proc and /etc
+    info = list(extra)
+    for key, path in BOX_INFO_FILES:
+        value = _read_text(path)
+        if value:
+            info.append((key, value))
+    for line in _read_text(IMAGE_VERSION_FILE).splitlines():
+        if "=" in line:
+            key, value = line.split("=", 1)
+            info.append(("image." + key.strip(), value.strip()))
+    issue = _read_text(ISSUE_FILE).splitlines()
+    if issue:
+        info.append(("issue", issue[0].replace("\\n", "").replace("\\l", "").strip()))
+    info.append(("kernel", " ".join(platform.uname()[2:5])))
+    info.append(("python", platform.python_version()))
+    for line in _read_text(MEMINFO_FILE).splitlines():
+        if line.startswith(("MemTotal:", "MemAvailable:")):
+            key, value = line.split(":", 1)
+            info.append((key, value.strip()))
+    info.append(("exported", time.strftime("%Y-%m-%d %H:%M:%S")))
+    return info
+
+
+def bundle_name(fmt, now=None):
+    return time.strftime("crashlogs_%Y%m%d_%H%M%S", time.localtime(now)) + "." + fmt
+
+
+def _member_names(files):
+    # logs/<name>, archives under the name of the log inside, no clashes
+    names = []
+    seen = set()
+    for path in files:
+        name = os.path.basename(path)
+        if is_archive(path):
+            name = name.rsplit(".", 1)[0]
+        base, ext = os.path.splitext(name)
+        n = 1
+        while name in seen:
+            n += 1
+            name = "%s_%d%s" % (base, n, ext)
+        seen.add(name)
+        names.append("logs/" + name)
+    return names
+
+
+class _ZipBundle(object):
+
+    def __init__(self, path):
+        self.zf = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+
+    def add(self, name, chunks):
+        # returns the bytes written
+        written = 0
+        info = zipfile.ZipInfo(name, time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        with self.zf.open(info, "w", force_zip64=True) as out:
+            for data in chunks:
+                out.write(data)
+                written += len(data)
+        return written
+
+    def close(self):
+        self.zf.close()
+
+
+class _TarBundle(object):
+    # a tar header needs the entry size up front and the redacted size is
+    # only known afterwards, so every entry is redacted once into a spool
+    # file and copied from there
+
+    def __init__(self, path):
+        self.tf = tarfile.open(path, "w:gz")
+        self.spool_dir = os.path.dirname(os.path.abspath(path))
+
+    def add(self, name, chunks):
+        with tempfile.SpooledTemporaryFile(SPOOL_MAX, dir=self.spool_dir) as spool:
+            for data in chunks:
+                spool.write(data)
+            info = tarfile.TarInfo(name)
+            info.size = spool.tell()
+            info.mtime = int(time.time())
+            info.mode = 0o644
+            spool.seek(0)
+            self.tf.addfile(info, spool)
+        return info.size
+
+    def close(self):
+        self.tf.close()
+
+
+def export_logs(files, target, fmt="zip", max_size=MAX_EXPORT_SIZE, extra_info=(), progress=None):
+    # worker-thread helper; writes the bundle to target (a file path) and
+    # returns (written files, left out files, redactions)
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError("unknown export format: %s" % fmt)
+    redactor = Redactor()
+    written = []
+    left_out = []
+    budget = max_size
+    # written under a temporary name, a failed export leaves no partial bundle
+    tmp = target + ".tmp"
+    try:
+        bundle = _ZipBundle(tmp) if fmt == "zip" else _TarBundle(tmp)
+        try:
+            with span("export", target):
+                info = "".join("%s: %s\n" % item for item in box_info(extra_info)).encode("utf-8", "replace")
+                bundle.add("boxinfo.txt", [redactor(info)])
+                for n, (path, name) in enumerate(zip(files, _member_names(files))):
+                    if progress:
+                        progress("export", n, len(files))
+                    if budget <= 0 or not os.path.exists(path):
+                        left_out.append(path)
+                        continue
+                    size = bundle.add(name, redacted_chunks(path, budget, redactor))
+                    budget -= size
+                    written.append((path, name, size))
+                manifest = ["%-40s %10d  %s" % (name, size, path) for path, name, size in written]
+                manifest.extend("%-40s %10s  %s" % ("-", "left out", path) for path in left_out)
+                manifest.append("")
+                manifest.append("redacted: " + (", ".join("%s %d" % item for item in sorted(redactor.counts.items())) or "nothing"))
+                manifest.append("size limit: %d bytes" % max_size)
+                data = ("\n".join(manifest) + "\n").encode("utf-8", "replace")
+                bundle.add("manifest.txt", [data])
+        finally:
+            bundle.close()
+        os.rename(tmp, target)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    if progress:
+        progress("export", len(files), len(files))
+    count("export.bytes", os.path.getsize(target))
+    return written, left_out, redactor.total
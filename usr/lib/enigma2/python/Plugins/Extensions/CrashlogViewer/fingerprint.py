@@ -0,0 +1,78 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - crash signatures
+# A signature is the exception type (or signal) plus the innermost frames,
+# normalized so that addresses, line numbers, pids and timestamps do not
+# split one bug into many groups.
+
+from __future__ import print_function
+import hashlib
+import os
+import re
+
+FINGERPRINT_FRAMES = 3
+NO_SIGNATURE = ""
+
+ADDRESS_RE = re.compile(r"0x[0-9a-fA-F]+|\b[0-9a-fA-F]{8,16}\b")
+OFFSET_RE = re.compile(r"\+0x[0-9a-fA-F]+|\+\d+")
+NUMBER_RE = re.compile(r"\d+")
+
+
+def normalize(text):
+    text = OFFSET_RE.sub("", text or "")
+    text = ADDRESS_RE.sub("#", text)
+    return NUMBER_RE.sub("#", text).strip()
+
+
+def signature_parts(report, frames=FINGERPRINT_FRAMES):
+    parts = []
+    if report.exception_type:
+        parts.append(report.exception_type)
+        for path, line, function in report.frames[-frames:]:
+            # line numbers change with every plugin release, names do not
+            parts.append("%s:%s" % (os.path.basename(path), function))
+    if report.signal is not None:
+        parts.append("SIGNAL %d" % report.signal)
+        for module, symbol, address in report.native_frames[:frames]:
+            parts.append("%s(%s)" % (os.path.basename(module), normalize(symbol)))
+    return parts
+
+
+def fingerprint(report, frames=FINGERPRINT_FRAMES):
+    # short hex digest, or NO_SIGNATURE for logs without a crash
+    parts = signature_parts(report, frames)
+    if not parts:
+        return NO_SIGNATURE
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
+class CrashGroup(object):
+
+    def __init__(self, signature, title):
+        self.signature = signature
+        self.title = title
+        self.files = []
+        self.first_seen = None
+        self.last_seen = None
+
+    @property
+    def count(self):
+        return len(self.files)
+
+    def add(self, path, mtime):
+        self.files.append(path)
+        if self.first_seen is None or mtime < self.first_seen:
+            self.first_seen = mtime
+        if self.last_seen is None or mtime > self.last_seen:
+            self.last_seen = mtime
+
+
+def group_logs(items):
+    # items: iterable of (path, mtime, signature, title); returns groups,
+    # newest crash first and logs without a signature last
+    groups = {}
+    for path, mtime, signature, title in items:
+        group = groups.get(signature)
+        if group is None:
+            group = groups[signature] = CrashGroup(signature, title)
+        group.add(path, mtime)
+    return sorted(groups.values(), key=lambda g: (g.signature != NO_SIGNATURE, g.last_seen), reverse=True)
@@ -0,0 +1,182 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - follow a growing log
+# Only bytes appended since the last read are read. A truncated file is
+# read again from the start, a replaced one (new inode, log rotation) is
+# reopened. Lines are kept in a bounded ring, so following can run for
+# hours. inotify tells whether anything happened at all; where it is not
+# available (or on network mounts, which send no events) the file is stat'ed.
+
+from __future__ import print_function
+import ctypes
+import ctypes.util
+import os
+from collections import deque
+
+from .logindex import ERROR_MARKERS, MAX_ERROR_LINES
+
+FOLLOW_LINES = 2000
+# bytes read from the end of the file to fill the ring at the start
+FOLLOW_SEED = 256 * 1024
+# upper bound per check, the rest follows with the next one
+FOLLOW_MAX_READ = 1024 * 1024
+# a "line" without line end is cut here
+MAX_PARTIAL = 64 * 1024
+
+EVENT_TRUNCATED = "truncated"
+EVENT_ROTATED = "rotated"
+EVENT_MISSING = "missing"
+
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+
+
+def _libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        libc.inotify_init1
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class ChangeWatch(object):
+    # inotify on the file and its directory (a new file after rotation only
+    # shows up there); changed() is a non-blocking read, no stat needed.
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = -1
+        libc = _libc()
+        if libc is None:
+            return
+        fd = libc.inotify_init1(os.O_NONBLOCK | getattr(os, "O_CLOEXEC", 0))
+        if fd < 0:
+            return
+        self.libc = libc
+        self.fd = fd
+        if not self.watch_file() or libc.inotify_add_watch(
+                fd, os.path.dirname(path).encode() or b".", IN_CREATE | IN_MOVED_TO | IN_DELETE) < 0:
+            self.close()
+
+    @property
+    def available(self):
+        return self.fd >= 0
+
+    def watch_file(self):
+        mask = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVE_SELF | IN_DELETE_SELF
+        return self.libc.inotify_add_watch(self.fd, self.path.encode(), mask) >= 0
+
+    def changed(self):
+        if self.fd < 0:
+            return True
+        seen = False
+        while True:
+            try:
+                if not os.read(self.fd, 4096):
+                    break
+                seen = True
+            except OSError:
+                # EAGAIN: queue drained
+                break
+        return seen
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class LogFollower(object):
+
+    def __init__(self, path, max_lines=FOLLOW_LINES, match=ERROR_MARKERS.search):
+        # match(raw line) -> true for lines that go to the error ring
+        self.path = path
+        self.match = match
+        self.lines = deque(maxlen=max_lines)
+        self.errors = deque(maxlen=MAX_ERROR_LINES)
+        self.offset = 0
+        self.partial = b""
+        self.ident = None
+        # the last check stopped at FOLLOW_MAX_READ
+        self.more = False
+        self.watch = ChangeWatch(path)
+        self._seed()
+
+    def _seed(self):
+        # last lines of the file; following starts at its current end
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        self.ident = (st.st_dev, st.st_ino)
+        start = max(0, st.st_size - FOLLOW_SEED)
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            data = f.read(st.st_size - start)
+        self.offset = start + len(data)
+        if start:
+            # the first line is most likely cut
+            data = data[data.find(b"\n") + 1:]
+        self._add(data)
+
+    def close(self):
+        self.watch.close()
+
+    def _add(self, data):
+        # -> number of complete lines added
+        data = self.partial + data
+        parts = data.split(b"\n")
+        self.partial = parts.pop()
+        if len(self.partial) > MAX_PARTIAL:
+            parts.append(self.partial)
+            self.partial = b""
+        for raw in parts:
+            text = raw.rstrip(b"\r").decode("utf-8", "replace")
+            self.lines.append(text)
+            if self.match(raw):
+                self.errors.append(text)
+        return len(parts)
+
+    def _restart(self):
+        self.offset = 0
+        self.partial = b""
+
+    def check(self, force=False):
+        # -> (number of new lines, event or None); force skips the inotify test
+        if not force and not self.more and self.watch.available and not self.watch.changed():
+            return 0, None
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            # whatever appears here next is a new file, even with the old
+            # inode number and size
+            self._restart()
+            return 0, EVENT_MISSING
+        event = None
+        ident = (st.st_dev, st.st_ino)
+        if self.ident is not None and ident != self.ident:
+            event = EVENT_ROTATED
+            self._restart()
+            if self.watch.available:
+                self.watch.watch_file()
+        elif st.st_size < self.offset:
+            event = EVENT_TRUNCATED
+            self._restart()
+        self.ident = ident
+        if event:
+            self.lines.append("----- %s -----" % event)
+        self.more = False
+        if st.st_size == self.offset:
+            return 0, event
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(min(st.st_size - self.offset, FOLLOW_MAX_READ))
+        self.offset += len(data)
+        self.more = self.offset < st.st_size
+        return self._add(data), event
@@ -0,0 +1,125 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - persistent per-log metadata cache
+# Parsed summaries are stored by path together with (device, inode, size,
+# mtime), so a log is only parsed again when one of them changes.
+
+from __future__ import print_function
+import json
+import os
+
+from .crashparser import CrashReport, parse_file
+from .diag import count
+from .discovery import mount_of
+from .fingerprint import fingerprint
+from .mounts import get_mount_table
+
+CACHE_FILE = "/etc/enigma2/CrashlogViewer_index.json"
+CACHE_VERSION = 2
+
+
+def stat_key(st):
+    return [st.st_dev, st.st_ino, st.st_size, int(st.st_mtime)]
+
+
+class CachedStat(object):
+    # the stat fields the cache keeps, enough to list a log without a stat()
+    __slots__ = ("st_dev", "st_ino", "st_size", "st_mtime")
+
+    def __init__(self, key):
+        self.st_dev, self.st_ino, self.st_size, self.st_mtime = key
+
+
+class LogMetaCache(object):
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.entries = data.get("entries", {})
+        except Exception:
+            self.entries = {}
+
+    def save(self):
+        if not self.dirty or not self.path:
+            return
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"version": CACHE_VERSION, "entries": self.entries}, f, separators=(",", ":"))
+            os.rename(tmp, self.path)
+            self.dirty = False
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def _entry(self, path, st):
+        # the entry of the unchanged file, or None
+        entry = self.entries.get(path)
+        if entry and entry.get("key") == stat_key(st):
+            return entry
+        return None
+
+    def get(self, path, st):
+        # cached CrashReport (without sections) or None if stale/missing
+        entry = self._entry(path, st)
+        if entry is not None:
+            return CrashReport.from_dict(entry["report"])
+        return None
+
+    def put(self, path, st, report):
+        data = report.to_dict()
+        # the section index can be long for debug logs; the list only needs the facts
+        del data["sections"]
+        # the signature is computed once here and then only read back
+        self.entries[path] = {"key": stat_key(st), "report": data, "fp": fingerprint(report)}
+        self.dirty = True
+
+    def signature(self, path, st):
+        entry = self._entry(path, st)
+        if entry is not None:
+            return entry.get("fp")
+        return None
+
+    def files(self):
+        # [(path, CachedStat)] of the last scan, sorted by path as
+        # discover_logs() returns them; nothing is read from the disks
+        return [(path, CachedStat(self.entries[path]["key"])) for path in sorted(self.entries)]
+
+    def missing(self, files):
+        # files: [(path, stat)] -> the ones that need a (re)parse; only the
+        # keys are compared, the reports are built when they are shown
+        missing = [(path, st) for path, st in files if self._entry(path, st) is None]
+        count("cache.hits", len(files) - len(missing))
+        count("cache.misses", len(missing))
+        return missing
+
+    def prune(self, paths, skipped=()):
+        # paths: the logs found; skipped: mount points that were not scanned
+        # (timed out), their entries are kept for the next scan
+        keep = set(paths)
+        table = get_mount_table() if skipped else None
+        for path in list(self.entries):
+            if path in keep or (table is not None and mount_of(path, table) in skipped):
+                continue
+            del self.entries[path]
+            self.dirty = True
+
+
+def parse_missing(files):
+    # worker-thread helper: [(path, stat)] -> [(path, stat, report)]
+    results = []
+    for path, st in files:
+        try:
+            results.append((path, st, parse_file(path)))
+        except Exception:
+            pass
+    return results
@@ -0,0 +1,253 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - line diff of two logs
+# Every line is reduced to a 64 bit hash of its text without the volatile
+# parts (timestamps, PIDs, addresses), so a diff only keeps two integer
+# arrays in memory. Lines that occur exactly once in both logs anchor the
+# match (longest increasing run, as in patience diff); the gaps between
+# anchors are split further the same way and small ones are left to
+# difflib. The result maps side-by-side rows to line numbers without
+# building the rows, the screen reads the visible lines from the files.
+
+from __future__ import print_function
+import difflib
+import re
+import sys
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import Counter
+
+from .archive import open_log
+from .diag import span
+
+DIFF_BLOCK = 1024 * 1024
+# gaps without anchors up to this many line pairs go through difflib,
+# larger ones are shown as changed as a whole
+SMALL_GAP = 250000
+
+# the timestamp enigma2 puts in front of a line, see crashparser.TIMESTAMP_RE;
+# several lines are normalized at once, so no pattern may match a "\n"
+LINE_STAMP_RE = re.compile(br"(?m)^(?:<[ \t]*\d+\.\d+>[ \t]?|\d\d:\d\d:\d\d\.\d+[ \t])")
+VOLATILE_RE = re.compile(
+    br"\b\d\d:\d\d:\d\d(?:\.\d+)?\b"      # times of day
+    br"|\[[ \t]*\d+\.\d+\]"               # kernel time stamps
+    br"|0x[0-9a-fA-F]+"                   # addresses
+    br"|\b[0-9a-fA-F]{8,}\b"              # bare addresses, maps ranges
+    br"|(?i:\bpid\b)[=: \t]*\d+"          # pid=123, PID: 123
+    br"|(?<=\[)\d+(?=\])"                 # enigma2[1234]
+)
+
+EQUAL, REPLACE, DELETE, INSERT = "equal", "replace", "delete", "insert"
+
+if sys.hash_info.width >= 64:
+    def _hashes(lines):
+        return array("q", map(hash, lines))
+else:
+    def _hashes(lines):
+        # 32 bit hash: add a crc32 so different lines do not collide
+        return array("q", ((h << 32) | c for h, c in zip(map(hash, lines), map(zlib.crc32, lines))))
+
+
+def line_hashes(path, block_size=DIFF_BLOCK):
+    # array of hashes, one per line as counted by LineIndex
+    out = array("q")
+    rest = b""
+    with open_log(path) as f:
+        while True:
+            data = f.read(block_size)
+            if not data:
+                break
+            data = rest + data
+            end = data.rfind(b"\n") + 1
+            if not end:
+                rest = data
+                continue
+            rest = data[end:]
+            out.extend(_hashes(normalize(data[:end - 1]).split(b"\n")))
+    if rest:
+        out.extend(_hashes([normalize(rest)]))
+    return out
+
+
+def normalize(text):
+    # text of one or more lines without their volatile parts
+    return VOLATILE_RE.sub(b"#", LINE_STAMP_RE.sub(b"", text.replace(b"\r", b"")))
+
+
+def _increasing(pairs):
+    # longest run of pairs (sorted by i) that also increases in j
+    tails = []
+    tail_at = []
+    back = [None] * len(pairs)
+    for k, (i, j) in enumerate(pairs):
+        n = bisect_right(tails, j)
+        if n and tails[n - 1] == j:
+            continue
+        if n == len(tails):
+            tails.append(j)
+            tail_at.append(k)
+        else:
+            tails[n] = j
+            tail_at[n] = k
+        back[k] = tail_at[n - 1] if n else None
+    run = []
+    k = tail_at[-1] if tail_at else None
+    while k is not None:
+        run.append(pairs[k])
+        k = back[k]
+    run.reverse()
+    return run
+
+
+def _anchors(a, b, i1, i2, j1, j2):
+    ca = Counter(a[i1:i2])
+    cb = Counter(b[j1:j2])
+    # lines that are unique on both sides; failing that (logs full of
+    # repeated lines) the k-th occurrence of a line pairs with its k-th
+    # occurrence on the other side, if both sides have it equally often
+    for unique in (True, False):
+        keep = set(h for h, n in ca.items() if cb.get(h) == n and (n == 1 or not unique))
+        if not keep:
+            continue
+        seen = {}
+        where = {}
+        for j in range(j1, j2):
+            h = b[j]
+            if h in keep:
+                where.setdefault(h, []).append(j)
+        pairs = []
+        for i in range(i1, i2):
+            h = a[i]
+            if h in keep:
+                k = seen.get(h, 0)
+                seen[h] = k + 1
+                pairs.append((i, where[h][k]))
+        run = _increasing(pairs)
+        if run:
+            return run
+    return []
+
+
+def matching_blocks(a, b, small_gap=SMALL_GAP):
+    # [(i, j, n)]: a[i:i+n] == b[j:j+n], increasing, ending with (len(a), len(b), 0)
+    blocks = []
+    todo = [(0, len(a), 0, len(b))]
+    while todo:
+        i1, i2, j1, j2 = todo.pop()
+        n = 0
+        while i1 + n < i2 and j1 + n < j2 and a[i1 + n] == b[j1 + n]:
+            n += 1
+        if n:
+            blocks.append((i1, j1, n))
+            i1 += n
+            j1 += n
+        n = 0
+        while i2 - n > i1 and j2 - n > j1 and a[i2 - n - 1] == b[j2 - n - 1]:
+            n += 1
+        if n:
+            blocks.append((i2 - n, j2 - n, n))
+            i2 -= n
+            j2 -= n
+        if i1 == i2 or j1 == j2:
+            continue
+        run = _anchors(a, b, i1, i2, j1, j2)
+        if run:
+            pi, pj = i1, j1
+            for i, j in run:
+                todo.append((pi, i, pj, j))
+                blocks.append((i, j, 1))
+                pi, pj = i + 1, j + 1
+            todo.append((pi, i2, pj, j2))
+        elif (i2 - i1) * (j2 - j1) <= small_gap:
+            sm = difflib.SequenceMatcher(None, a[i1:i2].tolist(), b[j1:j2].tolist(), autojunk=False)
+            for i, j, n in sm.get_matching_blocks():
+                if n:
+                    blocks.append((i1 + i, j1 + j, n))
+    blocks.sort()
+    merged = []
+    for i, j, n in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + n)
+        else:
+            merged.append((i, j, n))
+    merged.append((len(a), len(b), 0))
+    return merged
+
+
+def opcodes(blocks):
+    # difflib style (tag, i1, i2, j1, j2) from matching_blocks()
+    ops = []
+    i = j = 0
+    for bi, bj, n in blocks:
+        if i < bi and j < bj:
+            ops.append((REPLACE, i, bi, j, bj))
+        elif i < bi:
+            ops.append((DELETE, i, bi, j, j))
+        elif j < bj:
+            ops.append((INSERT, i, i, j, bj))
+        if n:
+            ops.append((EQUAL, bi, bi + n, bj, bj + n))
+        i, j = bi + n, bj + n
+    return ops
+
+
+class LogDiff(object):
+    # side-by-side rows: an equal or replaced line pair, or a line on one side
+
+    def __init__(self, ops, left_lines, right_lines):
+        self.ops = ops
+        self.left_lines = left_lines
+        self.right_lines = right_lines
+        self.row_starts = array("Q")
+        rows = 0
+        for tag, i1, i2, j1, j2 in ops:
+            self.row_starts.append(rows)
+            rows += max(i2 - i1, j2 - j1)
+        self.rows = rows
+        # first row of every change block
+        self.change_rows = [self.row_starts[k] for k, op in enumerate(ops) if op[0] != EQUAL]
+
+    def counts(self):
+        # (removed, added, changed) lines
+        removed = added = changed = 0
+        for tag, i1, i2, j1, j2 in self.ops:
+            if tag == DELETE:
+                removed += i2 - i1
+            elif tag == INSERT:
+                added += j2 - j1
+            elif tag == REPLACE:
+                changed += max(i2 - i1, j2 - j1)
+        return removed, added, changed
+
+    def window(self, top, count):
+        # [(tag, left line or None, right line or None)] for rows [top, top+count)
+        out = []
+        k = bisect_right(self.row_starts, top) - 1
+        row = top
+        end = min(top + count, self.rows)
+        while row < end and 0 <= k < len(self.ops):
+            tag, i1, i2, j1, j2 = self.ops[k]
+            start = self.row_starts[k]
+            stop = min(end, start + max(i2 - i1, j2 - j1))
+            for r in range(row, stop):
+                d = r - start
+                out.append((tag, i1 + d if i1 + d < i2 else None, j1 + d if j1 + d < j2 else None))
+            row = stop
+            k += 1
+        return out
+
+    def next_change(self, row):
+        k = bisect_right(self.change_rows, row)
+        return self.change_rows[k] if k < len(self.change_rows) else None
+
+    def prev_change(self, row):
+        k = bisect_right(self.change_rows, row - 1)
+        return self.change_rows[k - 1] if k else None
+
+
+def diff_logs(left, right, small_gap=SMALL_GAP):
+    # worker-thread helper: LogDiff of two log files (plain or archived)
+    with span("diff", "%s %s" % (left, right)):
+        a = line_hashes(left)
+        b = line_hashes(right)
+        return LogDiff(opcodes(matching_blocks(a, b, small_gap)), len(a), len(b))
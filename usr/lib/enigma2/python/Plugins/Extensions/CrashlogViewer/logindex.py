@@ -0,0 +1,147 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - line offset index for large log files
+# The index is built in one pass over an mmap of the file and keeps only
+# every INDEX_STRIDE-th line start, so memory does not grow with the file
+# and any window of lines can be located in constant time.
+
+from __future__ import print_function
+import mmap
+import os
+import re
+from array import array
+from bisect import bisect_right
+from collections import deque
+
+INDEX_STRIDE = 64
+ERROR_MARKERS = re.compile(br"Error:|FATAL SIGNAL")
+MAX_ERROR_LINES = 200
+
+
+def split_lines(data):
+    # lines as the index counts them: only "\n" ends a line, not the other
+    # separators str.splitlines() knows, which occur in binary garbage
+    lines = data.decode("utf-8", "replace").split("\n")
+    if lines and not lines[-1]:
+        lines.pop()
+    return [line.rstrip("\r") for line in lines]
+
+
+class LineIndex(object):
+
+    def __init__(self, path, stride=INDEX_STRIDE, state=None):
+        self.path = path
+        self.stride = stride
+        self.size = 0
+        self.lines = 0
+        # byte offset of line 0, stride, 2*stride, ...
+        self.checkpoints = array("Q", [0])
+        self._file = None
+        self._mm = None
+        self.open(state)
+
+    def open(self, state=None):
+        # state: from state() of an earlier index of the same, unchanged file
+        self._file = open(self.path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        if self.size:
+            self._mm = mmap.mmap(self._file.fileno(), self.size, access=mmap.ACCESS_READ)
+        if state is not None and state[0] == self.size and state[1] == self.stride:
+            self.lines, self.checkpoints = state[2], state[3]
+        else:
+            self.build()
+
+    def state(self):
+        # what build() found, to open the file again without a scan
+        return (self.size, self.stride, self.lines, self.checkpoints)
+
+    def build(self):
+        self.checkpoints = array("Q", [0])
+        self.lines = 0
+        mm = self._mm
+        if mm is None:
+            return
+        find = mm.find
+        append = self.checkpoints.append
+        stride = self.stride
+        pos = 0
+        n = 0
+        while True:
+            nl = find(b"\n", pos)
+            if nl < 0:
+                break
+            pos = nl + 1
+            n += 1
+            if n % stride == 0:
+                append(pos)
+        if pos < self.size:
+            # last line without trailing newline
+            n += 1
+        self.lines = n
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def offset(self, line):
+        # start of a line, at most stride-1 newline searches away from a checkpoint
+        if line <= 0 or self._mm is None:
+            return 0
+        if line >= self.lines:
+            return self.size
+        cp = line // self.stride
+        pos = self.checkpoints[cp]
+        find = self._mm.find
+        for _ in range(line - cp * self.stride):
+            pos = find(b"\n", pos) + 1
+        return pos
+
+    def line_at(self, offset):
+        # line number containing a byte offset
+        if self._mm is None or offset <= 0:
+            return 0
+        offset = min(offset, self.size)
+        cp = bisect_right(self.checkpoints, offset) - 1
+        start = self.checkpoints[cp]
+        return min(cp * self.stride + self._mm[start:offset].count(b"\n"), max(self.lines - 1, 0))
+
+    def read_bytes(self, start, count):
+        if self._mm is None or count <= 0 or start >= self.lines:
+            return b""
+        start = max(0, start)
+        a = self.offset(start)
+        end = min(start + count, self.lines)
+        b = a
+        find = self._mm.find
+        for _ in range(end - start):
+            nl = find(b"\n", b)
+            if nl < 0:
+                b = self.size
+                break
+            b = nl + 1
+        return self._mm[a:b]
+
+    def window(self, start, count):
+        # decodes only the lines [start, start+count)
+        return split_lines(self.read_bytes(start, count))
+
+    def error_lines(self, limit=MAX_ERROR_LINES):
+        # last `limit` error lines as (line, text) without decoding the file
+        mm = self._mm
+        hits = deque(maxlen=limit)
+        if mm is None:
+            return []
+        last_end = -1
+        for m in ERROR_MARKERS.finditer(mm):
+            if m.start() < last_end:
+                continue
+            s = mm.rfind(b"\n", 0, m.start()) + 1
+            e = mm.find(b"\n", m.end())
+            if e < 0:
+                e = self.size
+            hits.append((s, mm[s:e]))
+            last_end = e
+        return [(self.line_at(s), raw.decode("utf-8", "replace")) for s, raw in hits]
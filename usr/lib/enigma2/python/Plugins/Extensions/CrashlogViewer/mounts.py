@@ -0,0 +1,119 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - mount table resolver
+# The table is parsed once and kept until the kernel reports a change
+# (POLLPRI on /proc/self/mounts). Lookups use the longest mount point that
+# contains the path, so /media/hdd/logs resolves to /media/hdd.
+
+from __future__ import print_function
+import os
+import select
+import threading
+
+MOUNTS_FILE = "/proc/self/mounts"
+PSEUDO_FS = ("proc", "sysfs", "devpts", "devtmpfs", "debugfs", "cgroup", "cgroup2",
+             "securityfs", "pstore", "configfs", "tracefs", "mqueue", "hugetlbfs", "autofs")
+
+
+class Mount(object):
+    __slots__ = ("device", "mountpoint", "fstype", "options")
+
+    def __init__(self, device, mountpoint, fstype, options):
+        self.device = device
+        self.mountpoint = mountpoint
+        self.fstype = fstype
+        self.options = options
+
+    @property
+    def readonly(self):
+        return "ro" in self.options.split(",")
+
+    def __iter__(self):
+        return iter((self.device, self.mountpoint, self.fstype, self.options))
+
+    def __repr__(self):
+        return "<Mount %s on %s (%s)>" % (self.device, self.mountpoint, self.fstype)
+
+
+def parse_mounts(text):
+    mounts = []
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) < 4:
+            continue
+        # /proc/mounts escapes blanks in paths as \040
+        mounts.append(Mount(parts[0], parts[1].replace("\\040", " "), parts[2], parts[3]))
+    return mounts
+
+
+class MountTable(object):
+
+    def __init__(self, mounts_file=MOUNTS_FILE):
+        self.mounts_file = mounts_file
+        self.mounts = []
+        self._by_length = []
+        self._file = None
+        self._poll = None
+        self._stamp = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            if self._file is None:
+                self._file = open(self.mounts_file, "r")
+                if self.mounts_file.startswith("/proc/"):
+                    self._poll = select.poll()
+                    self._poll.register(self._file, select.POLLPRI | select.POLLERR)
+            self._file.seek(0)
+            text = self._file.read()
+            st = os.fstat(self._file.fileno())
+            self._stamp = (st.st_mtime, st.st_size, len(text))
+        except Exception:
+            text = ""
+        self.mounts = parse_mounts(text)
+        self._by_length = sorted(self.mounts, key=lambda m: len(m.mountpoint), reverse=True)
+
+    def changed(self):
+        if self._file is None:
+            return True
+        if self._poll is not None:
+            return bool(self._poll.poll(0))
+        # plain files (tests, other systems): compare stat data
+        try:
+            st = os.stat(self.mounts_file)
+        except OSError:
+            return True
+        return (st.st_mtime, st.st_size) != self._stamp[:2]
+
+    def refresh(self):
+        # re-read only if the table changed since the last read
+        with self._lock:
+            if self.changed():
+                self._load()
+        return self
+
+    def resolve(self, path):
+        path = os.path.abspath(path)
+        for m in self._by_length:
+            mp = m.mountpoint
+            if path == mp or path.startswith(mp.rstrip("/") + "/"):
+                return m
+        return None
+
+    def is_readonly(self, path):
+        m = self.resolve(path)
+        return m is not None and m.readonly
+
+    def media_mounts(self, prefixes):
+        return [m for m in self.mounts if m.fstype not in PSEUDO_FS and m.mountpoint.startswith(prefixes)]
+
+
+_table = None
+
+
+def get_mount_table():
+    # shared, refreshed instance
+    global _table
+    if _table is None:
+        _table = MountTable()
+    return _table.refresh()
@@ -5,21 +5,14 @@
 # updated speedy005 06/09/2025
 
 from __future__ import print_function
+import time
+# boot cost of the plugin, see the end of this file
+_import_start = time.time()
 import gettext
 from Components.Language import language
-import os, sys, re, shutil, tempfile, zipfile, traceback, time, glob
-from os import remove
-from Components.ActionMap import ActionMap
-from Components.ScrollLabel import ScrollLabel
-from Components.Sources.List import List
-from Components.Sources.StaticText import StaticText
+import os
+from Components.config import config, ConfigInteger, ConfigPassword, ConfigSelection, ConfigSubsection, ConfigYesNo
 from Plugins.Plugin import PluginDescriptor
-from Screens.MessageBox import MessageBox
-from Screens.Screen import Screen
-from Screens.Standby import TryQuitMainloop
-from Tools.Directories import SCOPE_PLUGINS, resolveFilename
-from Tools.LoadPixmap import LoadPixmap
-from enigma import getDesktop
 
 PLUGIN_PATH = "/usr/lib/enigma2/python/Plugins/Extensions/CrashlogViewer/"
 LOCALE_DIR = os.path.join(PLUGIN_PATH, "locale")
@@ -42,457 +35,58 @@ def _(txt):
 localeInit()
 language.addCallback(localeInit)
 
-# --- Python 2/3 urllib ---
-try:
-    import urllib2 as urllib_request
-except Exception:
-    import urllib.request as urllib_request
-
-# --- Update URLs & Files ---
+# --- Settings ---
+config.plugins.CrashlogViewer = ConfigSubsection()
+cfg = config.plugins.CrashlogViewer
+cfg.retention = ConfigYesNo(default=False)
+cfg.keep_per_group = ConfigInteger(default=5, limits=(0, 999))
+cfg.group_by = ConfigSelection(default="signature", choices=[("signature", _("crash signature")), ("type", _("log type"))])
+cfg.max_mb_per_mount = ConfigInteger(default=0, limits=(0, 99999))
+cfg.max_age_days = ConfigInteger(default=0, limits=(0, 3650))
+# logs older than this are compressed in the background (0 = never)
+cfg.archive_after_days = ConfigInteger(default=0, limits=(0, 3650))
+# without python lzma on the box archive.compress_log falls back to gz
+cfg.archive_format = ConfigSelection(default="gz", choices=[("gz", "gz"), ("xz", "xz")])
+# bug report bundles (export.py); the limit is for the log text inside
+cfg.export_format = ConfigSelection(default="zip", choices=[("zip", "zip"), ("tar.gz", "tar.gz")])
+cfg.export_max_mb = ConfigInteger(default=100, limits=(1, 2000))
+# read-only web access to the logs from a PC (webserver.py)
+cfg.web_enabled = ConfigYesNo(default=False)
+cfg.web_port = ConfigInteger(default=8765, limits=(1024, 65535))
+# this box only unless opened to the home network, which needs the password
+cfg.web_host = ConfigSelection(default="127.0.0.1", choices=[("127.0.0.1", _("this box only")), ("0.0.0.0", _("home network"))])
+cfg.web_password = ConfigPassword(default="", fixed_size=False)
+# logs are served with passwords and addresses masked unless this is set
+cfg.web_raw = ConfigYesNo(default=False)
+# seconds after GUI start before the automatic cleanup runs
+RETENTION_DELAY = 120
+
+# --- Update Files ---
 VERSION_FILE = os.path.join(PLUGIN_PATH, "version.txt")
 LAST_UPDATE_FILE = os.path.join(PLUGIN_PATH, "last_update_version.txt")
-GITHUB_VERSION_URL = "https://raw.githubusercontent.com/speedy005/CrashlogViewer/main/version.txt"
-GITHUB_CHANGELOG_URL = "https://raw.githubusercontent.com/speedy005/CrashlogViewer/main/changelog.txt"
-GITHUB_ZIP_URL = "https://github.com/speedy005/CrashlogViewer/archive/refs/heads/main.zip"
 
-PY2 = sys.version_info[0] == 2
-PY3 = sys.version_info[0] == 3
-LOGFILE = "/tmp/CrashlogViewer.log"
+# buffered, see diag.py; log(msg, level)
+from .diag import DEBUG, log
 
-def log(msg):
-    try:
-        with open(LOGFILE, "a") as f:
-            f.write(msg + "\n")
-    except Exception:
-        pass
-    try:
-        print(msg)
-    except Exception:
-        pass
+_local_version = None
 
 def get_local_version():
-    try:
-        with open(VERSION_FILE, 'r') as f:
-            return f.read().strip()
-    except Exception:
-        return "0.0"
-
-# --- Update Funktionen ---
-def get_current_version():
-    try:
-        with open(VERSION_FILE, 'r') as f:
-            return f.read().strip()
-    except Exception:
-        return "0.0"
-
-def get_remote_version():
-    try:
-        response = urllib_request.urlopen(GITHUB_VERSION_URL, timeout=5).read()
-        if PY3:
-            response = response.decode("utf-8")
-        return response.strip().split()[0]
-    except Exception as e:
-        log("Error fetching remote version: %s" % e)
-        return None
-
-def parse_version(version_str):
-    if not version_str:
-        return (0,0,0)
-    v = version_str.strip().lower()
-    if v.startswith("v"):
-        v = v[1:]
-    parts = re.findall(r"\d+", v)
-    while len(parts) < 3:
-        parts.append("0")
-    return tuple(map(int, parts[:3]))
-
-def download_and_install_update(session):
-    tmp_dir = None
-    try:
-        tmp_dir = tempfile.mkdtemp()
-        zip_path = os.path.join(tmp_dir, "plugin_update.zip")
-        log("Downloading update...")
-        req = urllib_request.urlopen(GITHUB_ZIP_URL)
-        data = req.read()
-        with open(zip_path, "wb") as f:
-            f.write(data)
-        log("Download complete: %s" % zip_path)
-
-        log("Extracting update...")
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(tmp_dir)
-
-        # GitHub ZIP enthält oft CrashlogViewer-main/usr/lib/...
-        extracted_folder = None
-        for root, dirs, files in os.walk(tmp_dir):
-            if "CrashlogViewer" in dirs and "Extensions" in root:
-                extracted_folder = os.path.join(root, "CrashlogViewer")
-                break
-
-        if not extracted_folder:
-            extracted_folder = os.path.join(tmp_dir, "CrashlogViewer-main", "usr", "lib", "enigma2", "python", "Plugins", "Extensions", "CrashlogViewer")
-            if not os.path.exists(extracted_folder):
-                raise Exception("CrashlogViewer folder not found in extracted ZIP!")
-
-        log("Found new plugin folder: %s" % extracted_folder)
-
-        if os.path.exists(PLUGIN_PATH):
-            shutil.rmtree(PLUGIN_PATH)
-
-        shutil.copytree(extracted_folder, PLUGIN_PATH)
-        log("New plugin folder copied to %s" % PLUGIN_PATH)
-
-        remote_version = get_remote_version()
-        if remote_version:
-            with open(VERSION_FILE, "w") as vf:
-                vf.write(remote_version + "\n")
-            with open(LAST_UPDATE_FILE, "w") as lf:
-                lf.write(remote_version + "\n")
-
-        def restartGUI(answer):
-            if answer:
-                session.open(TryQuitMainloop, 3)
-
-        msg = _("Update installed successfully!\nDo you want to restart the GUI now?")
-        session.openWithCallback(restartGUI, MessageBox, msg, type=MessageBox.TYPE_YESNO)
-
-    except Exception as e:
-        log("Error during update: %s" % e)
-        traceback.print_exc()
+    # read once; Plugins() and menu() ask for it at every GUI start
+    global _local_version
+    if _local_version is None:
         try:
-            session.open(MessageBox, _("Error during update:\n%s") % str(e), type=MessageBox.TYPE_ERROR)
+            with open(VERSION_FILE, 'r') as f:
+                _local_version = f.read().strip()
         except Exception:
-            pass
-    finally:
-        if tmp_dir:
-            try:
-                shutil.rmtree(tmp_dir, ignore_errors=True)
-            except Exception:
-                pass
-
-def check_for_update(session, callback=None):
-    current_version = get_current_version()
-    remote_version = get_remote_version()
-    def proceed():
-        if callback:
-            callback()
-    try:
-        if remote_version and parse_version(remote_version) > parse_version(current_version):
-            def cb(choice):
-                if choice:
-                    download_and_install_update(session)
-                else:
-                    proceed()
-            msg = _("A new version %s is available.\nDo you want to install the update?") % remote_version
-            session.openWithCallback(cb, MessageBox, msg, type=MessageBox.TYPE_YESNO)
-        else:
-            session.open(MessageBox, _("Kein Update verfügbar"), type=MessageBox.TYPE_INFO, timeout=4)
-            proceed()
-    except Exception as e:
-        log("Error during update check: %s" % e)
-        proceed()
-
-# --- Crashlog Funktionen ---
-def isMountReadonly(mnt):
-    try:
-        with open("/proc/mounts", "r") as f:
-            for line in f:
-                parts = line.split()
-                if len(parts) < 4: continue
-                device, mp, fs, flags = parts[:4]
-                if mp == mnt:
-                    return "ro" in flags
-    except Exception:
-        return False
-    return False
-
-def find_log_files(base_path=LOG_BASE_PATH):
-    patterns = [
-        os.path.join(base_path, "*crash*.log"),
-        os.path.join(base_path, "*debug*.log"),
-        os.path.join(base_path, "*network*.log"),
-        "/media/usb/logs/*crash*.log",
-        "/media/usb/logs/*debug*.log",
-        "/media/usb/logs/*network*.log",
-        "/media/hdd/logs/*crash*.log",
-        "/media/hdd/logs/*debug*.log",
-        "/media/hdd/logs/*network*.log",
-    ]
-    log_files = []
-    for pattern in patterns:
-        log_files.extend(glob.glob(pattern))
-    return sorted(list(set(log_files)))
-
-def delete_log_files(files):
-    for file in files:
-        try:
-            remove(file)
-        except OSError as e:
-            log("Error deleting %s: %s" % (file, e))
-
-# --- CrashLogScreen ---
-class CrashLogScreen(Screen):
-    sz_w = getDesktop(0).size().width()
-
-    if sz_w == 1920:
-        # Full HD Skin
-        skin = """<screen name="crashlogscreen" position="260,100" size="1400,880" title="%s">
-        <eLabel name="button info" font="Regular; 30" position="1063,821" size="103,48" cornerRadius="4" halign="center" valign="center" text="INFO" backgroundColor="black" zPosition="3" foregroundColor="red" />
-        <eLabel name="button ext" font="Regular; 30" position="1173,821" size="103,48" cornerRadius="4" halign="center" valign="center" text="EXIT" backgroundColor="black" zPosition="3" foregroundColor="red" />
-        <eLabel name="button ok" font="Regular; 30" position="1287,821" size="103,48" cornerRadius="4" halign="center" valign="center" text="OK" backgroundColor="black" zPosition="3" foregroundColor="red" />
-        <eLabel backgroundColor="listRecording" position="0,858" size="250,6" zPosition="12" />
-        <eLabel backgroundColor="green" position="260,858" size="250,6" zPosition="12" />
-        <eLabel backgroundColor="yellow" position="520,858" size="250,6" zPosition="12" />
-        <eLabel backgroundColor="blue" position="780,858" size="250,6" zPosition="12" />
-        <widget source="Redkey" render="Label" position="0,814" size="250,45" font="Regular;26" />
-        <widget source="Greenkey" render="Label" position="260,813" size="250,45" font="Regular;26" foregroundColor="green" />
-        <widget source="Yellowkey" render="Label" position="520,814" size="250,45" font="Regular;26" foregroundColor="yellow" />
-        <widget source="Bluekey" render="Label" position="780,814" size="250,45" font="Regular;26" foregroundColor="blue" />
-        <widget source="menu" render="Listbox" position="4,7" size="1390,800" scrollbarMode="showOnDemand">
-            <convert type="TemplatedMultiContent">
-                {"template":[
-                    MultiContentEntryText(pos=(70,2),size=(1300,50),font=0,flags=RT_HALIGN_LEFT,text=0),
-                    MultiContentEntryText(pos=(80,35),size=(1300,50),font=1,flags=RT_HALIGN_LEFT,text=1),
-                    MultiContentEntryPixmapAlphaTest(pos=(5,20),size=(45,32),png=2)],
-                "fonts":[gFont("Regular",35),gFont("Regular",35)],
-                "itemHeight":90}
-            </convert>
-        </widget>
-        </screen>""" % _("View or Remove Crashlog files")
-
-    else:
-        # HD / Fallback Skin
-        skin = """<screen name="crashlogscreen" position="center,center" size="1000,880" title="%s">
-        <eLabel name="button info" font="Regular; 30" position="881,761" size="103,48" cornerRadius="4" halign="center" valign="center" text="INFO" backgroundColor="black" zPosition="3" foregroundColor="red" />
-        <eLabel name="button ext" font="Regular; 30" position="773,761" size="103,48" cornerRadius="4" halign="center" valign="center" text="EXIT" backgroundColor="black" zPosition="3" foregroundColor="red" />
-        <eLabel name="button ok" font="Regular; 30" position="663,761" size="103,48" cornerRadius="4" halign="center" valign="center" text="OK" backgroundColor="black" zPosition="3" foregroundColor="red" />
-        <eLabel backgroundColor="listRecording" position="0,858" size="250,6" zPosition="12" />
-        <eLabel backgroundColor="green" position="250,858" size="250,6" zPosition="12" />
-        <eLabel backgroundColor="yellow" position="500,858" size="250,6" zPosition="12" />
-        <eLabel backgroundColor="blue" position="750,858" size="250,6" zPosition="12" />
-        <widget source="Redkey" render="Label" position="0,814" size="250,45" font="Regular;26" />
-        <widget source="Greenkey" render="Label" position="252,813" size="250,45" font="Regular;26" foregroundColor="green" />
-        <widget source="Yellowkey" render="Label" position="499,814" size="250,45" font="Regular;26" foregroundColor="yellow" />
-        <widget source="Bluekey" render="Label" position="749,814" size="250,45" font="Regular;26" foregroundColor="blue" />
-        <widget source="menu" render="Listbox" position="20,10" size="961,740" scrollbarMode="showOnDemand">
-            <convert type="TemplatedMultiContent">
-                {"template":[
-                    MultiContentEntryText(pos=(70,2),size=(880,50),font=0,flags=RT_HALIGN_LEFT,text=0),
-                    MultiContentEntryText(pos=(80,29),size=(880,50),font=1,flags=RT_HALIGN_LEFT,text=1),
-                    MultiContentEntryPixmapAlphaTest(pos=(5,20),size=(45,32),png=2)],
-                "fonts":[gFont("Regular",35),gFont("Regular",35)],
-                "itemHeight":90}
-            </convert>
-        </widget>
-        </screen>""" % _("View or Remove Crashlog files")
-
-
-    def __init__(self, session):
-        self.session = session
-        Screen.__init__(self, session)
-        self.setTitle(_("View or Remove Crashlog files"))
-        self["Redkey"] = StaticText(_("Close"))
-        self["Greenkey"] = StaticText(_("View"))
-        self["Yellowkey"] = StaticText(_("Remove"))
-        self["Bluekey"] = StaticText(_("Remove All"))
-
-        self.list = []
-        self["menu"] = List(self.list)
-
-        self["shortcuts"] = ActionMap(
-            ["ShortcutActions", "WizardActions", "EPGSelectActions"],
-            {
-                "ok": self.Ok,
-                "cancel": self.exit,
-                "back": self.exit,
-                "red": self.exit,
-                "green": self.Ok,
-                "yellow": self.YellowKey,
-                "blue": self.BlueKey,
-                "epg": self.infoKey,
-            }
-        )
-
-        self.CfgMenu()
-
-    def CfgMenu(self):
-        self.list = []
-        log_files = find_log_files()
-        if not log_files:
-            self["menu"].setList([])
-            return
-
-        sz_w = getDesktop(0).size().width()
-        minipng = LoadPixmap(
-            cached=True,
-            path=resolveFilename(SCOPE_PLUGINS, "Extensions/CrashlogViewer/images/crashmini.png")
-            if sz_w >= 1920 else
-            resolveFilename(SCOPE_PLUGINS, "Extensions/CrashlogViewer/images/crashmini1.png")
-        )
-
-        for file_path in log_files:
-            try:
-                stat = os.stat(file_path)
-                file_size = stat.st_size
-                file_date = time.strftime("%Y-%m-%d %H:%M", time.localtime(stat.st_mtime))
-                self.list.append((os.path.basename(file_path),
-                                  "Size: %s - Date: %s" % (file_size, file_date),
-                                  minipng,
-                                  file_path))
-            except Exception as e:
-                log("Error accessing file %s: %s" % (file_path, e))
-        self["menu"].setList(self.list)
-
-    def Ok(self):
-        item = self["menu"].getCurrent()
-        if not item or len(item) < 4:
-            self.session.open(MessageBox, _("No log file selected!"), MessageBox.TYPE_INFO, timeout=4)
-            return
-        self.session.openWithCallback(self.CfgMenu, LogScreen, str(item[3]))
-
-    def YellowKey(self):
-        item = self["menu"].getCurrent()
-        if not item or len(item) < 4:
-            return
-        try:
-            os.remove(str(item[3]))
-            self.session.open(MessageBox, _("Removed %s") % item[3], MessageBox.TYPE_INFO, timeout=4)
-        except Exception as e:
-            self.session.open(MessageBox, _("Failed to remove file:\n%s") % e, MessageBox.TYPE_INFO, timeout=4)
-        self.CfgMenu()
-
-    def BlueKey(self):
-        log_files = find_log_files()
-        deleted_files = 0
-        failed_files = []
-        for f in log_files:
-            if not isMountReadonly(os.path.dirname(f)):
-                try:
-                    os.remove(f)
-                    deleted_files += 1
-                except Exception as e:
-                    failed_files.append(f"{f} ({e})")
-        msg = _("Removed %d log files") % deleted_files if deleted_files else _("No log files found to remove")
-        if failed_files:
-            msg += "\n" + _("Failed to remove some files:\n") + "\n".join(failed_files)
-        self.session.open(MessageBox, msg, MessageBox.TYPE_INFO, timeout=6)
-        self.CfgMenu()
-
-    def infoKey(self):
-        self.session.open(
-            MessageBox,
-            _("Crashlog Viewer  ver. %s\n\nDeveloper: 2boom\n\nModifier: Evg77734\n\nUpdate from Lululla\nHomepage: gisclub.tv") % version,
-            MessageBox.TYPE_INFO
-        )
-
-    def exit(self):
-        self.close()
-
-
-class LogScreen(Screen):
-    sz_w = getDesktop(0).size().width()
-
-    if sz_w == 1920:
-        # Full HD Skin
-        skin = """<screen name="LogScreen" position="70,68" size="1780,980" title="%s" flags="wfBorder">
-            <eLabel name="button info" font="Regular; 30" position="1667,924" size="103,48" cornerRadius="4" halign="center" valign="center" text="INFO" backgroundColor="black" zPosition="3" foregroundColor="red" />
-            <eLabel name="button ext" font="Regular; 30" position="1555,924" size="103,48" cornerRadius="4" halign="center" valign="center" text="EXIT" backgroundColor="black" zPosition="3" foregroundColor="red" />
-            <eLabel name="button ok" font="Regular; 30" position="1444,924" size="103,48" cornerRadius="4" halign="center" valign="center" text="OK" backgroundColor="black" zPosition="3" foregroundColor="red" />
-            <widget source="Redkey" render="Label" position="7,921" size="250,45" zPosition="11" font="Regular; 26" valign="center" halign="center" backgroundColor="#050c101b" transparent="1" />
-            <widget source="Greenkey" render="Label" position="269,921" size="250,45" zPosition="11" font="Regular; 26" valign="center" halign="center" backgroundColor="#050c101b" transparent="1" foregroundColor="green" />
-            <eLabel backgroundColor="#00ff0000" position="6,969" size="250,6" zPosition="12" />
-            <eLabel backgroundColor="#0000ff00" position="269,969" size="250,6" zPosition="12" />
-            <widget name="text" position="2,1" size="1770,800" font="Console; 28" foregroundColor="green" />
-            <widget name="text2" position="3,805" size="1770,110" font="Console; 28" foregroundColor="#ff0000" />
-            <eLabel position="3,801" size="1770,2" backgroundColor="#555555" zPosition="1" />
-        </screen>""" % _("View Crashlog file")
-
-    else:
-        # HD / Fallback Skin
-        skin = """<screen name="LogScreen" position="240,140" size="1440,800" title="%s" flags="wfBorder">
-            <eLabel name="button info" font="Regular; 30" position="1323,741" size="103,48" cornerRadius="4" halign="center" valign="center" text="INFO" backgroundColor="black" zPosition="3" foregroundColor="red" />
-            <eLabel name="button ext" font="Regular; 30" position="1206,741" size="103,48" cornerRadius="4" halign="center" valign="center" text="EXIT" backgroundColor="black" zPosition="3" foregroundColor="red" />
-            <eLabel name="button ok" font="Regular; 30" position="1092,741" size="103,48" cornerRadius="4" halign="center" valign="center" text="OK" backgroundColor="black" zPosition="3" foregroundColor="red" />
-            <widget source="Redkey" render="Label" position="7,742" size="250,45" zPosition="11" font="Regular; 26" valign="center" halign="center" backgroundColor="#050c101b" transparent="1" />
-            <widget source="Greenkey" render="Label" position="266,742" size="250,45" zPosition="11" font="Regular; 26" valign="center" halign="center" backgroundColor="#050c101b" transparent="1" foregroundColor="green" />
-            <eLabel backgroundColor="#00ff0000" position="8,790" size="250,6" zPosition="12" />
-            <eLabel backgroundColor="#0000ff00" position="267,790" size="250,6" zPosition="12" />
-            <widget name="text" position="3,3" size="1430,610" font="Console; 28" foregroundColor="green" />
-            <widget name="text2" position="3,619" size="1430,110" font="Console; 28" foregroundColor="#ff0000" />
-            <eLabel position="3,615" size="1430,2" backgroundColor="#555555" zPosition="1" />
-        </screen>""" % _("View Crashlog file")
-
-
-    def __init__(self, session, crashfile):
-        Screen.__init__(self, session)
-        self.session = session
-        self.crashfile = crashfile
-        self.setTitle(_("View Crashlog file"))
-        self["Redkey"] = StaticText(_("Close"))
-        self["Greenkey"] = StaticText(_("Restart GUI"))
-        self["text"] = ScrollLabel("")
-        self["text2"] = ScrollLabel("")
-
-        # Scroll- und Farb-Tasten belegen
-        self["actions"] = ActionMap(
-            ["OkCancelActions", "DirectionActions", "ColorActions"],
-            {
-                "cancel": self.exit,
-                "ok": self.exit,
-                "red": self.exit,
-                "green": self.restartGUI,
-                # Zeilenweise scrollen
-                "up": self.scrollUp,
-                "down": self.scrollDown,
-                # Seitenweise scrollen
-                "left": self.scrollPageUp,
-                "right": self.scrollPageDown,
-            },
-            -1
-        )
-
-        self.loadLogFile()
-
-    def loadLogFile(self):
-        full_text = ""
-        error_text = ""
-        try:
-            if not os.path.exists(self.crashfile):
-                full_text = _("File not found: %s") % self.crashfile
-            else:
-                with open(self.crashfile, "r", encoding="utf-8", errors="replace") as f:
-                    for line in f:
-                        full_text += line
-                        if "Error:" in line or "FATAL SIGNAL" in line:
-                            error_text += line
-        except Exception as e:
-            full_text = _("Error opening file:\n%s") % e
-        self["text"].setText(full_text)
-        self["text2"].setText(error_text)
-
-    # --- Scrollsteuerung für beide Bereiche ---
-    def scrollUp(self):
-        self["text"].moveUp()
-        self["text2"].moveUp()
-
-    def scrollDown(self):
-        self["text"].moveDown()
-        self["text2"].moveDown()
-
-    def scrollPageUp(self):
-        self["text"].pageUp()
-        self["text2"].pageUp()
-
-    def scrollPageDown(self):
-        self["text"].pageDown()
-        self["text2"].pageDown()
-
-    def restartGUI(self):
-        self.session.open(TryQuitMainloop, 3)
-
-    def exit(self):
-        self.close()
+            _local_version = "0.0"
+    return _local_version
 
+def loadUI():
+    # screens and analysis modules, imported on first use only
+    start = time.time()
+    from . import ui
+    log("CrashlogViewer screens loaded in %.1f ms" % ((time.time() - start) * 1000), DEBUG)
+    return ui
 
 # --- Menü & Plugins ---
 def menu(menuid, **kwargs):
@@ -501,8 +95,19 @@ def menu(menuid, **kwargs):
         return [(plugin_name, main, "CrashlogViewer_mainmenu", 50)]
     return []
 
+def sessionstart(reason, session=None, **kwargs):
+    # enigma2 restarts the GUI after a crash, so this also runs after new crashes
+    if reason == 0 and (cfg.retention.value or cfg.archive_after_days.value):
+        from twisted.internet import reactor
+        reactor.callLater(RETENTION_DELAY, lambda: loadUI().autoMaintenance())
+    if reason == 0 and cfg.web_enabled.value:
+        # imported only when enabled; the server runs in its own threads
+        from .webserver import start_web_server
+        start_web_server(LOG_BASE_PATH, cfg.web_port.value, cfg.web_host.value, cfg.web_password.value, cfg.web_raw.value)
+
 def main(session, **kwargs):
-    check_for_update(session, lambda: session.open(CrashLogScreen))
+    ui = loadUI()
+    ui.check_for_update(session, lambda: session.open(ui.CrashLogScreen))
 
 def Plugins(**kwargs):
     return [
@@ -515,5 +120,9 @@ def Plugins(**kwargs):
             fnc=main,
         ),
         PluginDescriptor(where=PluginDescriptor.WHERE_MENU, fnc=menu),
+        PluginDescriptor(where=PluginDescriptor.WHERE_SESSIONSTART, fnc=sessionstart),
     ]
 
+# module import only: locale, settings and the descriptors above
+IMPORT_TIME = time.time() - _import_start
+log("plugin.py imported in %.1f ms" % (IMPORT_TIME * 1000), DEBUG)
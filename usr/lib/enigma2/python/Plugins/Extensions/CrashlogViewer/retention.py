@@ -0,0 +1,117 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - retention policy
+# Decides which logs to remove: everything older than max_age, all but the
+# newest N per crash signature or log type, and the oldest logs of a mount
+# once its logs exceed max_bytes. Only the selection lives here; deleting
+# goes through cleanup.plan_deletion/run_deletion.
+
+from __future__ import print_function
+import time
+
+from .mounts import get_mount_table
+
+LOG_TYPES = ("crash", "debug", "network")
+# logs written to this recently are never touched (enigma2 may still write)
+PROTECT_RECENT = 600
+
+REASON_AGE = "age"
+REASON_COUNT = "count"
+REASON_SIZE = "size"
+
+
+class RetentionPolicy(object):
+
+    def __init__(self, keep_per_group=0, group_by="signature", max_bytes_per_mount=0, max_age_days=0):
+        # 0 disables the respective rule
+        self.keep_per_group = keep_per_group
+        self.group_by = group_by
+        self.max_bytes_per_mount = max_bytes_per_mount
+        self.max_age_days = max_age_days
+
+    @property
+    def active(self):
+        return bool(self.keep_per_group or self.max_bytes_per_mount or self.max_age_days)
+
+
+def log_type(path):
+    name = path.rsplit("/", 1)[-1].lower()
+    for t in LOG_TYPES:
+        if t in name:
+            return t
+    return "other"
+
+
+def _mount_point(path, table):
+    m = table.resolve(path)
+    return m.mountpoint if m is not None else "/"
+
+
+def select_for_removal(entries, policy, signature_of=None, table=None, now=None):
+    # entries: [(path, stat)]; signature_of(path, stat) -> signature, "" for
+    # none or None if the log was not parsed yet.
+    # Returns [(path, size, reason)], oldest first.
+    if now is None:
+        now = time.time()
+    if table is None:
+        table = get_mount_table()
+    # newest first for the count and size rules
+    entries = sorted(entries, key=lambda e: e[1].st_mtime, reverse=True)
+    candidates = [(path, st) for path, st in entries if now - st.st_mtime >= PROTECT_RECENT]
+    removed = {}
+
+    if policy.max_age_days:
+        limit = now - policy.max_age_days * 86400
+        for path, st in candidates:
+            if st.st_mtime < limit:
+                removed[path] = (st, REASON_AGE)
+
+    if policy.keep_per_group:
+        seen = {}
+        for path, st in candidates:
+            if path in removed:
+                continue
+            key = None
+            if policy.group_by == "signature":
+                key = signature_of(path, st) if signature_of is not None else None
+                if key is None:
+                    # not parsed yet (e.g. at boot with a stale cache): which
+                    # crash it is is unknown, so it is not counted at all
+                    continue
+            if not key:
+                # parsed, but without a signature: grouped by the log type
+                key = "type:" + log_type(path)
+            seen[key] = seen.get(key, 0) + 1
+            if seen[key] > policy.keep_per_group:
+                removed[path] = (st, REASON_COUNT)
+
+    if policy.max_bytes_per_mount:
+        # protected logs take their share of the drive limit, they are
+        # just never removed themselves
+        used = {}
+        for path, st in entries:
+            if path in removed:
+                continue
+            mp = _mount_point(path, table)
+            used[mp] = used.get(mp, 0) + st.st_size
+            if used[mp] > policy.max_bytes_per_mount and now - st.st_mtime >= PROTECT_RECENT:
+                removed[path] = (st, REASON_SIZE)
+
+    result = [(path, st.st_size, reason, st.st_mtime) for path, (st, reason) in removed.items()]
+    result.sort(key=lambda r: r[3])
+    return [(path, size, reason) for path, size, reason, mtime in result]
+
+
+def over_limit(entries, removal, policy, table=None):
+    # [(mount point, bytes)] of the mounts whose logs still exceed the drive
+    # limit after removal, i.e. the recent logs alone are above it
+    if not policy.max_bytes_per_mount:
+        return []
+    if table is None:
+        table = get_mount_table()
+    removed = set(path for path, size, reason in removal)
+    used = {}
+    for path, st in entries:
+        if path not in removed:
+            mp = _mount_point(path, table)
+            used[mp] = used.get(mp, 0) + st.st_size
+    return sorted((mp, size) for mp, size in used.items() if size > policy.max_bytes_per_mount)
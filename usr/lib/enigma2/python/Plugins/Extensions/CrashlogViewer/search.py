@@ -0,0 +1,164 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - search across all logs
+# Files are read in fixed-size blocks by a few worker threads; the partial
+# line at the end of a block is carried over into the next one, so matches
+# never straddle a block boundary. Hits are handed out as they are found and
+# the whole search stops once the hit limit is reached or it is cancelled.
+
+from __future__ import print_function
+import re
+import threading
+
+from .archive import open_log
+
+SEARCH_BLOCK = 1024 * 1024
+SEARCH_WORKERS = 3
+MAX_HITS = 500
+SNIPPET_LEN = 200
+
+
+def compile_query(query, regex=False):
+    # -> (compiled bytes pattern, fold); fold means: search the lowered block
+    if isinstance(query, str):
+        query = query.encode("utf-8")
+    if regex:
+        # blocks hold many lines: ^ and $ match at every line
+        return re.compile(query, re.IGNORECASE | re.MULTILINE), False
+    # literal: lowering the block once is cheaper than an IGNORECASE regex
+    return re.compile(re.escape(query.lower())), True
+
+
+def search_file(path, pattern, fold=False, on_hit=None, stop=None, block_size=SEARCH_BLOCK):
+    # calls on_hit(path, line, text) per matching line; returns the hit count
+    search = pattern.search
+    hits = 0
+    line = 0
+    carry = b""
+    with open_log(path) as f:
+        while stop is None or not stop.is_set():
+            chunk = f.read(block_size)
+            if not chunk:
+                buf = carry
+                carry = b""
+            else:
+                buf = carry + chunk
+                cut = buf.rfind(b"\n") + 1
+                if not cut and len(buf) < 16 * block_size:
+                    # no line end yet, read on
+                    carry = buf
+                    continue
+                if cut:
+                    buf, carry = buf[:cut], buf[cut:]
+                else:
+                    carry = b""
+            if not buf:
+                break
+            hay = buf.lower() if fold else buf
+            pos = 0
+            counted = 0
+            while True:
+                m = search(hay, pos)
+                if m is None:
+                    break
+                start = buf.rfind(b"\n", 0, m.start()) + 1
+                end = buf.find(b"\n", m.end())
+                if end < 0:
+                    end = len(buf)
+                line += buf.count(b"\n", counted, start)
+                counted = start
+                hits += 1
+                if on_hit is not None:
+                    text = buf[start:end].rstrip(b"\r")[:SNIPPET_LEN].decode("utf-8", "replace")
+                    if on_hit(path, line, text) is False:
+                        return hits
+                # one hit per line
+                pos = end + 1
+                if pos >= len(buf):
+                    break
+            line += buf.count(b"\n", counted)
+            if not chunk:
+                break
+    return hits
+
+
+class SearchJob(object):
+    # on_hit(path, line, text) and on_done(hits, complete) are called from
+    # the worker threads
+
+    def __init__(self, files, query, regex=False, limit=MAX_HITS, workers=SEARCH_WORKERS,
+                 on_hit=None, on_done=None):
+        self.pattern, self.fold = compile_query(query, regex)
+        self.files = list(files)
+        self.limit = limit
+        self.workers = max(1, min(workers, len(self.files)))
+        self.on_hit = on_hit
+        self.on_done = on_done
+        self.hits = 0
+        self.stop = threading.Event()
+        self._lock = threading.Lock()
+        self._next = 0
+        self._running = 0
+
+    def start(self):
+        if not self.files:
+            if self.on_done:
+                self.on_done(0, True)
+            return
+        self._running = self.workers
+        for n in range(self.workers):
+            t = threading.Thread(target=self._work, name="CrashlogSearch %d" % n)
+            t.daemon = True
+            t.start()
+
+    def cancel(self):
+        self.stop.set()
+
+    def _take(self):
+        with self._lock:
+            if self._next >= len(self.files) or self.stop.is_set():
+                return None
+            path = self.files[self._next]
+            self._next += 1
+            return path
+
+    def _hit(self, path, line, text):
+        with self._lock:
+            if self.stop.is_set():
+                return False
+            self.hits += 1
+            if self.hits >= self.limit:
+                # early stop: the other workers see it before their next block
+                self.stop.set()
+        if self.on_hit:
+            self.on_hit(path, line, text)
+        return not self.stop.is_set()
+
+    def _work(self):
+        try:
+            while True:
+                path = self._take()
+                if path is None:
+                    break
+                try:
+                    search_file(path, self.pattern, self.fold, self._hit, self.stop)
+                except (IOError, OSError, EOFError):
+                    # vanished or broken file, the others are still searched
+                    pass
+        finally:
+            with self._lock:
+                self._running -= 1
+                last = self._running == 0
+            if last and self.on_done:
+                self.on_done(self.hits, not self.stop.is_set())
+
+    def run(self):
+        # synchronous variant (scripts): returns [(path, line, text)]
+        found = []
+        on_hit, on_done = self.on_hit, self.on_done
+        self.on_hit = lambda *hit: found.append(hit)
+        done = threading.Event()
+        self.on_done = lambda hits, complete: done.set()
+        self.start()
+        done.wait()
+        self.on_hit, self.on_done = on_hit, on_done
+        return found
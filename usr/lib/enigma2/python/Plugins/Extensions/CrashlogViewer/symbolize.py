@@ -0,0 +1,388 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - backtrace symbolizer
+# The raw addresses of a FATAL SIGNAL backtrace are mapped to module and file
+# offset with the /proc/self/maps dump of the same log, and the offset to a
+# function from the ELF symbol table of the local file (.symtab when the file
+# is not stripped, else .dynsym). ELF files are read with struct, no external
+# tools. Each symbol table is cached on disk as sorted arrays, so later
+# lookups are a file read and a bisect per frame.
+
+from __future__ import print_function
+import hashlib
+import mmap
+import os
+import re
+import struct
+from array import array
+from bisect import bisect_right
+
+from .archive import is_archive, open_line_index
+from .crashparser import BT_FRAME_RE, SECTION_BACKTRACE, SECTION_MAPS, TIMESTAMP_RE
+from .diag import span
+
+SYMBOL_CACHE_DIR = "/var/cache/CrashlogViewer"
+CACHE_MAGIC = b"CLVS"
+CACHE_VERSION = 1
+# magic, version, e_type, symbols, segments, name bytes, file size, file mtime;
+# native byte order like the arrays that follow, the cache never leaves the box
+CACHE_HEADER = struct.Struct("=4sIIIIIqq")
+
+MAPS_LINE_RE = re.compile(br"^\s*([0-9a-fA-F]+)-([0-9a-fA-F]+)\s+\S{4}\s+([0-9a-fA-F]+)\s+\S+\s+\d+\s+(/\S+)")
+SYMBOL_OFFSET_RE = re.compile(r"^(.*?)\+(0x[0-9a-fA-F]+)$")
+
+ET_EXEC = 2
+PT_LOAD = 1
+SHT_SYMTAB = 2
+SHT_DYNSYM = 11
+STT_FUNC = 2
+STT_GNU_IFUNC = 10
+EM_ARM = 40
+
+
+class Mapping(object):
+    __slots__ = ("start", "end", "offset", "path")
+
+    def __init__(self, start, end, offset, path):
+        self.start = start
+        self.end = end
+        self.offset = offset
+        self.path = path
+
+
+def parse_maps(lines):
+    # lines of a /proc/self/maps dump (bytes) -> [Mapping] sorted by start
+    maps = []
+    for raw in lines:
+        m = TIMESTAMP_RE.match(raw)
+        m = MAPS_LINE_RE.match(raw[m.end():] if m else raw)
+        if m:
+            maps.append(Mapping(int(m.group(1), 16), int(m.group(2), 16), int(m.group(3), 16),
+                                m.group(4).decode("utf-8", "replace")))
+    maps.sort(key=lambda m: m.start)
+    return maps
+
+
+def parse_backtrace(lines):
+    # backtrace lines (bytes) -> [(module, symbol or "", address)]
+    frames = []
+    for raw in lines:
+        m = TIMESTAMP_RE.match(raw)
+        m = BT_FRAME_RE.match(raw[m.end():] if m else raw)
+        if m:
+            frames.append((m.group(1).decode("utf-8", "replace"),
+                           (m.group(2) or b"").decode("utf-8", "replace"), int(m.group(3), 16)))
+    return frames
+
+
+def demangle(name):
+    # Plain Itanium C++ names only: _ZN6eTimer4fireEv -> eTimer::fire,
+    # _Z17handleFatalSignaliP7siginfoPv -> handleFatalSignal. Templates and
+    # anything else unusual are returned as they are.
+    if not name.startswith("_Z"):
+        return name
+    s = name[2:]
+    nested = s.startswith("N")
+    parts = []
+    if nested:
+        s = s[1:].lstrip("rVKRO")
+        if s.startswith("St"):
+            parts.append("std")
+            s = s[2:]
+    while True:
+        m = re.match(r"\d+", s)
+        if m:
+            n = int(m.group())
+            parts.append(s[m.end():m.end() + n])
+            s = s[m.end() + n:]
+        elif nested and parts and s[:2] in ("C1", "C2", "C3", "D0", "D1", "D2"):
+            parts.append(("~" if s[0] == "D" else "") + parts[-1])
+            s = s[2:]
+        else:
+            break
+        if not nested:
+            break
+    if not parts or (nested and not s.startswith("E")):
+        return name
+    return "::".join(parts)
+
+
+# --- ELF ---
+def read_elf_symbols(path):
+    # -> (e_type, [(p_offset, p_vaddr, p_filesz)], [(value, size, name)])
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        if data[:4] != b"\x7fELF":
+            raise ValueError("not an ELF file: %s" % path)
+        is64 = data[4] == 2
+        end = "<" if data[5] == 1 else ">"
+        if is64:
+            (e_type, e_machine, _v, _entry, e_phoff, e_shoff, _flags, _ehsize, e_phentsize, e_phnum,
+             e_shentsize, e_shnum, _shstrndx) = struct.unpack_from(end + "HHIQQQIHHHHHH", data, 16)
+        else:
+            (e_type, e_machine, _v, _entry, e_phoff, e_shoff, _flags, _ehsize, e_phentsize, e_phnum,
+             e_shentsize, e_shnum, _shstrndx) = struct.unpack_from(end + "HHIIIIIHHHHHH", data, 16)
+
+        segments = []
+        for i in range(e_phnum):
+            off = e_phoff + i * e_phentsize
+            if is64:
+                p_type, _pf, p_offset, p_vaddr, _pa, p_filesz = struct.unpack_from(end + "IIQQQQ", data, off)
+            else:
+                p_type, p_offset, p_vaddr, _pa, p_filesz = struct.unpack_from(end + "IIIII", data, off)
+            if p_type == PT_LOAD:
+                segments.append((p_offset, p_vaddr, p_filesz))
+
+        sections = []
+        for i in range(e_shnum):
+            off = e_shoff + i * e_shentsize
+            if is64:
+                _n, sh_type, _fl, _a, sh_offset, sh_size, sh_link, _i, _al, sh_entsize = struct.unpack_from(
+                    end + "IIQQQQIIQQ", data, off)
+            else:
+                _n, sh_type, _fl, _a, sh_offset, sh_size, sh_link, _i, _al, sh_entsize = struct.unpack_from(
+                    end + "IIIIIIIIII", data, off)
+            sections.append((sh_type, sh_offset, sh_size, sh_link, sh_entsize))
+
+        table = [s for s in sections if s[0] == SHT_SYMTAB] or [s for s in sections if s[0] == SHT_DYNSYM]
+        symbols = []
+        if table:
+            sh_type, sh_offset, sh_size, sh_link, sh_entsize = table[0]
+            str_offset, str_size = sections[sh_link][1], sections[sh_link][2]
+            strtab = data[str_offset:str_offset + str_size]
+            fmt = end + ("IBBHQQ" if is64 else "IIIBBH")
+            entsize = struct.calcsize(fmt)
+            # Thumb functions have the low bit set
+            mask = ~1 if e_machine == EM_ARM else ~0
+            count = sh_size // (sh_entsize or entsize)
+            for fields in struct.iter_unpack(fmt, data[sh_offset:sh_offset + count * entsize]):
+                if is64:
+                    st_name, st_info, _o, st_shndx, st_value, st_size = fields
+                else:
+                    st_name, st_value, st_size, st_info, _o, st_shndx = fields
+                if st_shndx == 0 or not st_value or (st_info & 0xf) not in (STT_FUNC, STT_GNU_IFUNC):
+                    continue
+                name_end = strtab.find(b"\0", st_name)
+                symbols.append((st_value & mask, st_size, strtab[st_name:name_end]))
+        return e_type, segments, symbols
+    finally:
+        data.close()
+
+
+class SymbolTable(object):
+    # function symbols of one ELF file as sorted parallel arrays
+
+    def __init__(self, e_type, segments, addrs, sizes, name_offsets, names):
+        self.e_type = e_type
+        self.segments = segments
+        self.addrs = addrs
+        self.sizes = sizes
+        self.name_offsets = name_offsets
+        self.names = names
+
+    @classmethod
+    def from_elf(cls, path):
+        e_type, segments, symbols = read_elf_symbols(path)
+        # of aliases (printf, _IO_printf) the public looking name comes first
+        symbols.sort(key=lambda s: (s[0], len(s[2]) - len(s[2].lstrip(b"_")), len(s[2]), s[2]))
+        addrs, sizes, name_offsets = array("Q"), array("I"), array("I")
+        names = []
+        pos = 0
+        last = None
+        for value, size, name in symbols:
+            # aliases share an address, only the first one is kept
+            if value == last:
+                continue
+            last = value
+            addrs.append(value)
+            sizes.append(min(size, 0xffffffff))
+            name_offsets.append(pos)
+            names.append(name)
+            pos += len(name) + 1
+        return cls(e_type, segments, addrs, sizes, name_offsets, b"\0".join(names) + b"\0")
+
+    def to_bytes(self, st):
+        head = CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, self.e_type, len(self.addrs), len(self.segments),
+                                 len(self.names), st.st_size, int(st.st_mtime))
+        segs = array("Q", [v for seg in self.segments for v in seg])
+        return b"".join((head, segs.tobytes(), self.addrs.tobytes(), self.sizes.tobytes(),
+                         self.name_offsets.tobytes(), self.names))
+
+    @classmethod
+    def from_bytes(cls, data, st):
+        # None if the cache is of another version or another file state
+        if len(data) < CACHE_HEADER.size:
+            return None
+        magic, version, e_type, nsyms, nsegs, nnames, size, mtime = CACHE_HEADER.unpack_from(data)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION or size != st.st_size or mtime != int(st.st_mtime):
+            return None
+        pos = CACHE_HEADER.size
+
+        def take(typecode, n):
+            a = array(typecode)
+            a.frombytes(data[pos:pos + n * a.itemsize])
+            return a, pos + n * a.itemsize
+
+        segs, pos = take("Q", nsegs * 3)
+        addrs, pos = take("Q", nsyms)
+        sizes, pos = take("I", nsyms)
+        name_offsets, pos = take("I", nsyms)
+        names = data[pos:pos + nnames]
+        if len(names) != nnames:
+            return None
+        segments = [tuple(segs[i:i + 3]) for i in range(0, len(segs), 3)]
+        return cls(e_type, segments, addrs, sizes, name_offsets, names)
+
+    def vaddr(self, file_offset):
+        # file offset -> link-time address, via the loadable segment holding it
+        for p_offset, p_vaddr, p_filesz in self.segments:
+            if p_offset <= file_offset < p_offset + p_filesz:
+                return file_offset - p_offset + p_vaddr
+        return None
+
+    def lookup(self, vaddr):
+        # -> (name, offset into the function) or None
+        i = bisect_right(self.addrs, vaddr) - 1
+        if i < 0:
+            return None
+        start = self.addrs[i]
+        size = self.sizes[i]
+        if size and vaddr >= start + size:
+            # between functions: a local symbol the table does not have
+            return None
+        name_start = self.name_offsets[i]
+        name = self.names[name_start:self.names.index(b"\0", name_start)]
+        return name.decode("utf-8", "replace"), vaddr - start
+
+
+class Symbolizer(object):
+
+    def __init__(self, cache_dir=SYMBOL_CACHE_DIR, root=""):
+        # root: where the box's files are, for logs of another box
+        self.cache_dir = cache_dir
+        self.root = root.rstrip("/")
+        self.tables = {}
+
+    def cache_path(self, path):
+        return os.path.join(self.cache_dir, hashlib.sha1(path.encode("utf-8")).hexdigest()[:20] + ".sym")
+
+    def table(self, module):
+        # SymbolTable of a module path or None if it cannot be read
+        if module in self.tables:
+            return self.tables[module]
+        path = self.root + module
+        table = None
+        try:
+            st = os.stat(path)
+            cache = self.cache_path(path) if self.cache_dir else None
+            if cache:
+                try:
+                    with open(cache, "rb") as f:
+                        table = SymbolTable.from_bytes(f.read(), st)
+                except IOError:
+                    pass
+            if table is None:
+                table = SymbolTable.from_elf(path)
+                if cache:
+                    self.save(cache, table, st)
+        except (IOError, OSError, ValueError, IndexError, struct.error):
+            table = None
+        self.tables[module] = table
+        return table
+
+    def save(self, cache, table, st):
+        tmp = cache + ".tmp"
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            with open(tmp, "wb") as f:
+                f.write(table.to_bytes(st))
+            os.rename(tmp, cache)
+        except (IOError, OSError):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def resolve(self, module, symbol, address, maps, starts):
+        # -> (module, file offset or None, location text)
+        i = bisect_right(starts, address) - 1
+        mapping = maps[i] if i >= 0 and address < maps[i].end else None
+        if mapping is not None:
+            module = mapping.path
+            file_offset = address - mapping.start + mapping.offset
+        else:
+            file_offset = None
+        table = self.table(module)
+        vaddr = None
+        if table is not None:
+            if file_offset is not None:
+                vaddr = table.vaddr(file_offset)
+            elif table.e_type == ET_EXEC:
+                # not relocated, the address is the link-time address
+                vaddr = address
+        found = table.lookup(vaddr) if vaddr is not None else None
+        if found:
+            name, offset = found
+            return module, file_offset, "%s+0x%x" % (demangle(name), offset)
+        m = SYMBOL_OFFSET_RE.match(symbol)
+        if m and m.group(1):
+            return module, file_offset, "%s+%s" % (demangle(m.group(1)), m.group(2))
+        return module, file_offset, symbol or "??"
+
+    def symbolize(self, frames, maps=()):
+        # frames: [(module, symbol, address)] ->
+        # [(address, module, file offset or None, location)]
+        maps = list(maps)
+        starts = [m.start for m in maps]
+        out = []
+        with span("symbolize", "%d frames" % len(frames)):
+            for module, symbol, address in frames:
+                module, file_offset, location = self.resolve(module, symbol, address, maps, starts)
+                out.append((address, module, file_offset, location))
+        return out
+
+
+_symbolizer = None
+
+
+def get_symbolizer():
+    # shared instance, keeps the tables it has loaded
+    global _symbolizer
+    if _symbolizer is None:
+        _symbolizer = Symbolizer()
+    return _symbolizer
+
+
+def section_lines(path, sections):
+    # raw lines of the given sections of a log
+    lines = []
+    if is_archive(path):
+        index = open_line_index(path)
+        try:
+            for s in sections:
+                lines.extend(index.read_bytes(s.start_line, s.end_line - s.start_line).splitlines())
+        finally:
+            index.close()
+        return lines
+    with open(path, "rb") as f:
+        for s in sections:
+            f.seek(s.start_offset)
+            lines.extend(f.read(s.end_offset - s.start_offset).splitlines())
+    return lines
+
+
+def symbolize_log(path, report, symbolizer=None):
+    # worker-thread helper: the symbolized frames of every backtrace in the
+    # log, see Symbolizer.symbolize; an empty list without a backtrace
+    backtraces = report.sections_of(SECTION_BACKTRACE)
+    if not backtraces:
+        return []
+    frames = parse_backtrace(section_lines(path, backtraces))
+    maps = parse_maps(section_lines(path, report.sections_of(SECTION_MAPS)))
+    return (symbolizer or get_symbolizer()).symbolize(frames, maps)
+
+
+def format_frames(frames):
+    return "\n".join("#%-3d 0x%08x  %-24s %s" % (n, address, os.path.basename(module), location)
+                     for n, (address, module, file_offset, location) in enumerate(frames))
@@ -0,0 +1,1554 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - screens
+# Everything the plugin needs once it is opened. plugin.py only registers
+# the plugin at GUI start and imports this module on first use, so the
+# screens, their skins and the analysis modules cost nothing at boot.
+
+from __future__ import print_function
+import os, re, sys, time
+from collections import deque
+from Components.ActionMap import ActionMap
+from Components.ConfigList import ConfigListScreen
+from Components.config import getConfigListEntry
+from Components.Label import Label
+from Components.ProgressBar import ProgressBar
+from Components.ScrollLabel import ScrollLabel
+from Components.Sources.List import List
+from Components.Sources.StaticText import StaticText
+from Screens.ChoiceBox import ChoiceBox
+from Screens.MessageBox import MessageBox
+from Screens.Screen import Screen
+from Screens.Standby import TryQuitMainloop
+from Screens.VirtualKeyBoard import VirtualKeyBoard
+from Tools.Directories import SCOPE_PLUGINS, resolveFilename
+from Tools.LoadPixmap import LoadPixmap
+from enigma import eTimer, getDesktop
+from twisted.internet import reactor, threads
+from .analysis import format_size
+from .archive import archive_old_logs, is_archive, open_line_index, remove_log
+from .classifier import SEVERITIES, get_classifier
+from .cleanup import plan_deletion, run_deletion
+from .crashparser import SECTION_BACKTRACE
+from .diag import DEBUG, ERROR, LEVEL_NAMES, WARNING, flush as flush_log, get_diagnostics, span
+from .discovery import MEDIA_PREFIXES, discover_logs
+from .docstore import PAGED_LOG_SIZE, get_document_cache, get_prefetcher, neighbours
+from .export import bundle_name, export_logs
+from .follow import LogFollower
+from .fingerprint import NO_SIGNATURE, CrashGroup, group_logs
+from .logcache import LogMetaCache, parse_missing
+from .logdiff import DELETE, INSERT, REPLACE, diff_logs
+from .logindex import MAX_ERROR_LINES
+from .mounts import get_mount_table
+from .retention import RetentionPolicy, over_limit, select_for_removal
+from .search import SearchJob
+from .symbolize import format_frames, symbolize_log
+from .updater import GITHUB_ZIP_URL, fetch_remote_version, install_update, parse_version
+from .webserver import start_web_server, stop_web_server
+from .plugin import _, cfg, log, get_local_version as get_current_version, LAST_UPDATE_FILE, LOG_BASE_PATH, PLUGIN_PATH, VERSION_FILE
+
+# read once; the skins below are picked by it
+sz_w = getDesktop(0).size().width()
+
+# ms the cursor has to rest on a list entry before it is prefetched
+PREFETCH_DELAY = 400
+# follow mode: check interval (ms) and every how many checks to stat anyway
+FOLLOW_INTERVAL = 1000
+FOLLOW_STAT_TICKS = 10
+
+# eLabel colour escapes for tagged lines; TEXT_COLOR is the log text colour
+SEVERITY_COLORS = {
+    "critical": "\\c00ff3030",
+    "error": "\\c00ff9000",
+    "warning": "\\c00ffff00",
+    "info": "\\c0080c0ff",
+}
+TEXT_COLOR = "\\c0000ff00"
+# diff view: lines only in the left log, only in the right one, changed
+DIFF_COLORS = {
+    DELETE: "\\c00ff3030",
+    INSERT: "\\c0030ff30",
+    REPLACE: "\\c00ffff00",
+}
+DIFF_TEXT_COLOR = "\\c00c0c0c0"
+SEVERITY_FILTERS = {
+    "critical": _("Show: critical"),
+    "error": _("Show: errors"),
+    "warning": _("Show: warnings"),
+    "info": _("Show: all"),
+}
+
+SECTION_TITLES = {
+    "traceback": _("Python traceback"),
+    "backtrace": _("FATAL SIGNAL / backtrace"),
+    "registers": _("Registers"),
+    "maps": _("Memory maps"),
+    "settings": _("Settings"),
+    "dmesg": _("dmesg"),
+}
+
+# --- Update Funktionen ---
+def get_remote_version():
+    # blocking, only call it from a worker thread (see check_for_update)
+    try:
+        return fetch_remote_version()
+    except Exception as e:
+        log("Error fetching remote version: %s" % e, WARNING)
+        return None
+
+def runInBackground(func, callback, *args, **kwargs):
+    # func runs in a twisted worker thread, callback/errback back on the main loop
+    errback = kwargs.pop("errback", None)
+    d = threads.deferToThread(func, *args, **kwargs)
+    d.addCallback(callback)
+    d.addErrback(errback or (lambda failure: log("Background task failed: %s" % failure.getErrorMessage(), ERROR)))
+    return d
+
+def download_and_install_update(session, remote_version=None):
+    session.open(UpdateScreen, remote_version)
+
+def check_for_update(session, callback=None):
+    # The screen opens at once, the version check runs in the background
+    # and only shows up if there actually is something to install.
+    current_version = get_current_version()
+
+    def checked(remote_version):
+        try:
+            if remote_version and parse_version(remote_version) > parse_version(current_version):
+                def cb(choice):
+                    if choice:
+                        download_and_install_update(session, remote_version)
+                msg = _("A new version %s is available.\nDo you want to install the update?") % remote_version
+                session.openWithCallback(cb, MessageBox, msg, type=MessageBox.TYPE_YESNO)
+            else:
+                log("No update available (local %s, remote %s)" % (current_version, remote_version), DEBUG)
+        except Exception as e:
+            log("Error during update check: %s" % e, ERROR)
+
+    if callback:
+        callback()
+    runInBackground(get_remote_version, checked)
+
+# --- Crashlog Funktionen ---
+def isMountReadonly(path):
+    # resolved against the cached mount table, longest mount point wins
+    return get_mount_table().is_readonly(path)
+
+def scan_log_entries(base_path=LOG_BASE_PATH):
+    # ([(path, stat)], [mount points that timed out]); log roots come from
+    # the mount table, slow mounts are skipped
+    with span("scan", base_path):
+        entries, timed_out = discover_logs(base_path)
+    get_diagnostics().count("scan.logs", len(entries))
+    for mp in timed_out:
+        log("Scanning logs on %s timed out, skipped" % mp, WARNING)
+    return entries, timed_out
+
+def find_log_entries(base_path=LOG_BASE_PATH):
+    # [(path, stat)]
+    return scan_log_entries(base_path)[0]
+
+def find_log_files(base_path=LOG_BASE_PATH):
+    return [path for path, st in find_log_entries(base_path)]
+
+# --- Retention ---
+def retentionPolicy():
+    return RetentionPolicy(cfg.keep_per_group.value, cfg.group_by.value,
+                           cfg.max_mb_per_mount.value * 1024 * 1024, cfg.max_age_days.value)
+
+def computeRetention(policy):
+    # worker thread: [(path, size, reason)] the policy would remove
+    return previewRetention(policy)[0]
+
+def previewRetention(policy):
+    # worker thread: (removal, [(mount point, bytes)] still above the drive limit)
+    cache = LogMetaCache()
+    entries = find_log_entries()
+    removal = select_for_removal(entries, policy, cache.signature)
+    return removal, over_limit(entries, removal, policy)
+
+def applyRetention(policy):
+    removal = computeRetention(policy)
+    return run_deletion(plan_deletion([path for path, size, reason in removal]))
+
+def runMaintenance(policy, archive_days, archive_format):
+    # worker thread: clean up first, then archive what is left
+    removed = applyRetention(policy)[0] if policy is not None else 0
+    archived = archive_old_logs(find_log_entries(), archive_days, archive_format) if archive_days else []
+    return removed, len(archived)
+
+def maintenanceDone(result):
+    log("Retention removed %d log files, %d logs archived" % result)
+
+def autoMaintenance():
+    policy = retentionPolicy()
+    if not (cfg.retention.value and policy.active):
+        policy = None
+    if policy is not None or cfg.archive_after_days.value:
+        runInBackground(runMaintenance, maintenanceDone, policy, cfg.archive_after_days.value, cfg.archive_format.value)
+
+def updateWebServer():
+    # after the settings were saved
+    if cfg.web_enabled.value:
+        start_web_server(LOG_BASE_PATH, cfg.web_port.value, cfg.web_host.value, cfg.web_password.value, cfg.web_raw.value)
+    else:
+        stop_web_server()
+
+def compare_logs(left, right):
+    # worker-thread helper for DiffScreen: the diff and an index per log
+    diff = diff_logs(left, right)
+    return diff, open_line_index(left), open_line_index(right)
+
+
+def delete_log_files(files):
+    for file in files:
+        try:
+            remove_log(file)
+        except OSError as e:
+            log("Error deleting %s: %s" % (file, e), ERROR)
+
+# --- CrashLogScreen ---
+class CrashLogScreen(Screen):
+
+    if sz_w == 1920:
+        # Full HD Skin
+        skin = """<screen name="crashlogscreen" position="260,100" size="1400,880" title="%s">
+        <eLabel name="button info" font="Regular; 30" position="1063,821" size="103,48" cornerRadius="4" halign="center" valign="center" text="INFO" backgroundColor="black" zPosition="3" foregroundColor="red" />
+        <eLabel name="button ext" font="Regular; 30" position="1173,821" size="103,48" cornerRadius="4" halign="center" valign="center" text="EXIT" backgroundColor="black" zPosition="3" foregroundColor="red" />
+        <eLabel name="button ok" font="Regular; 30" position="1287,821" size="103,48" cornerRadius="4" halign="center" valign="center" text="OK" backgroundColor="black" zPosition="3" foregroundColor="red" />
+        <eLabel backgroundColor="listRecording" position="0,858" size="250,6" zPosition="12" />
+        <eLabel backgroundColor="green" position="260,858" size="250,6" zPosition="12" />
+        <eLabel backgroundColor="yellow" position="520,858" size="250,6" zPosition="12" />
+        <eLabel backgroundColor="blue" position="780,858" size="250,6" zPosition="12" />
+        <widget source="Redkey" render="Label" position="0,814" size="250,45" font="Regular;26" />
+        <widget source="Greenkey" render="Label" position="260,813" size="250,45" font="Regular;26" foregroundColor="green" />
+        <widget source="Yellowkey" render="Label" position="520,814" size="250,45" font="Regular;26" foregroundColor="yellow" />
+        <widget source="Bluekey" render="Label" position="780,814" size="250,45" font="Regular;26" foregroundColor="blue" />
+        <widget source="menu" render="Listbox" position="4,7" size="1390,800" scrollbarMode="showOnDemand">
+            <convert type="TemplatedMultiContent">
+                {"template":[
+                    MultiContentEntryText(pos=(70,2),size=(1300,50),font=0,flags=RT_HALIGN_LEFT,text=0),
+                    MultiContentEntryText(pos=(80,35),size=(1300,50),font=1,flags=RT_HALIGN_LEFT,text=1),
+                    MultiContentEntryPixmapAlphaTest(pos=(5,20),size=(45,32),png=2)],
+                "fonts":[gFont("Regular",35),gFont("Regular",35)],
+                "itemHeight":90}
+            </convert>
+        </widget>
+        </screen>""" % _("View or Remove Crashlog files")
+
+    else:
+        # HD / Fallback Skin
+        skin = """<screen name="crashlogscreen" position="center,center" size="1000,880" title="%s">
+        <eLabel name="button info" font="Regular; 30" position="881,761" size="103,48" cornerRadius="4" halign="center" valign="center" text="INFO" backgroundColor="black" zPosition="3" foregroundColor="red" />
+        <eLabel name="button ext" font="Regular; 30" position="773,761" size="103,48" cornerRadius="4" halign="center" valign="center" text="EXIT" backgroundColor="black" zPosition="3" foregroundColor="red" />
+        <eLabel name="button ok" font="Regular; 30" position="663,761" size="103,48" cornerRadius="4" halign="center" valign="center" text="OK" backgroundColor="black" zPosition="3" foregroundColor="red" />
+        <eLabel backgroundColor="listRecording" position="0,858" size="250,6" zPosition="12" />
+        <eLabel backgroundColor="green" position="250,858" size="250,6" zPosition="12" />
+        <eLabel backgroundColor="yellow" position="500,858" size="250,6" zPosition="12" />
+        <eLabel backgroundColor="blue" position="750,858" size="250,6" zPosition="12" />
+        <widget source="Redkey" render="Label" position="0,814" size="250,45" font="Regular;26" />
+        <widget source="Greenkey" render="Label" position="252,813" size="250,45" font="Regular;26" foregroundColor="green" />
+        <widget source="Yellowkey" render="Label" position="499,814" size="250,45" font="Regular;26" foregroundColor="yellow" />
+        <widget source="Bluekey" render="Label" position="749,814" size="250,45" font="Regular;26" foregroundColor="blue" />
+        <widget source="menu" render="Listbox" position="20,10" size="961,740" scrollbarMode="showOnDemand">
+            <convert type="TemplatedMultiContent">
+                {"template":[
+                    MultiContentEntryText(pos=(70,2),size=(880,50),font=0,flags=RT_HALIGN_LEFT,text=0),
+                    MultiContentEntryText(pos=(80,29),size=(880,50),font=1,flags=RT_HALIGN_LEFT,text=1),
+                    MultiContentEntryPixmapAlphaTest(pos=(5,20),size=(45,32),png=2)],
+                "fonts":[gFont("Regular",35),gFont("Regular",35)],
+                "itemHeight":90}
+            </convert>
+        </widget>
+        </screen>""" % _("View or Remove Crashlog files")
+
+
+    def __init__(self, session):
+        self.session = session
+        Screen.__init__(self, session)
+        self.setTitle(_("View or Remove Crashlog files"))
+        self["Redkey"] = StaticText(_("Close"))
+        self["Greenkey"] = StaticText(_("View"))
+        self["Yellowkey"] = StaticText(_("Remove"))
+        self["Bluekey"] = StaticText(_("Remove All"))
+
+        self.list = []
+        self.files = []
+        self.cache = LogMetaCache()
+        self.last_query = ""
+        # "files": every log, "groups": one row per crash signature,
+        # "group": the logs of self.group
+        self.mode = "files"
+        self.group = None
+        # log marked with "Mark for compare"
+        self.compare_mark = None
+        self.skipped = []
+        # the disks are scanned in a worker; a scan asked for meanwhile
+        # follows when it is done
+        self.scanning = False
+        self.rescan = False
+        self.active = True
+        self["menu"] = List(self.list)
+        self["menu"].onSelectionChanged.append(self.selectionChanged)
+        # logs around the cursor are loaded in the background, see docstore.py
+        self.prefetcher = get_prefetcher(get_classifier())
+        self.prefetch_timer = eTimer()
+        try:
+            self.prefetch_timer_conn = self.prefetch_timer.timeout.connect(self.prefetch)
+        except AttributeError:
+            self.prefetch_timer.callback.append(self.prefetch)
+
+        self["shortcuts"] = ActionMap(
+            ["ShortcutActions", "WizardActions", "EPGSelectActions", "MenuActions"],
+            {
+                "ok": self.Ok,
+                "cancel": self.exit,
+                "back": self.exit,
+                "red": self.exit,
+                "green": self.Ok,
+                "yellow": self.YellowKey,
+                "blue": self.BlueKey,
+                "epg": self.infoKey,
+                "menu": self.showOptions,
+            }
+        )
+
+        self.CfgMenu()
+
+    def CfgMenu(self):
+        # the scan may wait for slow mounts, so it runs in a worker
+        if not self.files:
+            # the logs of the last scan at once, from the cache
+            self.files = self.cache.files()
+            if self.files:
+                self.buildList()
+                self.selectionChanged()
+        if self.scanning:
+            self.rescan = True
+            return
+        self.scanning = True
+        self.setTitle(_("Searching for log files..."))
+        runInBackground(scan_log_entries, self.scanned, errback=self.scanFailed)
+
+    def scanned(self, result):
+        self.scanning = False
+        if not self.active:
+            return
+        self.setTitle(_("View or Remove Crashlog files"))
+        self.showScan(*result)
+        if self.rescan:
+            self.rescan = False
+            self.CfgMenu()
+
+    def scanFailed(self, failure):
+        self.scanning = False
+        log("Error scanning for logs: %s" % failure.getErrorMessage(), ERROR)
+        if self.active:
+            self.setTitle(_("View or Remove Crashlog files"))
+
+    def showScan(self, files, skipped):
+        self.files = files
+        if not self.files:
+            self.list = []
+            self["menu"].setList([])
+            return
+
+        # logs on a mount that timed out are not gone, only not seen this time
+        self.cache.prune([path for path, st in self.files], skipped)
+        self.buildList()
+        self.selectionChanged()
+
+        # only new or changed logs are parsed, the rest comes from the cache
+        missing = self.cache.missing(self.files)
+        if missing:
+            runInBackground(parse_missing, self.metaParsed, missing)
+        else:
+            self.cache.save()
+
+    def buildList(self):
+        with span("render", "list"):
+            self.renderList()
+
+    def renderList(self):
+        minipng = LoadPixmap(
+            cached=True,
+            path=resolveFilename(SCOPE_PLUGINS, "Extensions/CrashlogViewer/images/crashmini.png")
+            if sz_w >= 1920 else
+            resolveFilename(SCOPE_PLUGINS, "Extensions/CrashlogViewer/images/crashmini1.png")
+        )
+        if self.mode == "groups":
+            self.list = [(self.groupTitle(g), self.describeGroup(g), minipng, g) for g in self.groupFiles()]
+        else:
+            files = self.files
+            if self.mode == "group" and self.group is not None:
+                members = set(self.group.files)
+                files = [(path, st) for path, st in files if path in members]
+            self.list = [(("* " if path == self.compare_mark else "") + os.path.basename(path),
+                          self.describe(path, st), minipng, path)
+                         for path, st in files]
+        self["menu"].updateList(self.list)
+
+    def selectionChanged(self):
+        self.prefetch_timer.start(PREFETCH_DELAY, True)
+
+    def prefetch(self):
+        paths = [item[3] for item in self.list if not isinstance(item[3], CrashGroup)]
+        if paths:
+            self.prefetcher.want(neighbours(paths, min(self["menu"].getIndex(), len(paths) - 1)))
+
+    def groupFiles(self):
+        # signatures come from the cache, logs still being parsed are left out
+        items = []
+        for path, st in self.files:
+            signature = self.cache.signature(path, st)
+            if signature is not None:
+                report = self.cache.get(path, st)
+                items.append((path, st.st_mtime, signature, report.summary(short=True)))
+        return group_logs(items)
+
+    def groupTitle(self, group):
+        if group.signature == NO_SIGNATURE:
+            return _("Logs without crash signature")
+        return group.title
+
+    def describeGroup(self, group):
+        fmt = "%Y-%m-%d %H:%M"
+        return _("%dx  first %s  last %s") % (
+            group.count,
+            time.strftime(fmt, time.localtime(group.first_seen)),
+            time.strftime(fmt, time.localtime(group.last_seen)))
+
+    def setMode(self, mode, group=None):
+        self.mode = mode
+        self.group = group
+        self["menu"].setIndex(0)
+        self.buildList()
+
+    def showOptions(self):
+        choices = []
+        if self.mode == "files":
+            choices.append((_("Group duplicate crashes"), lambda: self.setMode("groups")))
+        else:
+            choices.append((_("Show all log files"), lambda: self.setMode("files")))
+        path = self.currentPath()
+        if path:
+            choices.append((_("Mark for compare"), lambda: self.markCompare(path)))
+            if self.compare_mark and self.compare_mark != path:
+                choices.append((_("Compare with %s") % os.path.basename(self.compare_mark),
+                                lambda: self.session.open(DiffScreen, self.compare_mark, path)))
+        files = self.exportFiles()
+        if files:
+            choices.append((_("Export for a bug report (%d logs)") % len(files), lambda: self.askExport(files)))
+        choices.append((_("Search all logs"), lambda: self.askSearch(False)))
+        choices.append((_("Search all logs (regular expression)"), lambda: self.askSearch(True)))
+        choices.append((_("Clean up now (preview)"), lambda: self.session.openWithCallback(self.CfgMenu, RetentionPreviewScreen)))
+        choices.append((_("Clean-up settings"), lambda: self.session.open(RetentionSetup)))
+        self.session.openWithCallback(self.optionSelected, ChoiceBox, title=_("Options"), list=choices)
+
+    def optionSelected(self, choice):
+        if choice:
+            choice[1]()
+
+    def currentPath(self):
+        item = self["menu"].getCurrent()
+        if not item or len(item) < 4 or isinstance(item[3], CrashGroup):
+            return None
+        return str(item[3])
+
+    def markCompare(self, path):
+        self.compare_mark = path
+        self.buildList()
+
+    def exportFiles(self):
+        # the current log, or every log of the current crash group
+        item = self["menu"].getCurrent()
+        if item and len(item) >= 4 and isinstance(item[3], CrashGroup):
+            return list(item[3].files)
+        if self.mode == "group" and self.group is not None:
+            return list(self.group.files)
+        path = self.currentPath()
+        return [path] if path else []
+
+    def askExport(self, files):
+        # USB sticks and disks that can be written to, /tmp as the fallback
+        table = get_mount_table()
+        targets = [m.mountpoint for m in table.media_mounts(MEDIA_PREFIXES)
+                   if not m.readonly and os.path.isdir(m.mountpoint)]
+        targets.append("/tmp")
+        choices = [(_("Save to %s") % target, target) for target in targets]
+        self.session.openWithCallback(lambda choice: choice and self.startExport(files, choice[1]),
+                                      ChoiceBox, title=_("Export for a bug report"), list=choices)
+
+    def startExport(self, files, target_dir):
+        target = os.path.join(target_dir, bundle_name(cfg.export_format.value))
+        extra = [("plugin", "CrashlogViewer %s" % get_current_version())]
+        self.session.openWithCallback(lambda result: self.exported(target, result), ProgressScreen,
+                                      _("Export for a bug report"), _("Writing %s...") % target,
+                                      export_logs, files, target, cfg.export_format.value,
+                                      max_size=cfg.export_max_mb.value * 1024 * 1024, extra_info=extra)
+
+    def exported(self, target, result):
+        if not result:
+            return
+        written, left_out, redacted = result
+        msg = _("%d logs saved to\n%s") % (len(written), target)
+        msg += "\n" + _("%d passwords, addresses and similar were masked") % redacted
+        if left_out:
+            msg += "\n" + _("%d logs left out, see manifest.txt") % len(left_out)
+        self.session.open(MessageBox, msg, MessageBox.TYPE_INFO)
+
+    def askSearch(self, regex):
+        title = _("Search all logs (regular expression)") if regex else _("Search all logs")
+        self.session.openWithCallback(lambda query: self.startSearch(query, regex), VirtualKeyBoard,
+                                      title=title, text=self.last_query)
+
+    def startSearch(self, query, regex):
+        if not query:
+            return
+        self.last_query = query
+        self.session.open(SearchScreen, [path for path, st in self.files], query, regex)
+
+    def describe(self, path, st):
+        file_date = time.strftime("%Y-%m-%d %H:%M", time.localtime(st.st_mtime))
+        report = self.cache.get(path, st)
+        if report is None:
+            info = _("analysing...")
+        else:
+            info = report.summary(short=True) or _("%d lines") % report.lines
+        return "%s  %s  %s" % (file_date, format_size(st.st_size), info)
+
+    def metaParsed(self, results):
+        for path, st, report in results:
+            self.cache.put(path, st, report)
+        self.cache.save()
+        if self.files:
+            self.buildList()
+
+    def Ok(self):
+        item = self["menu"].getCurrent()
+        if not item or len(item) < 4:
+            self.session.open(MessageBox, _("No log file selected!"), MessageBox.TYPE_INFO, timeout=4)
+            return
+        if isinstance(item[3], CrashGroup):
+            self.setMode("group", item[3])
+            return
+        self.session.openWithCallback(lambda *args: self.logClosed(str(item[3])), LogScreen, str(item[3]))
+
+    def logClosed(self, path):
+        # no new scan: only the log that was open can have changed (follow mode)
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.CfgMenu()
+            return
+        for n, (p, old) in enumerate(self.files):
+            if p == path:
+                self.files[n] = (path, st)
+                break
+        self.buildList()
+        missing = self.cache.missing([(path, st)])
+        if missing:
+            runInBackground(parse_missing, self.metaParsed, missing)
+
+    def YellowKey(self):
+        item = self["menu"].getCurrent()
+        if not item or len(item) < 4 or isinstance(item[3], CrashGroup):
+            return
+        try:
+            remove_log(str(item[3]))
+            self.session.open(MessageBox, _("Removed %s") % item[3], MessageBox.TYPE_INFO, timeout=4)
+        except Exception as e:
+            self.session.open(MessageBox, _("Failed to remove file:\n%s") % e, MessageBox.TYPE_INFO, timeout=4)
+        self.CfgMenu()
+
+    def BlueKey(self):
+        # grouped by mount, read-only/unavailable mounts are left out up front
+        plan = plan_deletion([path for path, st in self.files])
+        self.skipped = plan.skipped
+        if not plan.total:
+            self.showDeleteResult(0, [])
+            return
+        self.session.openWithCallback(self.bulkDeleted, ProgressScreen, _("Remove All"),
+                                      _("Removing log files..."), run_deletion, plan)
+
+    def bulkDeleted(self, result):
+        if result:
+            self.showDeleteResult(*result)
+        self.CfgMenu()
+
+    def showDeleteResult(self, deleted_files, failed_files):
+        msg = _("Removed %d log files") % deleted_files if deleted_files else _("No log files found to remove")
+        for mp, reason, count in self.skipped:
+            msg += "\n" + _("Skipped %d files on %s (%s)") % (count, mp, reason)
+        if failed_files:
+            msg += "\n" + _("Failed to remove some files:\n") + "\n".join("%s (%s)" % f for f in failed_files[:10])
+        self.session.open(MessageBox, msg, MessageBox.TYPE_INFO, timeout=6)
+
+    def infoKey(self):
+        self.session.open(DiagnosticsScreen)
+
+    def exit(self):
+        if self.mode == "group":
+            self.setMode("groups")
+            return
+        self.active = False
+        self.files = []
+        self.prefetch_timer.stop()
+        self.prefetcher.want([])
+        self.cache.save()
+        flush_log()
+        self.close()
+
+
+class LogScreen(Screen):
+
+    if sz_w == 1920:
+        # Full HD Skin
+        skin = """<screen name="LogScreen" position="70,68" size="1780,980" title="%s" flags="wfBorder">
+            <eLabel name="button info" font="Regular; 30" position="1667,924" size="103,48" cornerRadius="4" halign="center" valign="center" text="INFO" backgroundColor="black" zPosition="3" foregroundColor="red" />
+            <eLabel name="button ext" font="Regular; 30" position="1555,924" size="103,48" cornerRadius="4" halign="center" valign="center" text="EXIT" backgroundColor="black" zPosition="3" foregroundColor="red" />
+            <eLabel name="button ok" font="Regular; 30" position="1444,924" size="103,48" cornerRadius="4" halign="center" valign="center" text="OK" backgroundColor="black" zPosition="3" foregroundColor="red" />
+            <widget source="Redkey" render="Label" position="7,921" size="250,45" zPosition="11" font="Regular; 26" valign="center" halign="center" backgroundColor="#050c101b" transparent="1" />
+            <widget source="Greenkey" render="Label" position="269,921" size="250,45" zPosition="11" font="Regular; 26" valign="center" halign="center" backgroundColor="#050c101b" transparent="1" foregroundColor="green" />
+            <eLabel backgroundColor="#00ff0000" position="6,969" size="250,6" zPosition="12" />
+            <eLabel backgroundColor="#0000ff00" position="269,969" size="250,6" zPosition="12" />
+            <widget source="Yellowkey" render="Label" position="531,921" size="250,45" zPosition="11" font="Regular; 26" valign="center" halign="center" backgroundColor="#050c101b" transparent="1" foregroundColor="yellow" />
+            <eLabel backgroundColor="#00ffff00" position="531,969" size="250,6" zPosition="12" />
+            <widget source="Bluekey" render="Label" position="793,921" size="250,45" zPosition="11" font="Regular; 26" valign="center" halign="center" backgroundColor="#050c101b" transparent="1" foregroundColor="blue" />
+            <eLabel backgroundColor="#000000ff" position="793,969" size="250,6" zPosition="12" />
+            <widget name="text" position="2,1" size="1770,800" font="Console; 28" foregroundColor="#0000ff00" />
+            <widget name="text2" position="3,805" size="1770,110" font="Console; 28" foregroundColor="#ff0000" />
+            <eLabel position="3,801" size="1770,2" backgroundColor="#555555" zPosition="1" />
+        </screen>""" % _("View Crashlog file")
+
+    else:
+        # HD / Fallback Skin
+        skin = """<screen name="LogScreen" position="240,140" size="1440,800" title="%s" flags="wfBorder">
+            <eLabel name="button info" font="Regular; 30" position="1323,741" size="103,48" cornerRadius="4" halign="center" valign="center" text="INFO" backgroundColor="black" zPosition="3" foregroundColor="red" />
+            <eLabel name="button ext" font="Regular; 30" position="1206,741" size="103,48" cornerRadius="4" halign="center" valign="center" text="EXIT" backgroundColor="black" zPosition="3" foregroundColor="red" />
+            <eLabel name="button ok" font="Regular; 30" position="1092,741" size="103,48" cornerRadius="4" halign="center" valign="center" text="OK" backgroundColor="black" zPosition="3" foregroundColor="red" />
+            <widget source="Redkey" render="Label" position="7,742" size="250,45" zPosition="11" font="Regular; 26" valign="center" halign="center" backgroundColor="#050c101b" transparent="1" />
+            <widget source="Greenkey" render="Label" position="266,742" size="250,45" zPosition="11" font="Regular; 26" valign="center" halign="center" backgroundColor="#050c101b" transparent="1" foregroundColor="green" />
+            <eLabel backgroundColor="#00ff0000" position="8,790" size="250,6" zPosition="12" />
+            <eLabel backgroundColor="#0000ff00" position="267,790" size="250,6" zPosition="12" />
+            <widget source="Yellowkey" render="Label" position="526,742" size="250,45" zPosition="11" font="Regular; 26" valign="center" halign="center" backgroundColor="#050c101b" transparent="1" foregroundColor="yellow" />
+            <eLabel backgroundColor="#00ffff00" position="526,790" size="250,6" zPosition="12" />
+            <widget source="Bluekey" render="Label" position="786,742" size="250,45" zPosition="11" font="Regular; 26" valign="center" halign="center" backgroundColor="#050c101b" transparent="1" foregroundColor="blue" />
+            <eLabel backgroundColor="#000000ff" position="786,790" size="250,6" zPosition="12" />
+            <widget name="text" position="3,3" size="1430,610" font="Console; 28" foregroundColor="#0000ff00" />
+            <widget name="text2" position="3,619" size="1430,110" font="Console; 28" foregroundColor="#ff0000" />
+            <eLabel position="3,615" size="1430,2" backgroundColor="#555555" zPosition="1" />
+        </screen>""" % _("View Crashlog file")
+
+    # visible lines of the 'text' widget in paged mode
+    page_lines = 22 if sz_w == 1920 else 17
+
+
+    def __init__(self, session, crashfile, line=None):
+        Screen.__init__(self, session)
+        self.session = session
+        self.crashfile = crashfile
+        self.setTitle(_("View Crashlog file"))
+        self["Redkey"] = StaticText(_("Close"))
+        self["Greenkey"] = StaticText(_("Restart GUI"))
+        self["Yellowkey"] = StaticText(_("Follow"))
+        self["Bluekey"] = StaticText(SEVERITY_FILTERS["info"])
+        self["text"] = ScrollLabel("")
+        self["text2"] = ScrollLabel("")
+
+        self.index = None
+        # the index of a large log is built in a worker, the parse waits for it
+        self.indexing = False
+        self.parse_waiting = False
+        self.top = 0
+        self.report = None
+        # parse result and index state, kept for the next time it is opened
+        self.docs = get_document_cache()
+        self.doc = None
+        self.error_text = ""
+        # small logs: all lines, kept to colour them once the tags are in
+        self.lines = None
+        # severity tags from the background parse: line -> rule index
+        self.classifier = get_classifier()
+        self.tags = []
+        self.tagged = {}
+        self.min_severity = "info"
+        # follow mode: ring of the newest lines, refreshed by a timer
+        self.follower = None
+        self.follow_back = 0
+        self.follow_ticks = 0
+        self.follow_timer = eTimer()
+        try:
+            self.follow_timer_conn = self.follow_timer.timeout.connect(self.followTick)
+        except AttributeError:
+            self.follow_timer.callback.append(self.followTick)
+
+        # Scroll- und Farb-Tasten belegen
+        self["actions"] = ActionMap(
+            ["OkCancelActions", "DirectionActions", "ColorActions", "NumberActions", "MenuActions"],
+            {
+                "cancel": self.exit,
+                "ok": self.exit,
+                "red": self.exit,
+                "green": self.restartGUI,
+                "yellow": self.toggleFollow,
+                "blue": self.cycleSeverity,
+                # Zeilenweise scrollen
+                "up": self.scrollUp,
+                "down": self.scrollDown,
+                # Seitenweise scrollen
+                "left": self.scrollPageUp,
+                "right": self.scrollPageDown,
+                # Anfang / Ende
+                "1": self.scrollTop,
+                "0": self.scrollBottom,
+                # vorheriger / nächster markierter Eintrag
+                "4": self.prevTag,
+                "6": self.nextTag,
+                # Abschnitte (Traceback, Backtrace, Maps, ...)
+                "menu": self.showSections,
+            },
+            -1
+        )
+
+        self.onClose.append(self.onLogScreenClose)
+        self.loadLogFile()
+        if line is not None:
+            # opened from a search hit
+            self.gotoLine(line)
+        if self.indexing:
+            self.parse_waiting = True
+        else:
+            self.startParse()
+
+    def startParse(self):
+        if self.doc is not None:
+            self.parsed(self.doc.report)
+        elif os.path.exists(self.crashfile):
+            # the error pane is filled from the tags of this pass; the index
+            # or lines just read go into the document, they are not read again
+            runInBackground(self.docs.load, self.loaded, self.crashfile, self.classifier, self.index, self.lines)
+
+    def loadLogFile(self):
+        full_text = ""
+        self.lines = None
+        self.doc = self.docs.get(self.crashfile)
+        try:
+            if not os.path.exists(self.crashfile):
+                full_text = _("File not found: %s") % self.crashfile
+            elif self.doc is not None and self.doc.lines is None:
+                # prefetched or opened before: no scan of the file
+                self.index = self.doc.open_index()
+                self.showWindow()
+                return
+            elif self.doc is not None:
+                self.lines = self.doc.lines
+                full_text = self.colouredText()
+            elif is_archive(self.crashfile) or os.path.getsize(self.crashfile) >= PAGED_LOG_SIZE:
+                # archives are always paged, only the needed block is decompressed
+                self.openIndex()
+                return
+            else:
+                with open(self.crashfile, "r", encoding="utf-8", errors="replace") as f:
+                    self.lines = f.readlines()
+                full_text = self.colouredText()
+        except Exception as e:
+            self.closeIndex()
+            full_text = _("Error opening file:\n%s") % e
+        self["text"].setText(full_text)
+
+    def openIndex(self):
+        # one pass over the whole file: not on the GUI thread
+        if self.indexing:
+            return
+        self.indexing = True
+        self["text"].setText(_("Reading %s...") % os.path.basename(self.crashfile))
+        runInBackground(open_line_index, self.indexed, self.crashfile, errback=self.indexFailed)
+
+    def indexed(self, index):
+        self.indexing = False
+        if self.crashfile is None or self.follower:
+            # closed or following meanwhile
+            index.close()
+            return
+        self.index = index
+        self.showWindow()
+        self.indexDone()
+
+    def indexFailed(self, failure):
+        self.indexing = False
+        if self.crashfile is None:
+            return
+        log("Error indexing %s: %s" % (self.crashfile, failure.getErrorMessage()), ERROR)
+        if not self.follower:
+            self["text"].setText(_("Error opening file:\n%s") % failure.getErrorMessage())
+        self.indexDone()
+
+    def indexDone(self):
+        if self.parse_waiting:
+            self.parse_waiting = False
+            self.startParse()
+
+    def loaded(self, doc):
+        self.parsed(doc.report)
+
+    def parsed(self, report):
+        # section index, key facts and severity tags from the background parse
+        if self.crashfile is None:
+            return
+        self.report = report
+        self.tags = report.tags
+        self.tagged = dict((line, rule) for line, rule, text in report.tags)
+        self.showTags()
+        self.refreshText()
+
+    # --- Severity tags ---
+    def shownRule(self, rule):
+        return self.classifier.rules[rule].rank <= SEVERITIES.index(self.min_severity)
+
+    def colour(self, n, text):
+        rule = self.tagged.get(n)
+        if rule is None or not self.shownRule(rule):
+            return text
+        return SEVERITY_COLORS[self.classifier.rules[rule].severity] + text + TEXT_COLOR
+
+    def colouredText(self):
+        with span("render", "text"):
+            if not self.tagged:
+                return "".join(self.lines)
+            return "".join(self.colour(n, line.rstrip("\n")) + "\n" if n in self.tagged else line
+                           for n, line in enumerate(self.lines))
+
+    def showTags(self):
+        rules = self.classifier.rules
+        shown = [(line, rule, text) for line, rule, text in self.tags if self.shownRule(rule)][-MAX_ERROR_LINES:]
+        self.error_text = "\n".join("%s%6d %-10s %s" % (SEVERITY_COLORS[rules[rule].severity], line + 1, rules[rule].category, text)
+                                    for line, rule, text in shown)
+        summary = self.report.summary() if self.report else ""
+        self["text2"].setText(summary + "\n" + self.error_text if summary else self.error_text)
+
+    def refreshText(self):
+        if self.follower:
+            return
+        if self.index:
+            self.showWindow()
+        elif self.lines is not None:
+            self["text"].setText(self.colouredText())
+
+    def cycleSeverity(self):
+        # all -> warnings -> errors -> critical -> all
+        i = SEVERITIES.index(self.min_severity)
+        self.min_severity = SEVERITIES[i - 1] if i else SEVERITIES[-1]
+        self["Bluekey"].setText(SEVERITY_FILTERS[self.min_severity])
+        self.showTags()
+        self.refreshText()
+
+    def shownTagLines(self):
+        return [line for line, rule, text in self.tags if self.shownRule(rule)]
+
+    def nextTag(self):
+        current = self.top if self.index else -1
+        for line in self.shownTagLines():
+            if line > current:
+                self.gotoLine(line)
+                return
+
+    def prevTag(self):
+        current = self.top if self.index else 0
+        for line in reversed(self.shownTagLines()):
+            if line < current:
+                self.gotoLine(line)
+                return
+
+    def showSections(self):
+        if self.report is None:
+            self.session.open(MessageBox, _("The log is still being analysed, please wait."), MessageBox.TYPE_INFO, timeout=3)
+            return
+        if not self.report.sections:
+            self.session.open(MessageBox, _("No sections found in this log."), MessageBox.TYPE_INFO, timeout=3)
+            return
+        choices = [("%s  (%s %d)" % (SECTION_TITLES.get(sec.kind, sec.kind), _("line"), sec.start_line + 1), sec)
+                   for sec in self.report.sections]
+        if self.report.sections_of(SECTION_BACKTRACE):
+            choices.insert(0, (_("Resolve backtrace addresses"), "symbolize"))
+        self.session.openWithCallback(self.sectionSelected, ChoiceBox, title=_("Jump to section"), list=choices)
+
+    def sectionSelected(self, choice):
+        if not choice:
+            return
+        if choice[1] == "symbolize":
+            self["text2"].setText(_("Resolving backtrace addresses..."))
+            runInBackground(symbolize_log, self.symbolized, self.crashfile, self.report,
+                            errback=self.symbolizeFailed)
+        else:
+            self.gotoLine(choice[1].start_line)
+
+    def symbolized(self, frames):
+        # shown in the lower pane until the severity filter is changed
+        if self.crashfile is None:
+            return
+        text = format_frames(frames) if frames else _("No backtrace frames found.")
+        self["text2"].setText(_("Backtrace (functions from the local files):") + "\n" + text)
+
+    def symbolizeFailed(self, failure):
+        log("Error resolving the backtrace of %s: %s" % (self.crashfile, failure.getErrorMessage()), ERROR)
+        if self.crashfile is not None:
+            self.showTags()
+
+    def gotoLine(self, line):
+        # jumping always uses the paged view, also for small logs
+        self.stopFollow()
+        self.top = line
+        if self.index is None:
+            # shown at this line once the index is built
+            self.openIndex()
+            return
+        self.showWindow()
+
+    def closeIndex(self):
+        if self.index:
+            self.index.close()
+            self.index = None
+
+    def onLogScreenClose(self):
+        self.stopFollow()
+        self.closeIndex()
+        self.crashfile = None
+
+    # --- Follow mode: only appended bytes are read ---
+    def toggleFollow(self):
+        if self.follower:
+            self.stopFollow()
+            self.loadLogFile()
+            self.scrollBottom()
+            return
+        if is_archive(self.crashfile) or not os.path.exists(self.crashfile):
+            return
+        self.closeIndex()
+        try:
+            classify = self.classifier.classify_line
+            self.follower = LogFollower(self.crashfile, match=lambda raw: classify(raw) is not None)
+        except Exception as e:
+            log("Error following %s: %s" % (self.crashfile, e), ERROR)
+            return
+        self.follow_back = 0
+        self.follow_ticks = 0
+        self["Yellowkey"].setText(_("Stop following"))
+        self.showFollow()
+        self.follow_timer.start(FOLLOW_INTERVAL, False)
+
+    def stopFollow(self):
+        self.follow_timer.stop()
+        if self.follower:
+            self.follower.close()
+            self.follower = None
+        self["Yellowkey"].setText(_("Follow"))
+
+    def followTick(self):
+        if not self.follower:
+            return
+        self.follow_ticks += 1
+        # inotify sees nothing on network mounts, so stat now and then anyway
+        count, event = self.follower.check(force=self.follow_ticks % FOLLOW_STAT_TICKS == 0)
+        if count or event:
+            if self.follow_back:
+                # keep the lines the user scrolled to in place
+                self.follow_back += count
+            self.showFollow()
+
+    def showFollow(self):
+        lines = self.follower.lines
+        total = len(lines)
+        self.follow_back = max(0, min(self.follow_back, total - self.page_lines))
+        end = total - self.follow_back
+        self["text"].setText("\n".join(lines[i] for i in range(max(0, end - self.page_lines), end)))
+        self["text2"].setText("\n".join(self.follower.errors))
+        self.setTitle(_("Following %s") % os.path.basename(self.crashfile) +
+                      ("  (-%d)" % self.follow_back if self.follow_back else ""))
+
+    def moveFollow(self, delta):
+        # delta > 0 moves towards the newest line
+        self.follow_back -= delta
+        self.showFollow()
+
+    # --- Paged mode: only the visible window is decoded ---
+    def showWindow(self):
+        lines = self.index.lines
+        self.top = max(0, min(self.top, lines - self.page_lines))
+        with span("render", "window"):
+            window = self.index.window(self.top, self.page_lines)
+            self["text"].setText("\n".join(self.colour(self.top + i, line) for i, line in enumerate(window)))
+        self.setTitle(_("View Crashlog file") + "  %d-%d / %d" % (
+            min(self.top + 1, lines), min(self.top + self.page_lines, lines), lines))
+
+    def moveWindow(self, delta):
+        self.top += delta
+        self.showWindow()
+
+    # --- Scrollsteuerung für beide Bereiche ---
+    def scrollUp(self):
+        if self.follower:
+            self.moveFollow(-1)
+        elif self.index:
+            self.moveWindow(-1)
+        else:
+            self["text"].moveUp()
+        self["text2"].moveUp()
+
+    def scrollDown(self):
+        if self.follower:
+            self.moveFollow(1)
+        elif self.index:
+            self.moveWindow(1)
+        else:
+            self["text"].moveDown()
+        self["text2"].moveDown()
+
+    def scrollPageUp(self):
+        if self.follower:
+            self.moveFollow(-self.page_lines)
+        elif self.index:
+            self.moveWindow(-self.page_lines)
+        else:
+            self["text"].pageUp()
+        self["text2"].pageUp()
+
+    def scrollPageDown(self):
+        if self.follower:
+            self.moveFollow(self.page_lines)
+        elif self.index:
+            self.moveWindow(self.page_lines)
+        else:
+            self["text"].pageDown()
+        self["text2"].pageDown()
+
+    def scrollTop(self):
+        if self.follower:
+            self.moveFollow(-len(self.follower.lines))
+        elif self.index:
+            self.top = 0
+            self.showWindow()
+
+    def scrollBottom(self):
+        if self.follower:
+            self.moveFollow(self.follow_back)
+        elif self.index:
+            self.top = self.index.lines
+            self.showWindow()
+        elif self.indexing:
+            # the last page, once the index is built
+            self.top = sys.maxsize
+
+    def restartGUI(self):
+        self.session.open(TryQuitMainloop, 3)
+
+    def exit(self):
+        self.close()
+
+
+class RetentionSetup(Screen, ConfigListScreen):
+    skin = """<screen name="CrashlogViewerRetentionSetup" position="center,center" size="1200,520" title="%s">
+        <widget name="config" position="20,20" size="1160,400" font="Regular;30" itemHeight="45" scrollbarMode="showOnDemand" />
+        <eLabel backgroundColor="#00ff0000" position="20,500" size="250,6" zPosition="12" />
+        <eLabel backgroundColor="#0000ff00" position="290,500" size="250,6" zPosition="12" />
+        <widget source="Redkey" render="Label" position="20,450" size="250,45" font="Regular;26" halign="center" />
+        <widget source="Greenkey" render="Label" position="290,450" size="250,45" font="Regular;26" halign="center" foregroundColor="green" />
+    </screen>""" % _("Clean-up settings")
+
+    def __init__(self, session):
+        Screen.__init__(self, session)
+        self.session = session
+        self.setTitle(_("Clean-up settings"))
+        self["Redkey"] = StaticText(_("Cancel"))
+        self["Greenkey"] = StaticText(_("Save"))
+        entries = [
+            getConfigListEntry(_("Clean up automatically at GUI start"), cfg.retention),
+            getConfigListEntry(_("Keep newest logs per group (0 = all)"), cfg.keep_per_group),
+            getConfigListEntry(_("Group logs by"), cfg.group_by),
+            getConfigListEntry(_("Max. MB of logs per drive (0 = unlimited)"), cfg.max_mb_per_mount),
+            getConfigListEntry(_("Max. age in days (0 = unlimited)"), cfg.max_age_days),
+            getConfigListEntry(_("Compress logs older than days (0 = never)"), cfg.archive_after_days),
+            getConfigListEntry(_("Compression format"), cfg.archive_format),
+            getConfigListEntry(_("Export format"), cfg.export_format),
+            getConfigListEntry(_("Max. MB of logs per export"), cfg.export_max_mb),
+            getConfigListEntry(_("Web access from a PC"), cfg.web_enabled),
+            getConfigListEntry(_("Web access port"), cfg.web_port),
+            getConfigListEntry(_("Web access from"), cfg.web_host),
+            getConfigListEntry(_("Web access password"), cfg.web_password),
+            getConfigListEntry(_("Web access without masking"), cfg.web_raw),
+        ]
+        ConfigListScreen.__init__(self, entries, session=session)
+        self["actions"] = ActionMap(
+            ["SetupActions", "ColorActions"],
+            {
+                "cancel": self.keyCancel,
+                "red": self.keyCancel,
+                "ok": self.keySave,
+                "green": self.keySave,
+            },
+            -2
+        )
+
+    def keySave(self):
+        ConfigListScreen.keySave(self)
+        updateWebServer()
+
+
+class RetentionPreviewScreen(Screen):
+    # dry run: shows what the clean-up would remove, green applies it
+    skin = """<screen name="CrashlogViewerRetentionPreview" position="center,center" size="1400,800" title="%s">
+        <widget name="text" position="10,10" size="1380,720" font="Console;24" />
+        <eLabel backgroundColor="#00ff0000" position="10,790" size="250,6" zPosition="12" />
+        <eLabel backgroundColor="#0000ff00" position="270,790" size="250,6" zPosition="12" />
+        <widget source="Redkey" render="Label" position="10,745" size="250,45" font="Regular;26" halign="center" />
+        <widget source="Greenkey" render="Label" position="270,745" size="250,45" font="Regular;26" halign="center" foregroundColor="green" />
+    </screen>""" % _("Clean up log files")
+
+    def __init__(self, session):
+        Screen.__init__(self, session)
+        self.session = session
+        self.removal = None
+        self.setTitle(_("Clean up log files"))
+        self["Redkey"] = StaticText(_("Close"))
+        self["Greenkey"] = StaticText("")
+        self["text"] = ScrollLabel(_("Checking log files..."))
+        self["actions"] = ActionMap(
+            ["OkCancelActions", "ColorActions", "DirectionActions"],
+            {
+                "cancel": self.close,
+                "red": self.close,
+                "green": self.apply,
+                "up": self["text"].pageUp,
+                "down": self["text"].pageDown,
+            },
+            -1
+        )
+        policy = retentionPolicy()
+        if policy.active:
+            runInBackground(previewRetention, self.computed, policy)
+        else:
+            self["text"].setText(_("No clean-up rule is set, see the clean-up settings."))
+
+    def computed(self, result):
+        removal, over = result
+        self.removal = removal
+        # logs written in the last minutes are kept even above the drive limit
+        notes = [_("%s stays above the drive limit (%s), recent logs are kept") % (mp, format_size(size))
+                 for mp, size in over]
+        if not removal:
+            self["text"].setText("\n".join([_("Nothing to clean up.")] + notes))
+            return
+        reasons = {"age": _("too old"), "count": _("too many"), "size": _("drive limit")}
+        total = sum(size for path, size, reason in removal)
+        lines = [_("%d files (%s) would be removed:") % (len(removal), format_size(total)), ""]
+        lines.extend("%-12s %10s  %s" % (reasons.get(reason, reason), format_size(size), path)
+                     for path, size, reason in removal)
+        if notes:
+            lines.append("")
+            lines.extend(notes)
+        self["text"].setText("\n".join(lines))
+        self["Greenkey"].setText(_("Remove"))
+
+    def apply(self):
+        if not self.removal:
+            return
+        plan = plan_deletion([path for path, size, reason in self.removal])
+        self.removal = None
+        self.session.openWithCallback(self.applied, ProgressScreen, _("Clean up log files"),
+                                      _("Removing log files..."), run_deletion, plan)
+
+    def applied(self, result):
+        if result:
+            log("Clean-up removed %d log files" % result[0])
+        self.close()
+
+
+class SearchScreen(Screen):
+    # hits stream in while the search runs; OK opens the log at the hit
+
+    if sz_w == 1920:
+        skin = """<screen name="CrashlogViewerSearch" position="center,center" size="1600,900" title="%s">
+        <widget source="list" render="Listbox" position="10,10" size="1580,780" scrollbarMode="showOnDemand">
+            <convert type="TemplatedMultiContent">
+                {"template":[
+                    MultiContentEntryText(pos=(10,2),size=(1560,40),font=0,flags=RT_HALIGN_LEFT,text=0),
+                    MultiContentEntryText(pos=(30,42),size=(1540,36),font=1,flags=RT_HALIGN_LEFT,text=1)],
+                "fonts":[gFont("Regular",30),gFont("Console",26)],
+                "itemHeight":80}
+            </convert>
+        </widget>
+        <widget name="status" position="10,800" size="1580,40" font="Regular;28" />
+        <eLabel backgroundColor="#00ff0000" position="10,890" size="250,6" zPosition="12" />
+        <widget source="Redkey" render="Label" position="10,845" size="250,45" font="Regular;26" halign="center" />
+    </screen>""" % _("Search all logs")
+    else:
+        skin = """<screen name="CrashlogViewerSearch" position="center,center" size="1200,660" title="%s">
+        <widget source="list" render="Listbox" position="10,10" size="1180,540" scrollbarMode="showOnDemand">
+            <convert type="TemplatedMultiContent">
+                {"template":[
+                    MultiContentEntryText(pos=(10,2),size=(1160,30),font=0,flags=RT_HALIGN_LEFT,text=0),
+                    MultiContentEntryText(pos=(30,32),size=(1140,28),font=1,flags=RT_HALIGN_LEFT,text=1)],
+                "fonts":[gFont("Regular",24),gFont("Console",20)],
+                "itemHeight":60}
+            </convert>
+        </widget>
+        <widget name="status" position="10,560" size="1180,34" font="Regular;24" />
+        <eLabel backgroundColor="#00ff0000" position="10,650" size="250,6" zPosition="12" />
+        <widget source="Redkey" render="Label" position="10,605" size="250,45" font="Regular;24" halign="center" />
+    </screen>""" % _("Search all logs")
+
+    def __init__(self, session, files, query, regex=False):
+        Screen.__init__(self, session)
+        self.session = session
+        self.query = query
+        self.entries = []
+        # hits from the worker threads, moved to the list in batches
+        self.pending = deque()
+        self.flush_scheduled = False
+        # hits and the end of the search can still arrive after close()
+        self.closed = False
+        self.setTitle(_("Search all logs") + ": " + query)
+        self["list"] = List([])
+        self["status"] = Label(_("Searching %d log files...") % len(files))
+        self["Redkey"] = StaticText(_("Close"))
+        self["actions"] = ActionMap(
+            ["OkCancelActions", "ColorActions"],
+            {
+                "cancel": self.close,
+                "red": self.close,
+                "ok": self.openHit,
+            },
+            -1
+        )
+        try:
+            self.job = SearchJob(files, query, regex, on_hit=self.hitFromThread, on_done=self.doneFromThread)
+        except re.error as e:
+            self.job = None
+            self["status"].setText(_("Invalid regular expression: %s") % e)
+            return
+        self.onClose.append(self.closing)
+        self.onLayoutFinish.append(self.job.start)
+
+    def closing(self):
+        self.closed = True
+        self.job.cancel()
+        self.pending.clear()
+
+    def hitFromThread(self, path, line, text):
+        if self.closed:
+            return
+        self.pending.append((path, line, text))
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            reactor.callFromThread(self.flushHits)
+
+    def flushHits(self):
+        self.flush_scheduled = False
+        if self.closed:
+            return
+        while self.pending:
+            path, line, text = self.pending.popleft()
+            self.entries.append(("%s  %s %d" % (os.path.basename(path), _("line"), line + 1), text.strip(), path, line))
+        self["list"].setList(self.entries)
+        self["status"].setText(_("%d hits, searching...") % len(self.entries))
+
+    def doneFromThread(self, hits, complete):
+        if not self.closed:
+            reactor.callFromThread(self.searchDone, complete)
+
+    def searchDone(self, complete):
+        if self.closed:
+            return
+        self.flushHits()
+        if not self.entries:
+            self["status"].setText(_("No matches for '%s'.") % self.query)
+        elif complete:
+            self["status"].setText(_("%d hits.") % len(self.entries))
+        else:
+            self["status"].setText(_("%d hits, search stopped at the limit.") % len(self.entries))
+
+    def openHit(self):
+        item = self["list"].getCurrent()
+        if item:
+            self.session.open(LogScreen, item[2], item[3])
+
+
+class DiffScreen(Screen):
+    # side-by-side diff of two logs; only the rows on screen are read
+    if sz_w == 1920:
+        skin = """<screen name="CrashlogViewerDiff" position="70,68" size="1780,980" title="%s" flags="wfBorder">
+            <widget name="status" position="5,5" size="1770,40" font="Regular;28" />
+            <widget name="left" position="2,50" size="883,860" font="Console;24" />
+            <widget name="right" position="895,50" size="883,860" font="Console;24" />
+            <eLabel position="888,50" size="2,860" backgroundColor="#555555" zPosition="1" />
+            <widget source="Redkey" render="Label" position="7,921" size="250,45" font="Regular;26" halign="center" />
+            <widget source="Greenkey" render="Label" position="269,921" size="250,45" font="Regular;26" halign="center" foregroundColor="green" />
+            <widget source="Yellowkey" render="Label" position="531,921" size="250,45" font="Regular;26" halign="center" foregroundColor="yellow" />
+            <eLabel backgroundColor="#00ff0000" position="6,969" size="250,6" zPosition="12" />
+            <eLabel backgroundColor="#0000ff00" position="269,969" size="250,6" zPosition="12" />
+            <eLabel backgroundColor="#00ffff00" position="531,969" size="250,6" zPosition="12" />
+        </screen>""" % _("Compare log files")
+    else:
+        skin = """<screen name="CrashlogViewerDiff" position="240,140" size="1440,800" title="%s" flags="wfBorder">
+            <widget name="status" position="5,5" size="1430,40" font="Regular;26" />
+            <widget name="left" position="2,50" size="713,680" font="Console;24" />
+            <widget name="right" position="725,50" size="713,680" font="Console;24" />
+            <eLabel position="718,50" size="2,680" backgroundColor="#555555" zPosition="1" />
+            <widget source="Redkey" render="Label" position="7,742" size="250,45" font="Regular;26" halign="center" />
+            <widget source="Greenkey" render="Label" position="266,742" size="250,45" font="Regular;26" halign="center" foregroundColor="green" />
+            <widget source="Yellowkey" render="Label" position="526,742" size="250,45" font="Regular;26" halign="center" foregroundColor="yellow" />
+            <eLabel backgroundColor="#00ff0000" position="8,790" size="250,6" zPosition="12" />
+            <eLabel backgroundColor="#0000ff00" position="267,790" size="250,6" zPosition="12" />
+            <eLabel backgroundColor="#00ffff00" position="526,790" size="250,6" zPosition="12" />
+        </screen>""" % _("Compare log files")
+
+    # rows per page and characters per line (longer lines are cut, not wrapped)
+    page_lines = 27 if sz_w == 1920 else 21
+    line_chars = 55 if sz_w == 1920 else 42
+
+    def __init__(self, session, left, right):
+        Screen.__init__(self, session)
+        self.session = session
+        self.paths = (left, right)
+        self.setTitle(_("Compare log files"))
+        self["Redkey"] = StaticText(_("Close"))
+        self["Greenkey"] = StaticText(_("Next change"))
+        self["Yellowkey"] = StaticText(_("Previous change"))
+        self["status"] = Label(_("Comparing %s and %s...") % (os.path.basename(left), os.path.basename(right)))
+        self["left"] = Label("")
+        self["right"] = Label("")
+        self.diff = None
+        self.indexes = None
+        self.top = 0
+        self["actions"] = ActionMap(
+            ["OkCancelActions", "DirectionActions", "ColorActions", "NumberActions"],
+            {
+                "cancel": self.close,
+                "ok": self.close,
+                "red": self.close,
+                "green": self.nextChange,
+                "yellow": self.prevChange,
+                "up": lambda: self.move(-1),
+                "down": lambda: self.move(1),
+                "left": lambda: self.move(-self.page_lines),
+                "right": lambda: self.move(self.page_lines),
+                "1": lambda: self.moveTo(0),
+                "0": lambda: self.moveTo(self.diff.rows if self.diff else 0),
+            },
+            -1
+        )
+        self.onClose.append(self.closeIndexes)
+        runInBackground(compare_logs, self.compared, left, right, errback=self.compareFailed)
+
+    def compared(self, result):
+        diff, left, right = result
+        if self.paths is None:
+            # closed while comparing
+            left.close()
+            right.close()
+            return
+        self.diff = diff
+        self.indexes = (left, right)
+        first = diff.next_change(-1)
+        self.moveTo(first - 2 if first else 0)
+
+    def compareFailed(self, failure):
+        log("Error comparing %s and %s: %s" % (self.paths + (failure.getErrorMessage(),)), ERROR)
+        if self.paths is not None:
+            self["status"].setText(_("Comparing failed: %s") % failure.getErrorMessage())
+
+    def closeIndexes(self):
+        self.paths = None
+        if self.indexes:
+            for index in self.indexes:
+                index.close()
+            self.indexes = None
+
+    def readLines(self, index, numbers):
+        # {line: text} for the given (increasing) line numbers of one log
+        if not numbers:
+            return {}
+        first = numbers[0]
+        data = index.read_bytes(first, numbers[-1] - first + 1)
+        lines = data.decode("utf-8", "replace").split("\n")
+        return dict((first + n, line) for n, line in enumerate(lines))
+
+    def formatRow(self, tag, line, text):
+        if line is None:
+            return ""
+        text = text.replace("\t", " ").rstrip("\r")[:self.line_chars]
+        return DIFF_COLORS.get(tag, DIFF_TEXT_COLOR) + "%6d %s" % (line + 1, text)
+
+    def showRows(self):
+        diff = self.diff
+        with span("render", "diff"):
+            rows = diff.window(self.top, self.page_lines)
+            left = self.readLines(self.indexes[0], [i for tag, i, j in rows if i is not None])
+            right = self.readLines(self.indexes[1], [j for tag, i, j in rows if j is not None])
+            self["left"].setText("\n".join(self.formatRow(tag, i, left.get(i, "")) for tag, i, j in rows))
+            self["right"].setText("\n".join(self.formatRow(tag, j, right.get(j, "")) for tag, i, j in rows))
+        removed, added, changed = diff.counts()
+        self["status"].setText("%s  <>  %s    -%d +%d ~%d    %d-%d / %d" % (
+            os.path.basename(self.paths[0]), os.path.basename(self.paths[1]), removed, added, changed,
+            min(self.top + 1, diff.rows), min(self.top + self.page_lines, diff.rows), diff.rows))
+
+    def moveTo(self, row):
+        if self.diff is None:
+            return
+        self.top = max(0, min(row, self.diff.rows - self.page_lines))
+        self.showRows()
+
+    def move(self, delta):
+        self.moveTo(self.top + delta)
+
+    def nextChange(self):
+        row = self.diff.next_change(self.top + 2) if self.diff else None
+        if row is not None:
+            self.moveTo(row - 2)
+
+    def prevChange(self):
+        row = self.diff.prev_change(self.top + 2) if self.diff else None
+        if row is not None:
+            self.moveTo(row - 2)
+
+
+class DiagnosticsScreen(Screen):
+    # where the time went: timing spans, counters and the newest messages
+    skin = """<screen name="CrashlogViewerDiagnostics" position="center,center" size="1400,800" title="%s">
+        <widget name="text" position="10,10" size="1380,720" font="Console;22" />
+        <eLabel backgroundColor="#00ff0000" position="10,790" size="250,6" zPosition="12" />
+        <eLabel backgroundColor="#0000ff00" position="270,790" size="250,6" zPosition="12" />
+        <widget source="Redkey" render="Label" position="10,745" size="250,45" font="Regular;26" halign="center" />
+        <widget source="Greenkey" render="Label" position="270,745" size="250,45" font="Regular;26" halign="center" foregroundColor="green" />
+    </screen>""" % _("Diagnostics")
+
+    RECENT_SPANS = 20
+    RECENT_MESSAGES = 30
+
+    def __init__(self, session):
+        Screen.__init__(self, session)
+        self.session = session
+        self.setTitle(_("Crashlog Viewer  ver. %s") % get_current_version() + " - " + _("Diagnostics"))
+        self["Redkey"] = StaticText(_("Close"))
+        self["Greenkey"] = StaticText(_("Refresh"))
+        self["text"] = ScrollLabel("")
+        self["actions"] = ActionMap(
+            ["OkCancelActions", "ColorActions", "DirectionActions"],
+            {
+                "cancel": self.close,
+                "ok": self.close,
+                "red": self.close,
+                "green": self.refresh,
+                "up": self["text"].pageUp,
+                "down": self["text"].pageDown,
+            },
+            -1
+        )
+        self.refresh()
+
+    def refresh(self):
+        spans, recent, counters, messages = get_diagnostics().snapshot()
+        out = [_("Developer: 2boom, modifier: Evg77734, update from Lululla, homepage: gisclub.tv"), ""]
+        out.append(_("Timings (ms)"))
+        if spans:
+            out.append("  %-14s %6s %10s %9s %9s" % ("", _("count"), _("total"), _("max"), _("last")))
+            for name, n, total, longest, last in spans:
+                out.append("  %-14s %6d %10.1f %9.1f %9.1f" % (name, n, total * 1000, longest * 1000, last * 1000))
+        else:
+            out.append("  " + _("nothing measured yet"))
+        if recent:
+            out.extend(("", _("Latest")))
+            for t, name, seconds, detail in recent[-self.RECENT_SPANS:][::-1]:
+                out.append("  %s %-14s %9.1f  %s" % (time.strftime("%H:%M:%S", time.localtime(t)), name,
+                                                     seconds * 1000, (detail or "")[-60:]))
+        if counters:
+            out.extend(("", _("Counters")))
+            out.extend("  %-20s %d" % item for item in counters)
+        if messages:
+            out.extend(("", _("Messages")))
+            for t, level, msg in messages[-self.RECENT_MESSAGES:][::-1]:
+                out.append("  %s %-5s %s" % (time.strftime("%H:%M:%S", time.localtime(t)), LEVEL_NAMES.get(level, level), msg))
+        self["text"].setText("\n".join(out))
+
+
+class ProgressScreen(Screen):
+    # Runs func(*args, progress=...) in a worker thread and closes with its
+    # result, or with None after an error has been shown.
+    skin = """<screen name="CrashlogViewerProgress" position="center,center" size="900,200" title="%s">
+        <widget name="status" position="20,20" size="860,80" font="Regular;30" halign="center" valign="center" />
+        <widget name="progress" position="20,120" size="860,30" borderWidth="2" />
+    </screen>""" % _("Crashlog Viewer")
+
+    def __init__(self, session, title, status, func, *args, **kwargs):
+        Screen.__init__(self, session)
+        self.session = session
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.running = True
+        self.last_percent = -1
+        # stage name -> status text shown once that stage reports progress
+        self.stage_texts = {}
+        self.setTitle(title)
+        self["status"] = Label(status)
+        self["progress"] = ProgressBar()
+        self["actions"] = ActionMap(["OkCancelActions"], {"cancel": self.exit, "ok": self.exit}, -1)
+        self.onLayoutFinish.append(self.startTask)
+
+    def startTask(self):
+        self.kwargs["progress"] = self.progressFromThread
+        runInBackground(self.func, self.taskDone, *self.args, errback=self.taskFailed, **self.kwargs)
+
+    def progressFromThread(self, stage, done, total):
+        percent = done * 100 // total if total else 0
+        if percent != self.last_percent:
+            self.last_percent = percent
+            reactor.callFromThread(self.setProgress, stage, percent)
+
+    def setProgress(self, stage, percent):
+        if stage in self.stage_texts:
+            self["status"].setText(self.stage_texts[stage])
+        self["progress"].setValue(percent)
+
+    def taskDone(self, result):
+        self.running = False
+        self.close(result)
+
+    def taskFailed(self, failure):
+        self.running = False
+        log("Error in %s: %s" % (self.func.__name__, failure.getErrorMessage()), ERROR)
+        self.session.openWithCallback(self.exit, MessageBox, _("Error:\n%s") % failure.getErrorMessage(), type=MessageBox.TYPE_ERROR)
+
+    def exit(self, *args):
+        # a running task cannot be interrupted half way through
+        if not self.running:
+            self.close(None)
+
+
+class UpdateScreen(ProgressScreen):
+
+    def __init__(self, session, remote_version=None):
+        ProgressScreen.__init__(self, session, _("Crashlog Viewer Update"), _("Downloading update..."),
+                                install_update, GITHUB_ZIP_URL, PLUGIN_PATH)
+        self.remote_version = remote_version
+        self.stage_texts = {"extract": _("Extracting update...")}
+
+    def taskDone(self, digest):
+        self.running = False
+        log("Update installed to %s (sha256 %s)" % (PLUGIN_PATH, digest))
+        if self.remote_version:
+            with open(VERSION_FILE, "w") as vf:
+                vf.write(self.remote_version + "\n")
+            with open(LAST_UPDATE_FILE, "w") as lf:
+                lf.write(self.remote_version + "\n")
+        msg = _("Update installed successfully!\nDo you want to restart the GUI now?")
+        self.session.openWithCallback(self.restartGUI, MessageBox, msg, type=MessageBox.TYPE_YESNO)
+
+    def taskFailed(self, failure):
+        self.running = False
+        log("Error during update: %s" % failure.getErrorMessage(), ERROR)
+        self.session.openWithCallback(self.exit, MessageBox, _("Error during update:\n%s") % failure.getErrorMessage(), type=MessageBox.TYPE_ERROR)
+
+    def restartGUI(self, answer):
+        if answer:
+            self.session.open(TryQuitMainloop, 3)
+        self.exit()
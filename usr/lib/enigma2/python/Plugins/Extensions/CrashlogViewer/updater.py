@@ -0,0 +1,253 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - update check and installation helpers
+# Kept free of enigma2 imports so it can run in a worker thread and be
+# pointed at a local HTTP server.
+
+from __future__ import print_function
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import zipfile
+
+from .diag import count, span
+
+# --- Python 2/3 urllib ---
+try:
+    import urllib2 as urllib_request
+    from urllib2 import HTTPError
+except Exception:
+    import urllib.request as urllib_request
+    from urllib.error import HTTPError
+
+GITHUB_VERSION_URL = "https://raw.githubusercontent.com/speedy005/CrashlogViewer/main/version.txt"
+GITHUB_CHANGELOG_URL = "https://raw.githubusercontent.com/speedy005/CrashlogViewer/main/changelog.txt"
+GITHUB_ZIP_URL = "https://github.com/speedy005/CrashlogViewer/archive/refs/heads/main.zip"
+
+# outside the plugin folder so an update does not wipe it
+UPDATE_CACHE_FILE = "/etc/enigma2/CrashlogViewer_update.json"
+UPDATE_CHECK_TTL = 6 * 3600
+UPDATE_TIMEOUT = 5
+UPDATE_CHUNK = 64 * 1024
+# members of the GitHub archive that make up the plugin
+PLUGIN_SUBDIR = "/Extensions/CrashlogViewer/"
+
+
+def parse_version(version_str):
+    if not version_str:
+        return (0, 0, 0)
+    v = version_str.strip().lower()
+    if v.startswith("v"):
+        v = v[1:]
+    parts = re.findall(r"\d+", v)
+    while len(parts) < 3:
+        parts.append("0")
+    return tuple(map(int, parts[:3]))
+
+
+def load_update_cache(path):
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            return data
+    except Exception:
+        pass
+    return {}
+
+
+def save_update_cache(path, data):
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.rename(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def fetch_remote_version(url=GITHUB_VERSION_URL, cache_file=UPDATE_CACHE_FILE,
+                         ttl=UPDATE_CHECK_TTL, timeout=UPDATE_TIMEOUT, now=None):
+    # Blocking; call it from a worker thread. Within `ttl` the cached answer
+    # is returned without touching the network, after that a conditional
+    # request is sent so an unchanged version.txt costs a 304 only.
+    if now is None:
+        now = time.time()
+    cache = load_update_cache(cache_file) if cache_file else {}
+    if cache.get("url") != url:
+        cache = {}
+    if cache.get("version") and 0 <= now - cache.get("checked", 0) < ttl:
+        return cache["version"]
+
+    req = urllib_request.Request(url)
+    if cache.get("version"):
+        if cache.get("etag"):
+            req.add_header("If-None-Match", cache["etag"])
+        if cache.get("modified"):
+            req.add_header("If-Modified-Since", cache["modified"])
+    try:
+        count("update.requests")
+        with span("update check", url):
+            response = urllib_request.urlopen(req, timeout=timeout)
+            try:
+                body = response.read(256)
+                headers = response.info()
+            finally:
+                response.close()
+        cache = {
+            "url": url,
+            "version": body.decode("utf-8", "replace").strip().split()[0],
+            "etag": headers.get("ETag"),
+            "modified": headers.get("Last-Modified"),
+        }
+    except HTTPError as e:
+        if not cache.get("version"):
+            raise
+        if e.code != 304:
+            # rate limited or a server error (429, 5xx): as if offline
+            count("update.offline")
+            return cache["version"]
+    except (IOError, OSError):
+        # offline or GitHub unreachable: the last known version, checked
+        # again next time
+        if not cache.get("version"):
+            raise
+        count("update.offline")
+        return cache["version"]
+    cache["checked"] = now
+    if cache_file:
+        save_update_cache(cache_file, cache)
+    return cache["version"]
+
+
+# --- Installation ---
+def staging_dir_for(plugin_dir):
+    # Same file system as the plugin so the final swap is a plain rename, but
+    # outside Plugins/ so enigma2 never tries to load the staged copies.
+    python_dir = os.path.dirname(os.path.dirname(os.path.dirname(plugin_dir.rstrip("/"))))
+    return os.path.join(python_dir, ".CrashlogViewer-update")
+
+
+def download_file(url, dest, progress=None, timeout=30):
+    # Streams `url` to `dest` in UPDATE_CHUNK blocks and returns its sha256,
+    # for the log only: the branch zip is rebuilt on every push, so there is
+    # no published checksum to compare it with
+    with span("download", url):
+        return _download(url, dest, progress, timeout)
+
+
+def _download(url, dest, progress, timeout):
+    digest = hashlib.sha256()
+    response = urllib_request.urlopen(url, timeout=timeout)
+    try:
+        total = int(response.info().get("Content-Length") or 0)
+        done = 0
+        with open(dest, "wb") as f:
+            while True:
+                data = response.read(UPDATE_CHUNK)
+                if not data:
+                    break
+                f.write(data)
+                digest.update(data)
+                done += len(data)
+                if progress:
+                    progress("download", done, total)
+    finally:
+        response.close()
+    count("download.bytes", done)
+    if total and done != total:
+        raise IOError("Incomplete download: %d of %d bytes" % (done, total))
+    return digest.hexdigest()
+
+
+def extract_plugin(zip_path, dest_dir, subdir=PLUGIN_SUBDIR, progress=None):
+    # Extracts only the plugin members; zipfile verifies each CRC on read.
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        prefix = None
+        members = []
+        for info in zf.infolist():
+            if prefix is None:
+                i = info.filename.find(subdir)
+                if i < 0:
+                    continue
+                prefix = info.filename[:i + len(subdir)]
+            if info.filename.startswith(prefix) and len(info.filename) > len(prefix):
+                members.append(info)
+        if not members:
+            raise Exception("CrashlogViewer folder not found in ZIP!")
+
+        for n, info in enumerate(members):
+            parts = info.filename[len(prefix):].rstrip("/").split("/")
+            if ".." in parts or "" in parts:
+                raise Exception("Unsafe path in ZIP: %s" % info.filename)
+            target = os.path.join(dest_dir, *parts)
+            if info.filename.endswith("/"):
+                if not os.path.isdir(target):
+                    os.makedirs(target)
+                continue
+            parent = os.path.dirname(target)
+            if not os.path.isdir(parent):
+                os.makedirs(parent)
+            src = zf.open(info)
+            try:
+                with open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst, UPDATE_CHUNK)
+            finally:
+                src.close()
+            mode = (info.external_attr >> 16) & 0o777
+            if mode:
+                os.chmod(target, mode)
+            if progress:
+                progress("extract", n + 1, len(members))
+    return len(members)
+
+
+def swap_in(new_dir, plugin_dir, backup_dir):
+    # Two renames on one file system; the old tree is kept as backup_dir.
+    plugin_dir = plugin_dir.rstrip("/")
+    if os.path.exists(backup_dir):
+        shutil.rmtree(backup_dir)
+    if os.path.exists(plugin_dir):
+        os.rename(plugin_dir, backup_dir)
+    try:
+        os.rename(new_dir, plugin_dir)
+    except Exception:
+        if os.path.exists(backup_dir):
+            os.rename(backup_dir, plugin_dir)
+        raise
+
+
+def rollback_update(plugin_dir, staging_dir=None):
+    staging_dir = staging_dir or staging_dir_for(plugin_dir)
+    backup_dir = os.path.join(staging_dir, "old")
+    if not os.path.isdir(backup_dir):
+        return False
+    swap_in(backup_dir, plugin_dir, os.path.join(staging_dir, "rejected"))
+    return True
+
+
+def install_update(url, plugin_dir, staging_dir=None, progress=None):
+    # Download, extract and swap; the running plugin stays untouched until
+    # the new tree is complete, the previous one ends up in <staging>/old.
+    staging_dir = staging_dir or staging_dir_for(plugin_dir)
+    new_dir = os.path.join(staging_dir, "new")
+    zip_path = os.path.join(staging_dir, "plugin_update.zip")
+    if os.path.exists(new_dir):
+        shutil.rmtree(new_dir)
+    os.makedirs(new_dir)
+    try:
+        digest = download_file(url, zip_path, progress)
+        extract_plugin(zip_path, new_dir, progress=progress)
+    except Exception:
+        shutil.rmtree(new_dir, ignore_errors=True)
+        raise
+    finally:
+        if os.path.exists(zip_path):
+            os.remove(zip_path)
+    swap_in(new_dir, plugin_dir, os.path.join(staging_dir, "old"))
+    return digest
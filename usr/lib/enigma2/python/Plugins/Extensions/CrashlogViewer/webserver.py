@@ -0,0 +1,525 @@
+# -*- coding: UTF-8 -*-
+# CrashlogViewer - web access from a PC
+# A small threaded HTTP server, off by default. It serves the log list as
+# JSON (discovery plus the metadata cache the screen keeps), pages of lines
+# through the same line indexes the viewer uses, the files and a search
+# over all logs. Responses are gzip compressed when the browser asks for
+# it; nothing reads a whole log into memory.
+# It listens on 127.0.0.1 unless it is opened to the network, which needs
+# a password (HTTP basic auth with any user name, a bearer token or
+# ?token=). Everything served goes through the export redactor; only with
+# raw=True are the files sent as stored, with Range support.
+#
+#   GET /api/logs                           list with metadata
+#   GET /api/logs/<id>                      one log, with its line count
+#   GET /api/logs/<id>/lines?start=&count=  a page of lines
+#   GET /api/search?q=&regex=&limit=&id=    matching lines
+#   GET /logs/<id>                          the file itself (Range, gzip)
+
+from __future__ import print_function
+import base64
+import hashlib
+import hmac
+import html
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+
+from .archive import is_archive, open_line_index
+from .diag import DEBUG, ERROR, INFO, count, log, span
+from .discovery import discover_logs
+from .export import Redactor, redacted_chunks
+from .logcache import CACHE_FILE, LogMetaCache, stat_key
+from .search import MAX_HITS, SearchJob
+
+WEB_PORT = 8765
+WEB_HOST = "127.0.0.1"
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+PAGE_LINES = 200
+MAX_PAGE_LINES = 5000
+SEND_CHUNK = 64 * 1024
+# smaller responses are not worth compressing
+GZIP_MIN = 1024
+# the log list is scanned again after this many seconds
+LIST_TTL = 5.0
+# line indexes kept open between requests
+OPEN_INDEXES = 4
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+# kept out of the debug log
+TOKEN_RE = re.compile(r"(?<=[?&]token=)[^&\s]*")
+# no size limit for the redacted file download
+UNLIMITED = 1 << 62
+
+INDEX_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>CrashlogViewer</title></head>
+<body><h1>CrashlogViewer</h1><ul>%s</ul>
+<p>JSON: <a href="/api/logs">/api/logs</a>, /api/logs/&lt;id&gt;/lines?start=0&amp;count=200,
+/api/search?q=...</p></body></html>
+"""
+
+
+def log_id(path):
+    return hashlib.md5(path.encode("utf-8", "replace")).hexdigest()[:12]
+
+
+def redact_text(redactor, text):
+    if not text:
+        return text
+    return redactor(text.encode("utf-8", "replace")).decode("utf-8", "replace")
+
+
+def parse_range(header, size):
+    # (start, end) inclusive, None for no or an unsupported range,
+    # False if it cannot be satisfied
+    m = RANGE_RE.match(header.strip()) if header else None
+    if not m or not (m.group(1) or m.group(2)):
+        return None
+    if not m.group(1):
+        # the last n bytes
+        n = int(m.group(2))
+        if not n or not size:
+            return False
+        return max(0, size - n), size - 1
+    start = int(m.group(1))
+    end = int(m.group(2)) if m.group(2) else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+class _OpenIndex(object):
+    __slots__ = ("key", "index", "lock", "closed")
+
+    def __init__(self, key, index):
+        self.key = key
+        self.index = index
+        # archive indexes seek in one shared file
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def close(self):
+        with self.lock:
+            self.index.close()
+            self.closed = True
+
+
+class LogCatalog(object):
+    # the logs the server may hand out; nothing outside this list is served
+
+    def __init__(self, base_path, cache_path=CACHE_FILE):
+        self.base_path = base_path
+        self.cache_path = cache_path
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.timed_out = []
+        self.scanned = 0
+        self.meta = None
+        self.meta_mtime = None
+        self.indexes = OrderedDict()
+
+    def refresh(self, force=False):
+        with self.lock:
+            if not force and time.time() - self.scanned < LIST_TTL:
+                return
+            with span("scan", "web"):
+                entries, self.timed_out = discover_logs(self.base_path)
+            self.entries = OrderedDict((log_id(path), (path, st)) for path, st in entries)
+            self.scanned = time.time()
+            # the screen writes the metadata cache, it is only read here
+            try:
+                mtime = os.path.getmtime(self.cache_path)
+            except OSError:
+                mtime = None
+            if self.meta is None or mtime != self.meta_mtime:
+                self.meta = LogMetaCache(self.cache_path)
+                self.meta_mtime = mtime
+
+    def logs(self):
+        self.refresh()
+        with self.lock:
+            return list(self.entries.items())
+
+    def get(self, id):
+        self.refresh()
+        with self.lock:
+            return self.entries.get(id)
+
+    def describe(self, id, path, st, redactor=None):
+        d = {
+            "id": id,
+            "name": os.path.basename(path),
+            "path": path,
+            "size": st.st_size,
+            "mtime": int(st.st_mtime),
+            "archive": is_archive(path),
+        }
+        report = self.meta.get(path, st) if self.meta else None
+        if report is not None:
+            exception = report.exception_type
+            if exception and report.exception_message:
+                exception += ": " + report.exception_message
+            title = report.summary(short=True)
+            if redactor is not None:
+                title = redact_text(redactor, title)
+                exception = redact_text(redactor, exception)
+            d.update(title=title, lines=report.lines, signal=report.signal,
+                     exception=exception, fingerprint=self.meta.signature(path, st))
+        return d
+
+    def index(self, path, st):
+        # open line index of the log, rebuilt when the file has changed
+        key = stat_key(st)
+        with self.lock:
+            entry = self.indexes.get(path)
+            if entry is not None and entry.key == key:
+                self.indexes.move_to_end(path)
+                return entry
+        # built outside the lock, a large log takes a while
+        with span("index", path):
+            entry = _OpenIndex(key, open_line_index(path))
+        with self.lock:
+            old = self.indexes.pop(path, None)
+            self.indexes[path] = entry
+            evicted = [old] if old is not None else []
+            while len(self.indexes) > OPEN_INDEXES:
+                evicted.append(self.indexes.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+        return entry
+
+    def read_lines(self, path, st, start, n):
+        # (total lines, bytes of lines [start, start+n))
+        for attempt in (0, 1):
+            entry = self.index(path, st)
+            with entry.lock:
+                if not entry.closed:
+                    return entry.index.lines, entry.index.read_bytes(start, n)
+        raise IOError("index of %s closed" % path)
+
+    def close(self):
+        with self.lock:
+            entries = list(self.indexes.values())
+            self.indexes.clear()
+        for entry in entries:
+            entry.close()
+
+
+class LogRequestHandler(BaseHTTPRequestHandler):
+    server_version = "CrashlogViewer"
+
+    def log_message(self, format, *args):
+        log("web: %s %s" % (self.address_string(), TOKEN_RE.sub("***", format % args)), DEBUG)
+
+    def authorized(self, query):
+        # basic auth (any user name), a bearer token or ?token=
+        token = self.server.token
+        if not token:
+            return True
+        given = query.get("token")
+        auth = self.headers.get("Authorization", "")
+        if auth.startswith("Basic "):
+            try:
+                given = base64.b64decode(auth[6:].strip()).decode("utf-8").partition(":")[2]
+            except (ValueError, UnicodeDecodeError):
+                return False
+        elif auth.startswith("Bearer "):
+            given = auth[7:].strip()
+        return given is not None and hmac.compare_digest(given.encode("utf-8"), token.encode("utf-8"))
+
+    def redactor(self):
+        # a new one per request, the counts are not shared between threads
+        return None if self.server.raw else Redactor()
+
+    # --- Responses ---
+    def accepts_gzip(self):
+        return "gzip" in self.headers.get("Accept-Encoding", "")
+
+    def send_body(self, body, content_type, status=200, headers=()):
+        gz = self.accepts_gzip() and len(body) >= GZIP_MIN
+        if gz:
+            c = zlib.compressobj(6, zlib.DEFLATED, 31)
+            body = c.compress(body) + c.flush()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        for name, value in headers:
+            self.send_header(name, value)
+        if gz:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def send_json(self, data, status=200):
+        self.send_body(json.dumps(data, separators=(",", ":")).encode("utf-8"), "application/json", status)
+
+    def send_error_json(self, status, message):
+        self.send_json({"error": message}, status)
+
+    # --- Routing ---
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = dict((k, v[-1]) for k, v in parse_qs(url.query).items())
+        parts = [p for p in url.path.split("/") if p]
+        count("web.requests")
+        if not self.authorized(query):
+            count("web.unauthorized")
+            self.send_body(json.dumps({"error": "password required"}).encode("utf-8"), "application/json", 401,
+                           [("WWW-Authenticate", 'Basic realm="CrashlogViewer"')])
+            return
+        try:
+            if not parts:
+                self.send_index()
+            elif parts == ["api", "logs"]:
+                self.send_logs()
+            elif parts[:2] == ["api", "logs"] and len(parts) in (3, 4):
+                found = self.server.catalog.get(parts[2])
+                if found is None:
+                    self.send_error_json(404, "no such log")
+                elif len(parts) == 3:
+                    self.send_log_info(parts[2], *found)
+                elif parts[3] == "lines":
+                    self.send_lines(query, *found)
+                else:
+                    self.send_error_json(404, "not found")
+            elif parts == ["api", "search"]:
+                self.send_search(query)
+            elif parts[0] == "logs" and len(parts) == 2:
+                found = self.server.catalog.get(parts[1])
+                if found is None:
+                    self.send_error_json(404, "no such log")
+                else:
+                    self.send_file(*found)
+            else:
+                self.send_error_json(404, "not found")
+        except ValueError as e:
+            self.send_error_json(400, str(e))
+        except (IOError, OSError) as e:
+            # the client went away, or the log did
+            log("web: %s: %s" % (self.path, e), INFO)
+
+    do_HEAD = do_GET
+
+    # --- Handlers ---
+    def send_index(self):
+        items = "".join('<li><a href="/logs/%s">%s</a> (%d bytes)</li>' % (id, html.escape(os.path.basename(path)), st.st_size)
+                        for id, (path, st) in self.server.catalog.logs())
+        self.send_body((INDEX_PAGE % items).encode("utf-8"), "text/html; charset=utf-8")
+
+    def send_logs(self):
+        catalog = self.server.catalog
+        redactor = self.redactor()
+        logs = [catalog.describe(id, path, st, redactor) for id, (path, st) in catalog.logs()]
+        self.send_json({"logs": logs, "timed_out": catalog.timed_out})
+
+    def send_log_info(self, id, path, st):
+        entry = self.server.catalog.index(path, st)
+        d = self.server.catalog.describe(id, path, st, self.redactor())
+        d["lines"] = entry.index.lines
+        self.send_json(d)
+
+    def send_lines(self, query, path, st):
+        start = max(0, int(query.get("start", 0)))
+        n = max(0, min(int(query.get("count", PAGE_LINES)), MAX_PAGE_LINES))
+        total, data = self.server.catalog.read_lines(path, st, start, n)
+        redactor = self.redactor()
+        if redactor is not None:
+            data = redactor(data)
+        lines = data.decode("utf-8", "replace").split("\n")
+        if lines and not lines[-1]:
+            lines.pop()
+        self.send_json({"start": start, "count": len(lines), "total": total, "lines": lines})
+
+    def send_search(self, query):
+        q = query.get("q")
+        if not q:
+            raise ValueError("missing q")
+        limit = max(1, min(int(query.get("limit", MAX_HITS)), MAX_HITS))
+        logs = self.server.catalog.logs()
+        if "id" in query:
+            logs = [(id, found) for id, found in logs if id == query["id"]]
+        ids = dict((path, id) for id, (path, st) in logs)
+        try:
+            job = SearchJob(list(ids), q, query.get("regex") in ("1", "true"), limit=limit)
+        except re.error as e:
+            raise ValueError("invalid regular expression: %s" % e)
+        with span("search", "web " + q):
+            hits = job.run()
+        hits.sort(key=lambda h: (h[0], h[1]))
+        redactor = self.redactor()
+        if redactor is not None:
+            hits = [(path, line, redact_text(redactor, text)) for path, line, text in hits]
+        self.send_json({"hits": [{"id": ids[path], "name": os.path.basename(path), "line": line, "text": text}
+                                 for path, line, text in hits],
+                        "complete": len(hits) < limit})
+
+    def send_file(self, path, st):
+        redactor = self.redactor()
+        if redactor is not None:
+            self.send_redacted(path, redactor)
+            return
+        # the stored bytes: archives are sent compressed, as they are on disk
+        size = st.st_size
+        rng = parse_range(self.headers.get("Range"), size)
+        if rng is False:
+            self.send_response(416)
+            self.send_header("Content-Range", "bytes */%d" % size)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        content_type = "application/gzip" if path.endswith(".gz") else (
+            "application/x-xz" if path.endswith(".xz") else "text/plain; charset=utf-8")
+        gz = rng is None and not is_archive(path) and self.accepts_gzip() and size >= GZIP_MIN
+        start, end = rng or (0, size - 1)
+        with open(path, "rb") as f:
+            self.send_response(206 if rng else 200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Last-Modified", self.date_time_string(st.st_mtime))
+            if rng:
+                self.send_header("Content-Range", "bytes %d-%d/%d" % (start, end, size))
+            if gz:
+                # length unknown up front; the connection end marks the end
+                self.send_header("Content-Encoding", "gzip")
+                self.send_header("Vary", "Accept-Encoding")
+                self.close_connection = True
+            else:
+                self.send_header("Content-Length", str(end - start + 1))
+            self.end_headers()
+            if self.command == "HEAD":
+                return
+            f.seek(start)
+            left = end - start + 1
+            c = zlib.compressobj(6, zlib.DEFLATED, 31) if gz else None
+            while left > 0:
+                data = f.read(min(SEND_CHUNK, left))
+                if not data:
+                    break
+                left -= len(data)
+                self.wfile.write(c.compress(data) if c else data)
+            if c:
+                self.wfile.write(c.flush())
+            count("web.bytes", end - start + 1 - left)
+
+    def send_redacted(self, path, redactor):
+        # the masked text, archives decompressed; its length is only known at
+        # the end, so there is no Content-Length and no Range
+        gz = self.accepts_gzip()
+        chunks = redacted_chunks(path, UNLIMITED, redactor)
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Accept-Ranges", "none")
+            self.send_header("Vary", "Accept-Encoding")
+            if gz:
+                self.send_header("Content-Encoding", "gzip")
+            self.close_connection = True
+            self.end_headers()
+            if self.command == "HEAD":
+                return
+            c = zlib.compressobj(6, zlib.DEFLATED, 31) if gz else None
+            sent = 0
+            for data in chunks:
+                sent += len(data)
+                self.wfile.write(c.compress(data) if c else data)
+            if c:
+                self.wfile.write(c.flush())
+            count("web.bytes", sent)
+        finally:
+            chunks.close()
+
+
+class LogHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, catalog, token="", raw=False):
+        HTTPServer.__init__(self, address, LogRequestHandler)
+        self.catalog = catalog
+        self.token = token
+        self.raw = raw
+
+
+class LogWebServer(object):
+    # host: 127.0.0.1 by default, anything else needs a token
+
+    def __init__(self, base_path, port=WEB_PORT, host=WEB_HOST, token="", raw=False):
+        self.base_path = base_path
+        self.port = port
+        self.host = host
+        self.token = token
+        self.raw = raw
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def settings(self):
+        return self.port, self.host, self.token, self.raw
+
+    @property
+    def running(self):
+        return self.httpd is not None
+
+    def start(self):
+        # raises socket.error if the port is taken
+        if self.httpd is not None:
+            return
+        if self.host not in LOOPBACK_HOSTS and not self.token:
+            raise ValueError("web access from the network needs a password")
+        self.httpd = LogHTTPServer((self.host, self.port), LogCatalog(self.base_path), self.token, self.raw)
+        # port 0: the system picked one
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="CrashlogWeb")
+        self.thread.daemon = True
+        self.thread.start()
+        log("Web access on %s port %d%s" % (self.host or "all interfaces", self.port,
+                                            ", unmasked" if self.raw else ""), INFO)
+
+    def stop(self):
+        if self.httpd is None:
+            return
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.httpd.catalog.close()
+        self.httpd = None
+        self.thread = None
+
+
+_server = None
+
+
+def get_web_server():
+    return _server
+
+
+def start_web_server(base_path, port=WEB_PORT, host=WEB_HOST, token="", raw=False):
+    # (re)starts the shared server; errors are logged, not raised
+    global _server
+    if _server is not None and _server.running and _server.settings == (port, host, token, raw):
+        return _server
+    stop_web_server()
+    server = LogWebServer(base_path, port, host, token, raw)
+    try:
+        server.start()
+    except Exception as e:
+        log("Error starting web access on port %d: %s" % (port, e), ERROR)
+        return None
+    _server = server
+    return server
+
+
+def stop_web_server():
+    global _server
+    if _server is not None:
+        _server.stop()
+        _server = None